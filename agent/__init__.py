@@ -1,6 +1,15 @@
 # agent/__init__.py (añade si quieres)
-from .graph import build_graph
-from .state import ChatVisionState
-
+# Exports perezosos: `python -m agent.tools.<cli>` no debe importar el grafo
+# (ni langgraph) solo por cargar el paquete.
 __all__ = ["build_graph", "ChatVisionState"]
 __version__ = "0.1.0"
+
+
+def __getattr__(name):
+    if name == "build_graph":
+        from .graph import build_graph
+        return build_graph
+    if name == "ChatVisionState":
+        from .state import ChatVisionState
+        return ChatVisionState
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,35 +8,75 @@ from agent.state import ChatVisionState  # type: ignore
 # Nodos
 from agent.nodes.router import router_input
 from agent.nodes.ensure_image import ensure_image
-from agent.nodes.infer_local import infer_local
+from agent.nodes.infer_local import infer_local, ainfer_local
 from agent.nodes.gate_uncertainty import gate_uncertainty
 from agent.nodes.map_scientific import map_to_scientific_name
-from agent.nodes.ask_gpt41_vision import ask_gpt41_vision
-from agent.nodes.wiki_fullpage import fetch_wikipedia_fullpage
+from agent.nodes.ask_gpt41_vision import ask_gpt41_vision, aask_gpt41_vision
+from agent.nodes.wiki_fullpage import fetch_wikipedia_fullpage, afetch_wikipedia_fullpage
 from agent.nodes.merge_context import merge_context
-from agent.nodes.finalize import finalize_answer
-from agent.nodes.qa_about_taxon import qa_about_taxon
+from agent.nodes.fanout import fanout_wiki, fanout_ddg, afanout_wiki, afanout_ddg
+from agent.nodes.finalize import finalize_answer, afinalize_answer
+from agent.nodes.qa_about_taxon import qa_about_taxon, aqa_about_taxon
 from agent.nodes.prompt_for_image import prompt_for_image
 from agent.nodes.clarify import clarify_or_fail
 from agent.nodes.capture_user_taxon import capture_user_taxon
 
 
-def build_graph():
+# Nodos con I/O o CPU pesada y su variante asyncio
+_SYNC_NODES = {
+    "infer_local": infer_local,
+    "ask_gpt41_vision": ask_gpt41_vision,
+    "fetch_wikipedia_fullpage": fetch_wikipedia_fullpage,
+    "finalize_answer": finalize_answer,
+    "qa_about_taxon": qa_about_taxon,
+}
+_ASYNC_NODES = {
+    "infer_local": ainfer_local,
+    "ask_gpt41_vision": aask_gpt41_vision,
+    "fetch_wikipedia_fullpage": afetch_wikipedia_fullpage,
+    "finalize_answer": afinalize_answer,
+    "qa_about_taxon": aqa_about_taxon,
+}
+
+
+def build_graph(async_nodes: bool = False, fanout: bool = False):
+    """
+    async_nodes=True registra las variantes asyncio de los nodos de red/modelo
+    (httpx, AsyncOpenAI, forward en el executor): el grafo compilado se usa con
+    ainvoke/astream y muchas sesiones comparten un event loop. El resto de
+    nodos son síncronos y baratos; LangGraph los ejecuta tal cual. Los
+    clientes HTTP asíncronos son por loop: antes de cerrarlo, `await
+    gpt.aclose()` y `await transport.aclose()`.
+    Con async_nodes=False (por defecto) el grafo es el de siempre (invoke).
+
+    fanout=True lanza wiki y DDG como ramas concurrentes (cada una con su
+    timeout, ver agent/nodes/fanout.py) que se unen en merge_context antes
+    de finalize_answer.
+    """
     g = StateGraph(ChatVisionState)
+    heavy = dict(_ASYNC_NODES if async_nodes else _SYNC_NODES)
+    if fanout:
+        heavy["fetch_wikipedia_fullpage"] = afanout_wiki if async_nodes else fanout_wiki
+
+    # Destino(s) tras obtener el taxón: solo wiki, o wiki ‖ ddg
+    retrieval = ["wiki", "ddg"] if fanout else "wiki"
 
     # --- nodos registrados ---
     g.add_node("router_input", router_input)
     g.add_node("ensure_image", ensure_image)
-    g.add_node("infer_local", infer_local)
+    g.add_node("infer_local", heavy["infer_local"])
     g.add_node("gate_uncertainty", gate_uncertainty)
     g.add_node("map_to_scientific_name", map_to_scientific_name)
-    g.add_node("ask_gpt41_vision", ask_gpt41_vision)
-    g.add_node("fetch_wikipedia_fullpage", fetch_wikipedia_fullpage)
-    g.add_node("finalize_answer", finalize_answer)
-    g.add_node("qa_about_taxon", qa_about_taxon)
+    g.add_node("ask_gpt41_vision", heavy["ask_gpt41_vision"])
+    g.add_node("fetch_wikipedia_fullpage", heavy["fetch_wikipedia_fullpage"])
+    g.add_node("finalize_answer", heavy["finalize_answer"])
+    g.add_node("qa_about_taxon", heavy["qa_about_taxon"])
     g.add_node("prompt_for_image", prompt_for_image)
     g.add_node("clarify_or_fail", clarify_or_fail)
     g.add_node("capture_user_taxon", capture_user_taxon)
+    if fanout:
+        g.add_node("retrieve_ddg", afanout_ddg if async_nodes else fanout_ddg)
+        g.add_node("merge_context", merge_context)
 
     # --- entrada ---
     g.add_edge(START, "router_input")
@@ -80,26 +120,35 @@ def build_graph():
 
     # map_to_scientific_name → wiki (o fallback a visión)
     def map_next(state: ChatVisionState):
-        return "ask_gpt41_vision" if state.get("_tmp", {}).get("need_fallback") else "wiki"
+        return "ask_gpt41_vision" if state.get("_tmp", {}).get("need_fallback") else retrieval
 
     g.add_conditional_edges(
         "map_to_scientific_name",
         map_next,
+        {"ask_gpt41_vision": "ask_gpt41_vision", "wiki": "fetch_wikipedia_fullpage", "ddg": "retrieve_ddg"}
+        if fanout else
         {"ask_gpt41_vision": "ask_gpt41_vision", "wiki": "fetch_wikipedia_fullpage"},
     )
 
     # visión → wiki (si ok) o aclarar
     def vision_next(state: ChatVisionState):
-        return "wiki" if state.get("_tmp", {}).get("vision_status") == "ok" else "clarify_or_fail"
+        return retrieval if state.get("_tmp", {}).get("vision_status") == "ok" else "clarify_or_fail"
 
     g.add_conditional_edges(
         "ask_gpt41_vision",
         vision_next,
+        {"wiki": "fetch_wikipedia_fullpage", "ddg": "retrieve_ddg", "clarify_or_fail": "clarify_or_fail"}
+        if fanout else
         {"wiki": "fetch_wikipedia_fullpage", "clarify_or_fail": "clarify_or_fail"},
     )
 
-    # wiki → merge → finalize
-    g.add_edge("fetch_wikipedia_fullpage", "finalize_answer")
+    # wiki (‖ ddg → merge) → finalize
+    if fanout:
+        # El join espera a las dos ramas; cada una acota su propia latencia
+        g.add_edge(["fetch_wikipedia_fullpage", "retrieve_ddg"], "merge_context")
+        g.add_edge("merge_context", "finalize_answer")
+    else:
+        g.add_edge("fetch_wikipedia_fullpage", "finalize_answer")
     g.add_edge("finalize_answer", END)
 
     # (opcional) Q&A post‑respuesta
@@ -12,7 +12,7 @@ except Exception:
             state.get("image_bytes")
             or state.get("image")
             or state.get("image_url")
-            or state.get("_tmp", {}).get("pil_image")
+            or state.get("_tmp", {}).get("image_ref")
         )
     def valid_binomial(s: str) -> bool:
         return bool(s and _BIN.match(s))
@@ -26,53 +26,109 @@ except Exception:
         pil_img.save(buf, format="PNG")
         return buf.getvalue()
 
-from agent.tools.gpt import ask_binomial as _ask_binomial
+from agent.tools.gpt import ask_binomial as _ask_binomial, aask_binomial as _aask_binomial
+from agent.tools.gpt_cache import get_vision_cache, vision_cache_key
+from agent.utils.image_artifact import get_artifact
 from agent.prompts import PROMPT_BINOMIAL
 
 
+def _vision_request(state: Dict[str, Any]) -> Dict[str, Any]:
+    # Preferimos los bytes originales del artefacto de ensure_image: mismo
+    # contenido que image_bytes, sin re-codificar el PIL a PNG
+    artifact = get_artifact(state)
+    pil = state.get("image")
+    image_bytes = artifact.data if artifact is not None else state.get("image_bytes")
+    image_url = state.get("image_url")
+
+    if image_bytes is None and pil is not None:
+        try:
+            image_bytes = _image_to_bytes(pil)
+        except Exception:
+            image_bytes = None
+
+    return dict(
+        image_bytes=image_bytes,
+        url=image_url,
+        prompt=PROMPT_BINOMIAL,
+        model=state.get("vision_model", "gpt-4.1-mini"),
+        max_tokens=int(state.get("vision_max_output_tokens", 16)),
+    )
+
+
+def _cached(req: Dict[str, Any]):
+    """(caché, clave, acierto) para la verificación por visión de esta imagen."""
+    cache = get_vision_cache()
+    if cache is None:
+        return None, None, None
+    key = vision_cache_key(req["image_bytes"], req["url"], req["prompt"], req["model"])
+    if key is None:
+        return None, None, None
+    return cache, key, cache.get(key)
+
+
+def _vision_delta(payload: Dict[str, Any], cached: bool = False) -> Dict[str, Any]:
+    status = payload.get("status", "error")
+    latin = payload.get("latin_name", "")
+
+    tmp_out: Dict[str, Any] = {"vision_status": status}
+    if status == "ok" and valid_binomial(latin):
+        tmp_out["latin_name"] = latin
+    if cached:
+        tmp_out["vision_cached"] = True
+    elif payload.get("payload"):
+        tmp_out["vision_payload"] = payload["payload"]   # bytes antes/después
+
+    # Importante: solo devolvemos DELTA en _tmp
+    return {"_tmp": tmp_out}
+
+
 def ask_gpt41_vision(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Entradas opcionales:
+      - state['_tmp']['image_ref'] (ImageArtifact)  ← preferible si viene de ensure_image
       - state['image_bytes'] (bytes)
-      - state['_tmp']['pil_image'] (PIL.Image)  ← preferible si viene de ensure_image
       - state['image'] (PIL.Image)
       - state['image_url'] (str)
     Salidas (solo delta):
       - _tmp.vision_status = ok|invalid|empty|error
       - _tmp.latin_name    = str (si ok y válido)
+      - _tmp.vision_cached = True (si salió de la caché por hash/URL)
+      - _tmp.vision_payload = {bytes_in, bytes_out, size_in, size_out, mime}
     """
     if not has_image(state):
         # Solo delta
         return {"_tmp": {"vision_status": "empty"}}
 
-    # Preferimos la imagen ya normalizada por ensure_image
-    pil = state.get("_tmp", {}).get("pil_image") or state.get("image")
-    image_bytes = state.get("image_bytes")
-    image_url = state.get("image_url")
-
-    if image_bytes is None and pil is not None:
-        try:
-            image_bytes = _image_to_bytes(pil)
-        except Exception:
-            image_bytes = None
+    req = _vision_request(state)
+    cache, key, hit = _cached(req)
+    if hit is not None:
+        return _vision_delta(hit, cached=True)
 
     try:
-        payload = _ask_binomial(
-            image_bytes=image_bytes,
-            url=image_url,
-            prompt=PROMPT_BINOMIAL,
-            model=state.get("vision_model", "gpt-4.1-mini"),
-            max_output_tokens=int(state.get("vision_max_output_tokens", 16)),
-        )
+        payload = _ask_binomial(**req)
     except Exception:
         return {"_tmp": {"vision_status": "error"}}
 
-    status = payload.get("status", "error")
-    latin = payload.get("latin_name", "")
+    if cache is not None:
+        cache.put(key, payload)  # ok / invalid (con su retención); error nunca
+    return _vision_delta(payload)
 
-    tmp_out: Dict[str, Any] = {"vision_status": status}
-    if status == "ok" and valid_binomial(latin):
-        tmp_out["latin_name"] = latin
 
-    # Importante: solo devolvemos DELTA en _tmp
-    return {"_tmp": tmp_out}
+async def aask_gpt41_vision(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Igual que ask_gpt41_vision con el cliente asíncrono (para ainvoke/astream)."""
+    if not has_image(state):
+        return {"_tmp": {"vision_status": "empty"}}
+
+    req = _vision_request(state)
+    cache, key, hit = _cached(req)
+    if hit is not None:
+        return _vision_delta(hit, cached=True)
+
+    try:
+        payload = await _aask_binomial(**req)
+    except Exception:
+        return {"_tmp": {"vision_status": "error"}}
+
+    if cache is not None:
+        cache.put(key, payload)
+    return _vision_delta(payload)
@@ -1,34 +1,54 @@
 # agent/nodes/ensure_image.py
 from __future__ import annotations
 from typing import Dict, Any
-from PIL import Image
-import io, os
+import os
 
 from agent.state import ChatVisionState
+from agent.utils.image_artifact import decode_artifact, register
+
+# Tamaño de entrada del modelo (ancho, alto) para decodificar JPEG reducido
+try:
+    from agent.tools.vision import input_hw  # type: ignore
+    def _min_size():
+        h, w = input_hw()
+        return (w, h)
+except Exception:
+    def _min_size():
+        return (224, 224)
+
+def _without_ref(tmp: Dict[str, Any]) -> Dict[str, Any]:
+    # Una referencia de un turno anterior no debe sobrevivir a una imagen inválida
+    return {k: v for k, v in tmp.items() if k not in {"image_ref", "image_format", "image_size"}}
 
 def ensure_image(state: ChatVisionState) -> Dict[str, Any]:
-    pil = None
+    """
+    Decodifica la imagen UNA vez (ImageArtifact) y la registra en proceso.
+    Al estado solo va la referencia + metadatos (_tmp.image_ref,
+    image_format, image_size); infer_local y ask_gpt41_vision la resuelven
+    con get_artifact() en lugar de volver a decodificar o re-codificar.
+    """
+    artifact = None
 
     # bytes directos
     img_bytes = state.get("image_bytes")
     if isinstance(img_bytes, (bytes, bytearray)) and len(img_bytes) > 0:
         try:
-            pil = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+            artifact = decode_artifact(img_bytes, _min_size())
         except Exception:
-            pil = None
+            artifact = None
 
     # ruta temporal (por si la usas)
-    if pil is None:
+    if artifact is None:
         img_path = state.get("_tmp", {}).get("image_path")
         if img_path and os.path.exists(img_path):
             try:
-                pil = Image.open(img_path).convert("RGB")
+                artifact = decode_artifact(img_path, _min_size())
             except Exception:
-                pil = None
+                artifact = None
 
     # URL no la abrimos aquí para no hacer IO; si la usas, ya tendrás bytes.
 
-    if pil is None:
+    if artifact is None:
         # Solo devolvemos mensajes y _tmp. NO tocamos image_bytes.
         return {
             "messages": [{
@@ -38,11 +58,11 @@ def ensure_image(state: ChatVisionState) -> Dict[str, Any]:
                     "Sube una JPG/PNG directa (ideal < 5 MB)."
                 )
             }],
-            "_tmp": {**state.get("_tmp", {}), "image_ok": False}
+            "_tmp": {**_without_ref(state.get("_tmp", {})), "image_ok": False}
         }
 
+    register(artifact)
     return {
-        # Guardamos el PIL para los siguientes nodos
-        "pil_image": pil,
-        "_tmp": {**state.get("_tmp", {}), "image_ok": True},
+        # Nada de PIL en el estado: solo la referencia al artefacto
+        "_tmp": {**state.get("_tmp", {}), **artifact.meta(), "image_ok": True},
     }
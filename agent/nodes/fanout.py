@@ -0,0 +1,133 @@
+# agent/nodes/fanout.py
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import os
+import time
+
+from agent.nodes.wiki_fullpage import fetch_wikipedia_fullpage, afetch_wikipedia_fullpage
+from agent.nodes.ddg_search import retrieve_ddg
+
+"""
+Ramas paralelas wiki ‖ ddg (build_graph(fanout=True)) que se unen en merge_context.
+
+Cada rama tiene su propio timeout: si vence, la rama responde 'timeout' y
+merge_context sigue con lo que haya llegado (la otra fuente no espera).
+  - state['wiki_timeout_s'] / FANOUT_WIKI_TIMEOUT_S (def. 8 s)
+  - state['ddg_timeout_s']  / FANOUT_DDG_TIMEOUT_S  (def. 4 s)
+
+Las dos ramas corren en el mismo superstep, así que NO escriben en `_tmp`
+(canal de último valor: dos escrituras a la vez son un error en LangGraph).
+Cada una publica su estado en `fanout` (reducer que mezcla dicts) y sus
+payloads en claves propias (`wiki`, `ddg`); merge_context lo vuelca a `_tmp`.
+Esas claves persisten entre turnos: una rama que no acaba en 'ok' (timeout,
+error, not_found) las pone a None para no arrastrar el payload del turno anterior.
+"""
+
+FANOUT_WIKI_TIMEOUT_S = float(os.getenv("FANOUT_WIKI_TIMEOUT_S", "8"))
+FANOUT_DDG_TIMEOUT_S = float(os.getenv("FANOUT_DDG_TIMEOUT_S", "4"))
+
+# Hilos propios para poder abandonar una rama lenta sin bloquear el nodo
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("FANOUT_WORKERS", "8")), thread_name_prefix="fanout")
+
+
+# Estados de retrieve_ddg con payload utilizable (como _format_ddg en merge_context)
+_DDG_OK = {"ok", "success"}
+
+
+def _timeout(state: Dict[str, Any], key: str, default: float) -> float:
+    try:
+        return max(0.0, float(state.get(key, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _run_sync(fn: Callable[[Dict[str, Any]], Dict[str, Any]], state: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+    """Resultado del nodo o None si vence el timeout (el hilo termina por su cuenta)."""
+    fut = _pool.submit(fn, state)
+    try:
+        return fut.result(timeout=timeout)
+    except FutureTimeout:
+        fut.cancel()
+        return None
+
+
+def _elapsed_ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000.0, 1)
+
+
+# -----------------------
+# Traducción de salidas de los nodos -> deltas sin conflicto
+# -----------------------
+def _wiki_delta(out: Optional[Dict[str, Any]], ms: float) -> Dict[str, Any]:
+    if out is None:
+        return {"fanout": {"wiki_status": "timeout", "wiki_ms": ms}, "wiki": None}
+    tmp = out.get("_tmp") or {}
+    branch: Dict[str, Any] = {"wiki_status": tmp.get("wiki_status", "error"), "wiki_ms": ms}
+    for k in ("wiki_source", "latin_name"):
+        if k in tmp:
+            branch[k] = tmp[k]
+    delta: Dict[str, Any] = {"fanout": branch}
+    delta["wiki"] = out.get("wiki") if branch["wiki_status"] == "ok" else None
+    if "current_taxon" in out:
+        delta["current_taxon"] = out["current_taxon"]
+    return delta
+
+
+def _ddg_delta(out: Optional[Dict[str, Any]], ms: float) -> Dict[str, Any]:
+    if out is None:
+        return {"fanout": {"ddg_status": "timeout", "ddg_ms": ms}, "ddg": None}
+    tmp = out.get("_tmp") or {}
+    branch: Dict[str, Any] = {"ddg_status": tmp.get("ddg_status", "error"), "ddg_ms": ms}
+    if "ddg_error" in tmp:
+        branch["ddg_error"] = tmp["ddg_error"]
+    return {"fanout": branch, "ddg": tmp.get("ddg") if branch["ddg_status"] in _DDG_OK else None}
+
+
+# -----------------------
+# Nodos (sync)
+# -----------------------
+def fanout_wiki(state: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    out = _run_sync(fetch_wikipedia_fullpage, state, _timeout(state, "wiki_timeout_s", FANOUT_WIKI_TIMEOUT_S))
+    if out is None:
+        print("[fanout] wiki timeout")
+    return _wiki_delta(out, _elapsed_ms(t0))
+
+
+def fanout_ddg(state: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    out = _run_sync(retrieve_ddg, state, _timeout(state, "ddg_timeout_s", FANOUT_DDG_TIMEOUT_S))
+    if out is None:
+        print("[fanout] ddg timeout")
+    return _ddg_delta(out, _elapsed_ms(t0))
+
+
+# -----------------------
+# Nodos (asyncio)
+# -----------------------
+async def afanout_wiki(state: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    try:
+        out: Optional[Dict[str, Any]] = await asyncio.wait_for(
+            afetch_wikipedia_fullpage(state), _timeout(state, "wiki_timeout_s", FANOUT_WIKI_TIMEOUT_S)
+        )
+    except asyncio.TimeoutError:
+        print("[fanout] wiki timeout")
+        out = None
+    return _wiki_delta(out, _elapsed_ms(t0))
+
+
+async def afanout_ddg(state: Dict[str, Any]) -> Dict[str, Any]:
+    # La búsqueda DDG es síncrona: a un hilo del executor (el hilo se abandona si vence)
+    t0 = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        out: Optional[Dict[str, Any]] = await asyncio.wait_for(
+            loop.run_in_executor(_pool, retrieve_ddg, state), _timeout(state, "ddg_timeout_s", FANOUT_DDG_TIMEOUT_S)
+        )
+    except asyncio.TimeoutError:
+        print("[fanout] ddg timeout")
+        out = None
+    return _ddg_delta(out, _elapsed_ms(t0))
@@ -1,9 +1,11 @@
 # agent/nodes/finalize.py
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
 from langchain_core.messages import AIMessage
 
 from agent.prompts import PROMPT_FINALIZE
-from agent.tools.gpt import ask_gpt_text
+from agent.tools.gpt import ask_gpt_text, aask_gpt_text, stream_gpt_text, astream_gpt_text
+from agent.utils.streaming import TokenStream, token_stream
 
 # Truncador fallback
 try:
@@ -71,7 +73,21 @@ def _build_context_from_wiki(state: Dict[str, Any], latin: str) -> Dict[str, Any
     return {"context_md": context_md, "sources": sources}
 
 
-def finalize_answer(state: Dict[str, Any]) -> Dict[str, Any]:
+def _sources_from_urls(state: Dict[str, Any], latin: str, urls: List[str]) -> List[Dict[str, str]]:
+    """URLs de merge_context -> [{'title','url'}] con el título de wiki/ddg si se conoce."""
+    wiki: Dict[str, Any] = state.get("wiki") or {}
+    titles: Dict[str, str] = {}
+    for r in (state.get("ddg") or {}).get("results") or []:
+        u = r.get("url") or r.get("link")
+        if u and r.get("title"):
+            titles[u] = r["title"]
+    if wiki.get("url"):
+        titles[wiki["url"]] = wiki.get("title") or latin or "Wikipedia"
+    return [{"title": titles.get(u) or urlsplit(u).netloc or u, "url": u} for u in urls if u]
+
+
+def _prepare(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Todo lo previo a la llamada a GPT (común a la versión sync y async)."""
     w = state.get("wiki")
     print(f"[finalize] has_wiki={isinstance(w, dict)} "
           f"title={w.get('title') if isinstance(w, dict) else None} "
@@ -85,10 +101,16 @@ def finalize_answer(state: Dict[str, Any]) -> Dict[str, Any]:
         or "—"
     )
 
-    # Construye contexto desde WIKI (ya no dependemos de merge_context)
-    ctx = _build_context_from_wiki(state, latin)
-    context_md = ctx["context_md"]
-    sources: List[Dict[str, str]] = ctx["sources"]
+    tmp = state.get("_tmp", {})
+    if tmp.get("context"):
+        # Modo fanout: merge_context ya unió wiki + ddg
+        context_md = tmp["context"]
+        sources: List[Dict[str, str]] = _sources_from_urls(state, latin, tmp.get("sources") or [])
+    else:
+        # Construye contexto desde WIKI
+        ctx = _build_context_from_wiki(state, latin)
+        context_md = ctx["context_md"]
+        sources = ctx["sources"]
 
     # Transparencia del clasificador local si existe
     p1 = state.get("_tmp", {}).get("p1")
@@ -115,7 +137,21 @@ def finalize_answer(state: Dict[str, Any]) -> Dict[str, Any]:
     # DEBUG
     print(f"[finalize] latin={latin!r} ctx_len={len(prompt_context)} sources={len(sources)}")
 
-    result = ask_gpt_text(prompt)
+    return {
+        "latin": latin,
+        "prompt": prompt,
+        "context_md": context_md,
+        "sources": sources,
+        "transparency": transparency,
+    }
+
+
+def _compose(state: Dict[str, Any], prep: Dict[str, Any], result: Any, ts: Optional[TokenStream] = None) -> Dict[str, Any]:
+    latin = prep["latin"]
+    context_md = prep["context_md"]
+    sources: List[Dict[str, str]] = prep["sources"]
+    transparency = prep["transparency"]
+
     answer = result.get("answer", "").strip() if isinstance(result, dict) else str(result)
 
     if not answer:
@@ -124,11 +160,33 @@ def finalize_answer(state: Dict[str, Any]) -> Dict[str, Any]:
 
     msg = answer + (transparency if transparency else "")
 
+    if ts is not None:
+        # Lo que no llegó por tokens (fallback / transparencia) sale como último chunk
+        ts.emit(msg if ts.sent == 0 else transparency)
+
     # Cerrar conversación: limpiar efímeros y añadir mensaje
     cleaned: Dict[str, Any] = {k: v for k, v in state.items() if not str(k).startswith("_tmp")}
-    messages = list(cleaned.get("messages", [])) + [AIMessage(content=msg)]
+    final = AIMessage(content=msg, id=ts.id) if ts is not None else AIMessage(content=msg)
+    messages = list(cleaned.get("messages", [])) + [final]
     cleaned["messages"] = messages
     cleaned["current_taxon"] = latin
     cleaned["sources"] = sources
 
     return cleaned
+
+
+def finalize_answer(state: Dict[str, Any]) -> Dict[str, Any]:
+    prep = _prepare(state)
+    ts = token_stream(state, "finalize_answer")
+    if ts is None:
+        return _compose(state, prep, ask_gpt_text(prep["prompt"]))
+    # Streaming: el usuario ve los primeros tokens sin esperar la respuesta entera
+    return _compose(state, prep, stream_gpt_text(prep["prompt"], ts.emit), ts)
+
+
+async def afinalize_answer(state: Dict[str, Any]) -> Dict[str, Any]:
+    prep = _prepare(state)
+    ts = token_stream(state, "finalize_answer")
+    if ts is None:
+        return _compose(state, prep, await aask_gpt_text(prep["prompt"]))
+    return _compose(state, prep, await astream_gpt_text(prep["prompt"], ts.emit), ts)
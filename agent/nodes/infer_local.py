@@ -1,12 +1,16 @@
 # agent/nodes/infer_local.py
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
-import io
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
 from PIL import Image
 
+from agent.utils.images import decode_image
+from agent.utils.image_artifact import get_artifact
+
 # Tool de visión (TorchScript real)
 try:
-    from agent.tools.vision import infer as _vision_infer  # type: ignore
+    from agent.tools.vision import infer as _vision_infer, ainfer as _vision_ainfer, input_hw  # type: ignore
+    from agent.tools.vision import model_fingerprint as _model_fingerprint  # type: ignore
 except Exception as e:
     raise RuntimeError(f"agent.tools.vision.infer no disponible: {e}")
 
@@ -18,6 +22,19 @@ except Exception:
 
 _LATIN_TO_LABEL: Dict[str, str] = {v: k for k, v in LABEL_TO_LATIN.items()}
 
+# Caché de clasificación (SHA-256 exacto + dHash opcional)
+try:
+    from agent.tools.vision_cache import get_classification_cache, sha256_bytes, dhash  # type: ignore
+except Exception:
+    get_classification_cache = None  # type: ignore[assignment]
+
+# Prefetch especulativo de Wikipedia para los candidatos (opcional)
+try:
+    from agent.tools.prefetch import prefetch as _prefetch, WIKI_PREFETCH_TOPK  # type: ignore
+except Exception:
+    _prefetch = None
+    WIKI_PREFETCH_TOPK = 0
+
 
 def _to_label(item: Dict[str, Any]) -> Optional[str]:
     """
@@ -34,47 +51,94 @@ def _to_label(item: Dict[str, Any]) -> Optional[str]:
     return None
 
 
-def infer_local(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Ejecuta clasificador TorchScript y devuelve SOLO labels + métricas.
+def _error(state: Dict[str, Any], error: str) -> Dict[str, Any]:
+    # Devolver en _tmp anidado para coherencia
+    tmp = dict(state.get("_tmp", {}))
+    tmp["error"] = error
+    print(f"[infer_local] ERROR: {error}")
+    return {"_tmp": tmp}
 
-    Entrada (state):
-      - image_bytes: bytes (requerido)
 
-    Salida (mergea en state['_tmp']):
-      - p1, p2, margin, entropy: float
-      - topk_list: [{"label": str, "prob": float}, ...]
-      - preds: [(label: str, prob: float), ...]   # equivalente a topk_list pero en tupla
-      - pred_label: str                            # label del top-1 normalizado
-      - need_fallback: True                        # si no hay label utilizable
-      - error: str                                 # si hay error
-    """
+def _decode(state: Dict[str, Any]) -> Tuple[Optional[Image.Image], Optional[Dict[str, Any]]]:
+    """(pil, None) o (None, delta de error)."""
     img_bytes = state.get("image_bytes")
     if not img_bytes:
-        # Devolver en _tmp anidado para coherencia
-        tmp = dict(state.get("_tmp", {}))
-        tmp["error"] = "no_image"
-        print("[infer_local] ERROR: no_image")
-        return {"_tmp": tmp}
+        return None, _error(state, "no_image")
 
-    # Bytes -> PIL
+    # Bytes -> PIL (JPEG reducido a la entrada del modelo)
     try:
-        pil = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+        h, w = input_hw()
+        return decode_image(img_bytes, (w, h)), None
     except Exception as e:
-        tmp = dict(state.get("_tmp", {}))
-        tmp["error"] = f"bad_image: {e}"
-        print(f"[infer_local] ERROR: bad_image: {e}")
-        return {"_tmp": tmp}
+        return None, _error(state, f"bad_image: {e}")
 
-    topk = int(state.get("topk", 5))
+
+def _prepare(state: Dict[str, Any], topk: int) -> Dict[str, Any]:
+    """
+    Caché -> decodificación. Devuelve un 'job':
+      - error:  delta de error (no_image / bad_image)
+      - cached: payload de vision.infer si hubo acierto (+ cache_hit exact|near)
+      - pil:    imagen a clasificar (+ sha/phash para guardar el resultado)
+    """
+    cache = get_classification_cache() if get_classification_cache else None
+    if cache is not None:
+        # Las entradas son del modelo que las produjo: sin huella, sin caché
+        try:
+            model = _model_fingerprint()
+        except Exception as e:
+            print(f"[infer_local] caché de visión omitida (sin huella del modelo): {e}")
+            cache = None
+    artifact = get_artifact(state)   # decodificada ya por ensure_image
+    img_bytes = artifact.data if artifact is not None else state.get("image_bytes")
+    job: Dict[str, Any] = {"cache": cache}
+
+    if cache is not None and img_bytes:
+        job["model"] = model
+        job["sha"] = artifact.sha256 if artifact is not None else sha256_bytes(img_bytes)
+        hit = cache.get_exact(job["sha"], topk, model)
+        if hit is not None:
+            return {"cached": hit, "cache_hit": "exact"}
+
+    if artifact is not None:
+        pil = artifact.pil
+    else:
+        pil, err = _decode(state)
+        if err is not None:
+            return {"error": err}
+    job["pil"] = pil
+
+    if cache is not None and "sha" in job:
+        if cache.near_enabled:
+            job["phash"] = dhash(pil)
+            hit = cache.get_near(job["phash"], topk, model)
+            if hit is not None:
+                # La próxima vez estos mismos bytes serán acierto exacto
+                cache.put(job["sha"], topk, hit, job["phash"], model)
+                return {"cached": hit, "cache_hit": "near"}
+        cache.miss()
+    return job
+
+
+def _remember(job: Dict[str, Any], topk: int, result: Dict[str, Any]) -> None:
+    cache = job.get("cache")
+    if cache is not None and "sha" in job:
+        cache.put(job["sha"], topk, result, job.get("phash"), job["model"])
+
+
+def _start_prefetch(state: Dict[str, Any], norm_topk: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Lanza en segundo plano la wiki de los top-N candidatos (sin esperar): {latin: future}."""
+    n = int(state.get("prefetch_topk", WIKI_PREFETCH_TOPK))
+    if _prefetch is None or n <= 0:
+        return {}
+    latins = [LABEL_TO_LATIN.get(d["label"]) for d in norm_topk[:n]]
     try:
-        result = _vision_infer(pil, topk=topk)  # <- llama a la TOOL real
+        return _prefetch([x for x in latins if x])
     except Exception as e:
-        tmp = dict(state.get("_tmp", {}))
-        tmp["error"] = f"infer_failed: {e}"
-        print(f"[infer_local] ERROR: infer_failed: {e}")
-        return {"_tmp": tmp}
+        print(f"[infer_local] prefetch ignorado: {e}")
+        return {}
+
 
+def _delta(state: Dict[str, Any], result: Dict[str, Any], cache_hit: Optional[str] = None) -> Dict[str, Any]:
     raw_topk = result.get("topk") or []
     metrics = result.get("metrics") or {}
 
@@ -98,6 +162,7 @@ def infer_local(state: Dict[str, Any]) -> Dict[str, Any]:
             print("[infer_local] Ignorado (no mapea a label):", it)
 
     pred_label: Optional[str] = norm_topk[0]["label"] if norm_topk else None
+    prefetched = _start_prefetch(state, norm_topk)
 
     # Construir salida anidada coherente con el resto de nodos
     tmp = dict(state.get("_tmp", {}))
@@ -108,6 +173,13 @@ def infer_local(state: Dict[str, Any]) -> Dict[str, Any]:
         "entropy": entropy,
         "topk_list": norm_topk,
     })
+    if prefetched:
+        tmp["wiki_prefetch"] = list(prefetched)
+        tmp["prefetch"] = prefetched          # futures de esta ejecución (settle en el nodo wiki)
+    else:
+        tmp.pop("prefetch", None)             # los de un turno anterior ya no son de esta ejecución
+    if cache_hit:
+        tmp["vision_cache"] = cache_hit
 
     if pred_label:
         tmp["pred_label"] = pred_label
@@ -122,3 +194,56 @@ def infer_local(state: Dict[str, Any]) -> Dict[str, Any]:
     print(f"[infer_local] p1={tmp['p1']:.6f} margin={tmp['margin']:.6f} entropy={tmp['entropy']:.6f}")
 
     return {"_tmp": tmp}
+
+
+def infer_local(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ejecuta clasificador TorchScript y devuelve SOLO labels + métricas.
+
+    Entrada (state):
+      - _tmp.image_ref: artefacto de ensure_image (sin re-decodificar), o
+      - image_bytes: bytes
+
+    Salida (mergea en state['_tmp']):
+      - p1, p2, margin, entropy: float
+      - topk_list: [{"label": str, "prob": float}, ...]
+      - preds: [(label: str, prob: float), ...]   # equivalente a topk_list pero en tupla
+      - pred_label: str                            # label del top-1 normalizado
+      - need_fallback: True                        # si no hay label utilizable
+      - vision_cache: "exact"|"near"               # si el resultado salió de la caché
+      - wiki_prefetch: [latin, ...]                # wiki lanzada en segundo plano
+      - prefetch: {latin: Future}                  # sus futures (el nodo wiki los asienta)
+      - error: str                                 # si hay error
+    """
+    topk = int(state.get("topk", 5))
+    job = _prepare(state, topk)
+    if "error" in job:
+        return job["error"]
+    if "cached" in job:
+        return _delta(state, job["cached"], job["cache_hit"])
+
+    try:
+        result = _vision_infer(job["pil"], topk=topk)  # <- llama a la TOOL real
+    except Exception as e:
+        return _error(state, f"infer_failed: {e}")
+
+    _remember(job, topk, result)
+    return _delta(state, result)
+
+
+async def ainfer_local(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Igual que infer_local; decodificación y forward fuera del event loop."""
+    topk = int(state.get("topk", 5))
+    job = await asyncio.to_thread(_prepare, state, topk)
+    if "error" in job:
+        return job["error"]
+    if "cached" in job:
+        return _delta(state, job["cached"], job["cache_hit"])
+
+    try:
+        result = await _vision_ainfer(job["pil"], topk=topk)
+    except Exception as e:
+        return _error(state, f"infer_failed: {e}")
+
+    _remember(job, topk, result)
+    return _delta(state, result)
@@ -59,7 +59,9 @@ def _collect_sources(wiki: Dict[str, Any], ddg: Dict[str, Any], max_sources: int
     return uniq
 
 def merge_context(state: Dict[str, Any]) -> Dict[str, Any]:
-    tmp_in = state.get("_tmp", {}) or {}
+    # En modo fanout cada rama deja su estado en state['fanout'] (no en _tmp)
+    branches = state.get("fanout") or {}
+    tmp_in = {**(state.get("_tmp", {}) or {}), **branches}
 
     # ¿Están listas las dos ramas?
     wiki_status = tmp_in.get("wiki_status")
@@ -67,8 +69,12 @@ def merge_context(state: Dict[str, Any]) -> Dict[str, Any]:
 
     fanout_ready = bool(wiki_status is not None and ddg_status is not None)
 
-    wiki = state.get("wiki") or {}
-    ddg  = tmp_in.get("ddg") or state.get("ddg") or {}
+    # Solo el payload de una rama 'ok' (sin estado: llamada directa, se usa tal cual);
+    # si no, `wiki`/`ddg` pueden ser los del turno anterior
+    wiki = (state.get("wiki") or {}) if wiki_status in (None, "ok") else {}
+    # En fanout el payload de ddg está en state['ddg']; en secuencial, en _tmp
+    ddg_in = (state.get("ddg") if "ddg_status" in branches else tmp_in.get("ddg") or state.get("ddg")) or {}
+    ddg  = ddg_in if ddg_status in (None, "ok", "success") else {}
 
     # Construir (parcial o completo)
     title = wiki.get("title") or state.get("current_taxon") or ""
@@ -97,4 +103,7 @@ def merge_context(state: Dict[str, Any]) -> Dict[str, Any]:
         "sources": _collect_sources(wiki, ddg),
         "fanout_ready": fanout_ready,          # 👈 bandera de “ya llegaron wiki y ddg”
     }
+    if "fanout" in state:
+        # Consumido: se reinicia para el siguiente turno
+        return {"_tmp": out_tmp, "fanout": None}
     return {"_tmp": out_tmp}
@@ -1,11 +1,12 @@
 # agent/nodes/qa_about_taxon.py
 from __future__ import annotations
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from langchain_core.messages import AIMessage
 
 from agent.prompts import PROMPT_QA_TAXON  # prompt bilingüe
 from agent.utils.text import truncate
-from agent.tools.gpt import ask_gpt_text
+from agent.tools.gpt import ask_gpt_text, aask_gpt_text, stream_gpt_text, astream_gpt_text
+from agent.utils.streaming import TokenStream, token_stream
 
 
 def last_user_utterance(state: Dict[str, Any]) -> str:
@@ -17,39 +18,69 @@ def last_user_utterance(state: Dict[str, Any]) -> str:
     return ""
 
 
-def qa_about_taxon(state: Dict[str, Any]) -> Dict[str, Any]:
-    latin = state.get("current_taxon")
-    if not latin:
-        msg = (
-            "Necesito primero una imagen para identificar la especie antes de responder preguntas."
-        )
-        return {
-            **state,
-            "messages": list(state.get("messages", []))
-            + [AIMessage(content=msg)],
-        }
+def _no_taxon(state: Dict[str, Any]) -> Dict[str, Any]:
+    msg = (
+        "Necesito primero una imagen para identificar la especie antes de responder preguntas."
+    )
+    return {
+        **state,
+        "messages": list(state.get("messages", []))
+        + [AIMessage(content=msg)],
+    }
+
 
+def _qa_prompt(state: Dict[str, Any], latin: str) -> str:
     question = last_user_utterance(state)
     context = state.get("context_md", "")
     context = truncate(context, max_chars=4000)
 
     # Construir prompt completo
-    prompt = PROMPT_QA_TAXON.format(
+    return PROMPT_QA_TAXON.format(
         latin=latin,
         context=context,
         question=question,
     )
 
-    # Llamada al modelo textual
-    result = ask_gpt_text(prompt)
+
+def _qa_output(state: Dict[str, Any], result: Any, ts: Optional[TokenStream] = None) -> Dict[str, Any]:
     answer = (
         result.get("answer")
         if isinstance(result, dict)
         else str(result)
     )
 
+    if ts is not None:
+        if ts.sent == 0:
+            ts.emit(answer or "")
+        message = AIMessage(content=answer, id=ts.id)
+    else:
+        message = AIMessage(content=answer)
+
     return {
         **state,
-        "messages": list(state.get("messages", [])) + [AIMessage(content=answer)],
+        "messages": list(state.get("messages", [])) + [message],
         "_tmp": {**state.get("_tmp", {}), "qa_answered": True},
     }
+
+
+def qa_about_taxon(state: Dict[str, Any]) -> Dict[str, Any]:
+    latin = state.get("current_taxon")
+    if not latin:
+        return _no_taxon(state)
+
+    # Llamada al modelo textual (en streaming si el run emite tokens)
+    ts = token_stream(state, "qa_about_taxon")
+    if ts is None:
+        return _qa_output(state, ask_gpt_text(_qa_prompt(state, latin)))
+    return _qa_output(state, stream_gpt_text(_qa_prompt(state, latin), ts.emit), ts)
+
+
+async def aqa_about_taxon(state: Dict[str, Any]) -> Dict[str, Any]:
+    latin = state.get("current_taxon")
+    if not latin:
+        return _no_taxon(state)
+
+    ts = token_stream(state, "qa_about_taxon")
+    if ts is None:
+        return _qa_output(state, await aask_gpt_text(_qa_prompt(state, latin)))
+    return _qa_output(state, await astream_gpt_text(_qa_prompt(state, latin), ts.emit), ts)
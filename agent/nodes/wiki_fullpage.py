@@ -1,7 +1,10 @@
 # agent/nodes/wiki_fullpage.py
 from __future__ import annotations
-from typing import Any, Dict
-from agent.tools.wiki import fetch_fullpage
+from typing import Any, Dict, Optional
+import asyncio
+from agent.tools.wiki import fetch_fullpage, afetch_fullpage
+from agent.tools.wiki_pack import lookup as _pack_lookup
+from agent.tools import prefetch as _prefetch
 
 def _normalize_binomial(name: str) -> str:
     if not name:
@@ -15,19 +18,46 @@ def _normalize_binomial(name: str) -> str:
     tail = " ".join(parts[2:])
     return f"{genus} {species}" + (f" {tail}" if tail else "")
 
+def _from_pack(latin: str, tmp_in: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # 0º paquete offline (mmap, sin red); la red solo para taxones no empaquetados
+    try:
+        page = _pack_lookup(latin)
+        if page and page.get("status") == "ok":
+            return {"wiki": page, "_tmp": {**tmp_in, "wiki_status": "ok", "wiki_source": "pack"}}
+    except Exception as e:
+        print(f"[wiki_fullpage] PACK ERROR '{latin}': {e}")
+    return None
+
+def _ok(page: Dict[str, Any], tmp_in: Dict[str, Any], latin: str, retried: bool) -> Dict[str, Any]:
+    if not retried:
+        return {"wiki": page, "_tmp": {**tmp_in, "wiki_status": "ok"}}
+    return {
+        "wiki": page,
+        "_tmp": {**tmp_in, "wiki_status": "ok", "latin_name": latin},
+        "current_taxon": latin,
+    }
+
 def fetch_wikipedia_fullpage(state: Dict[str, Any]) -> Dict[str, Any]:
     tmp_in = state.get("_tmp", {}) or {}
     latin = tmp_in.get("latin_name") or state.get("current_taxon")
 
+    # Taxón decidido (o ninguno): fuera los prefetch de otros candidatos de
+    # esta ejecución en todas las salidas. Si el de `latin` sigue volando,
+    # fetch_fullpage se une a él (single-flight).
+    _prefetch.settle(latin, tmp_in.get("prefetch"))
+
     if not latin:
         return {"_tmp": {**tmp_in, "wiki_status": "not_found"}}
 
+    packed = _from_pack(latin, tmp_in)
+    if packed:
+        return packed
+
     # 1º intento tal cual
     try:
         page = fetch_fullpage(latin) or {}
-        status = page.get("status", "error")
-        if status == "ok":
-            return {"wiki": page, "_tmp": {**tmp_in, "wiki_status": "ok"}}
+        if page.get("status", "error") == "ok":
+            return _ok(page, tmp_in, latin, retried=False)
     except Exception as e:
         print(f"[wiki_fullpage] ERROR '{latin}': {e}")
 
@@ -36,13 +66,46 @@ def fetch_wikipedia_fullpage(state: Dict[str, Any]) -> Dict[str, Any]:
     if latin2 != latin:
         try:
             page = fetch_fullpage(latin2) or {}
-            status = page.get("status", "error")
-            if status == "ok":
-                return {
-                    "wiki": page,
-                    "_tmp": {**tmp_in, "wiki_status": "ok", "latin_name": latin2},
-                    "current_taxon": latin2,
-                }
+            if page.get("status", "error") == "ok":
+                return _ok(page, tmp_in, latin2, retried=True)
+        except Exception as e:
+            print(f"[wiki_fullpage] RETRY ERROR '{latin2}': {e}")
+
+    return {"_tmp": {**tmp_in, "wiki_status": "not_found"}}
+
+async def afetch_wikipedia_fullpage(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Misma lógica que fetch_wikipedia_fullpage con HTTP asíncrono (para ainvoke/astream)."""
+    tmp_in = state.get("_tmp", {}) or {}
+    latin = tmp_in.get("latin_name") or state.get("current_taxon")
+
+    _prefetch.settle(latin, tmp_in.get("prefetch"))
+
+    if not latin:
+        return {"_tmp": {**tmp_in, "wiki_status": "not_found"}}
+
+    packed = _from_pack(latin, tmp_in)
+    if packed:
+        return packed
+
+    # El prefetch corre en un hilo: lo esperamos sin bloquear y luego es acierto de caché
+    running = _prefetch.pending(latin)
+    if running is not None:
+        # wait() no propaga el resultado: si el prefetch falló, la petición normal reintenta
+        await asyncio.wait([asyncio.wrap_future(running)])
+
+    try:
+        page = await afetch_fullpage(latin) or {}
+        if page.get("status", "error") == "ok":
+            return _ok(page, tmp_in, latin, retried=False)
+    except Exception as e:
+        print(f"[wiki_fullpage] ERROR '{latin}': {e}")
+
+    latin2 = _normalize_binomial(latin)
+    if latin2 != latin:
+        try:
+            page = await afetch_fullpage(latin2) or {}
+            if page.get("status", "error") == "ok":
+                return _ok(page, tmp_in, latin2, retried=True)
         except Exception as e:
             print(f"[wiki_fullpage] RETRY ERROR '{latin2}': {e}")
 
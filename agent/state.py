@@ -4,6 +4,12 @@ from typing import TypedDict, Annotated, Optional, Sequence, Literal, Any, Dict
 from langgraph.graph.message import add_messages
 from langchain_core.messages import AnyMessage
 
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reducer para ramas paralelas: mezcla claves; None reinicia el canal."""
+    if right is None:
+        return {}
+    return {**(left or {}), **right}
+
 class ChatVisionState(TypedDict, total=False):
     # MENSAJES (¡en plural!)
     messages: Annotated[Sequence[AnyMessage], add_messages]
@@ -14,10 +20,18 @@ class ChatVisionState(TypedDict, total=False):
 
     # OPCIONALES / PARÁMETROS
     topk: int
+    stream_tokens: bool            # opt-in: emitir tokens de finalize/qa por stream_mode="custom"
+    prefetch_topk: int             # candidatos cuya wiki se prefetchea en infer_local (0 = off)
     accept_policy: Literal["entropy", "confidence", "margin"]
     accept_threshold: float
     current_taxon: Optional[str]
     wiki: Dict[str, Any]           # 👈 MUY IMPORTANTE (title, url, plain_text, infobox, status)
+    ddg: Dict[str, Any]            # payload de retrieve_ddg (modo fanout)
+
+    # FAN-OUT wiki ‖ ddg (build_graph(fanout=True))
+    wiki_timeout_s: float
+    ddg_timeout_s: float
+    fanout: Annotated[Dict[str, Any], merge_dicts]   # estado por rama; merge_context lo vuelca a _tmp
 
 
     # ⚠️ EPHEMERAL (debe existir para que LangGraph no lo “ignore”)
@@ -0,0 +1,187 @@
+# agent/tools/backends.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Type, Union
+import hashlib
+import json
+import os
+import zipfile
+
+import torch
+
+"""
+Backends de inferencia del clasificador. vision.load_model abre uno según
+MONKEY_BACKEND y vision.infer solo hace `backend(x)`:
+
+  backend(x: Tensor[N,3,H,W]) -> logits Tensor[N,C]
+  backend.meta    metadatos embebidos por model_export (input, precision, ...)
+  backend.folded  True si espera uint8 con la normalización dentro
+
+  - torchscript: torch.jit.load (el camino de siempre; también int8)
+  - onnx:        ONNX Runtime sobre el .onnx de `model_export onnx`
+                 (opcional: pip install onnxruntime)
+
+backend.optimize() prepara el modelo para inferencia: en TorchScript,
+torch.jit.freeze + optimize_for_inference, con el módulo congelado cacheado
+en disco (MONKEY_OPT_CACHE_DIR) para que un reinicio no repita el trabajo;
+ONNX Runtime ya optimiza el grafo al crear la sesión.
+"""
+
+# Nombre de los metadatos en el .pt (_extra_files) y en el .onnx (metadata_props)
+META_KEY = "preprocess.json"
+
+# Hilos intra-op de ONNX Runtime (0 = los que decida ORT)
+ORT_THREADS = int(os.getenv("MONKEY_ORT_THREADS", "0"))
+
+
+def _default_opt_cache_dir() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return str(Path(base) / "monoagent" / "models")
+
+
+# Módulos congelados ('off' desactiva la caché en disco)
+OPT_CACHE_DIR = os.getenv("MONKEY_OPT_CACHE_DIR", _default_opt_cache_dir())
+
+
+class InferenceBackend:
+    name = "base"
+
+    def __init__(self, path: Union[str, Path], meta: Dict[str, Any]) -> None:
+        self.path = Path(path)
+        self.meta = meta
+        self.optimized: Optional[str] = None   # "cache" | "fresh" tras optimize()
+
+    def optimize(self, cache_dir: Optional[str] = None) -> None:
+        """Prepara el modelo para inferencia (no-op por defecto)."""
+
+    @property
+    def folded(self) -> bool:
+        return self.meta.get("input") == "uint8"
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.path.name})"
+
+
+def peek_torchscript_meta(path: Union[str, Path]) -> Dict[str, Any]:
+    # Un .pt de TorchScript es un zip: <archivo>/extra/<nombre>
+    try:
+        with zipfile.ZipFile(path) as zf:
+            name = next((n for n in zf.namelist() if n.endswith(f"/extra/{META_KEY}")), None)
+            return json.loads(zf.read(name)) if name else {}
+    except (zipfile.BadZipFile, ValueError):
+        return {}
+
+
+def load_torchscript(path: Union[str, Path]) -> Tuple[Any, Dict[str, Any]]:
+    """TorchScript + metadatos embebidos por model_export ({} si no hay)."""
+    meta = peek_torchscript_meta(path)
+    # Los pesos int8 se re-empaquetan al cargar para el motor activo: tiene
+    # que ser el mismo con el que se cuantizó
+    engine = meta.get("quantized_engine")
+    if engine and engine in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = engine
+    return torch.jit.load(str(path), map_location="cpu").eval(), meta
+
+
+class TorchScriptBackend(InferenceBackend):
+    name = "torchscript"
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        module, meta = load_torchscript(path)
+        super().__init__(path, meta)
+        self.module = module
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        return self.module(x)
+
+    def optimize(self, cache_dir: Optional[str] = None) -> None:
+        if self.optimized:
+            return
+        cache_dir = OPT_CACHE_DIR if cache_dir is None else cache_dir
+        frozen, self.optimized = self._frozen(_opt_cache_path(cache_dir, self.path))
+        # optimize_for_inference no es serializable: se aplica en cada arranque
+        # sobre el módulo congelado (barato comparado con freeze)
+        try:
+            self.module = torch.jit.optimize_for_inference(frozen)
+        except Exception as e:
+            print(f"[backends] optimize_for_inference omitido: {e}")
+            self.module = frozen
+
+    def _frozen(self, cached: Optional[Path]) -> Tuple[Any, str]:
+        if cached is not None and cached.exists():
+            try:
+                return torch.jit.load(str(cached), map_location="cpu"), "cache"
+            except Exception as e:
+                print(f"[backends] caché de modelo inválida ({cached}): {e}")
+
+        frozen = torch.jit.freeze(self.module)
+        if cached is not None:
+            try:
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+                torch.jit.save(frozen, str(tmp), _extra_files={META_KEY: json.dumps(self.meta)})
+                os.replace(tmp, cached)
+            except Exception as e:
+                print(f"[backends] no pude cachear el modelo congelado: {e}")
+        return frozen, "fresh"
+
+
+def _opt_cache_path(cache_dir: Optional[str], path: Path) -> Optional[Path]:
+    """<cache_dir>/<modelo>-<hash>.frozen.pt; el hash cubre contenido, torch y motor int8."""
+    if not cache_dir or cache_dir.lower() in {"off", "none", "0"}:
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    h.update(f"{torch.__version__}|{torch.backends.quantized.engine}".encode())
+    return Path(cache_dir) / f"{path.stem}-{h.hexdigest()[:16]}.frozen.pt"
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    name = "onnx"
+
+    def __init__(self, path: Union[str, Path], threads: int = ORT_THREADS) -> None:
+        try:
+            import onnxruntime as ort  # type: ignore
+        except Exception as e:
+            raise RuntimeError(f"MONKEY_BACKEND=onnx necesita onnxruntime: {e}")
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(path), sess_options=opts, providers=["CPUExecutionProvider"])
+        raw = self.session.get_modelmeta().custom_metadata_map.get(META_KEY) or ""
+        super().__init__(path, json.loads(raw) if raw else {})
+        self._input = self.session.get_inputs()[0].name
+
+    def optimize(self, cache_dir: Optional[str] = None) -> None:
+        self.optimized = "session"   # ORT_ENABLE_ALL al crear la sesión
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        (logits,) = self.session.run(None, {self._input: x.contiguous().numpy()})
+        return torch.from_numpy(logits)
+
+
+BACKENDS: Dict[str, Type[InferenceBackend]] = {
+    TorchScriptBackend.name: TorchScriptBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+}
+
+SUFFIXES = {TorchScriptBackend.name: ".pt", OnnxRuntimeBackend.name: ".onnx"}
+
+
+def backend_for(path: Union[str, Path]) -> str:
+    return OnnxRuntimeBackend.name if Path(path).suffix.lower() == ".onnx" else TorchScriptBackend.name
+
+
+def open_backend(path: Union[str, Path], name: Optional[str] = None) -> InferenceBackend:
+    """Backend `name` (o el que corresponda a la extensión) sobre `path`."""
+    name = name or backend_for(path)
+    if name not in BACKENDS:
+        raise ValueError(f"backend desconocido: {name} (opciones: {', '.join(BACKENDS)})")
+    return BACKENDS[name](path)
@@ -1,11 +1,20 @@
 # agent/tools/gpt.py
 from __future__ import annotations
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+import asyncio
 import base64
 import os
 import re
+import threading
+import time
+import weakref
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from agent.utils.singleflight import SingleFlight, fingerprint
+from agent.tools.gpt_cache import GPT_CACHE, ResponseCache, get_response_cache
+from agent.utils.images import image_mime, prepare_vision_payload
 
 try:
     from agent.prompts import PROMPT_BINOMIAL
@@ -14,12 +23,156 @@ except Exception:
 
 _BINOMIAL_RE = re.compile(r"^[A-Z][a-z]+ [a-z]+$")
 
+# Peticiones idénticas concurrentes comparten una sola llamada a OpenAI
+_flight = SingleFlight()
+
+# -----------------------
+# Cliente compartido (pool HTTP + reintentos)
+# -----------------------
+# El SDK reintenta 408/409/429/5xx y errores de conexión con backoff
+# exponencial + jitter (respeta Retry-After); aquí solo acotamos el número.
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_POOL_MAXSIZE = int(os.getenv("OPENAI_POOL_MAXSIZE", "16"))
+
+# Imagen enviada a la verificación por visión: lado mayor, formato (jpeg|webp)
+# y calidad. Menos bytes = menos latencia de subida y menos tokens de visión.
+GPT_VISION_MAX_SIDE = int(os.getenv("GPT_VISION_MAX_SIDE", "768"))
+GPT_VISION_FORMAT = os.getenv("GPT_VISION_FORMAT", "jpeg").upper()
+GPT_VISION_QUALITY = int(os.getenv("GPT_VISION_QUALITY", "85"))
+
+ClientKey = Tuple[str, Optional[str]]
+
+_clients: Dict[ClientKey, OpenAI] = {}
+_clients_lock = threading.Lock()
+# AsyncOpenAI (httpx.AsyncClient) queda ligado a su event loop: uno por loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+
+def _client_key() -> Optional[ClientKey]:
+    # Se lee en cada llamada: OPENAI_BASE_URL permite apuntar a un servidor
+    # compatible (local / tests) sin tocar código
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    return api_key, (os.getenv("OPENAI_BASE_URL") or None)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=OPENAI_POOL_MAXSIZE, max_keepalive_connections=OPENAI_POOL_MAXSIZE)
+
+
+def get_client() -> Optional[OpenAI]:
+    """Cliente OpenAI del proceso (None si falta OPENAI_API_KEY)."""
+    key = _client_key()
+    if key is None:
+        return None
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = OpenAI(
+                api_key=key[0],
+                base_url=key[1],
+                max_retries=OPENAI_MAX_RETRIES,
+                timeout=OPENAI_TIMEOUT,
+                http_client=DefaultHttpxClient(limits=_limits()),
+            )
+    return client
+
+
+def get_async_client() -> Optional[AsyncOpenAI]:
+    """Cliente AsyncOpenAI del event loop actual (None si falta OPENAI_API_KEY)."""
+    key = _client_key()
+    if key is None:
+        return None
+    per_loop = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = per_loop.get(key)
+    if client is None:
+        client = per_loop[key] = AsyncOpenAI(
+            api_key=key[0],
+            base_url=key[1],
+            max_retries=OPENAI_MAX_RETRIES,
+            timeout=OPENAI_TIMEOUT,
+            http_client=DefaultAsyncHttpxClient(limits=_limits()),
+        )
+    return client
+
+
+async def aclose() -> None:
+    """Cierra los clientes AsyncOpenAI del event loop actual (llamar antes de cerrarlo)."""
+    for client in (_async_clients.pop(asyncio.get_running_loop(), None) or {}).values():
+        await client.close()
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000.0, 1)
+
+
+def _chat(messages: list, model: str, max_tokens: int, temperature: float) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Una llamada a Chat Completions con el cliente compartido.
+    Devuelve (resp | None, meta) con meta = {latency_ms, retries?, error?}.
+    """
+    client = get_client()
+    if client is None:
+        return None, {"error": "OPENAI_API_KEY missing"}
+
+    t0 = time.perf_counter()
+    try:
+        raw = client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        resp = raw.parse()
+    except Exception as e:
+        return None, {"error": str(e), "latency_ms": _ms(t0)}
+    return resp, {"latency_ms": _ms(t0), "retries": getattr(raw, "retries_taken", 0)}
+
+
+async def _achat(messages: list, model: str, max_tokens: int, temperature: float) -> Tuple[Any, Dict[str, Any]]:
+    client = get_async_client()
+    if client is None:
+        return None, {"error": "OPENAI_API_KEY missing"}
+
+    t0 = time.perf_counter()
+    try:
+        raw = await client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        resp = raw.parse()
+    except Exception as e:
+        return None, {"error": str(e), "latency_ms": _ms(t0)}
+    return resp, {"latency_ms": _ms(t0), "retries": getattr(raw, "retries_taken", 0)}
+
 def _valid_binomial(s: str) -> bool:
     return bool(s and _BINOMIAL_RE.match(s.strip()))
 
-def _bytes_to_data_url(image_bytes: bytes) -> str:
+def _bytes_to_data_url(image_bytes: bytes, mime: Optional[str] = None) -> str:
     b64 = base64.b64encode(image_bytes).decode("ascii")
-    return f"data:image/jpeg;base64,{b64}"
+    return f"data:{mime or image_mime(image_bytes)};base64,{b64}"
+
+
+def _vision_payload(image_bytes: bytes) -> Tuple[str, Dict[str, Any]]:
+    """
+    Data URL de la imagen a enviar + info {bytes_in, bytes_out, ...}.
+    Reducida a GPT_VISION_MAX_SIDE, sin EXIF/ICC y en GPT_VISION_FORMAT;
+    con GPT_VISION_MAX_SIDE=0 (o si no se puede abrir) van los bytes tal cual.
+    """
+    if GPT_VISION_MAX_SIDE > 0:
+        try:
+            data, mime, info = prepare_vision_payload(
+                image_bytes, GPT_VISION_MAX_SIDE, GPT_VISION_FORMAT, GPT_VISION_QUALITY)
+            return _bytes_to_data_url(data, mime), info
+        except Exception as e:
+            print(f"[gpt] payload de visión sin optimizar: {e}")
+    mime = image_mime(image_bytes)
+    info = {"bytes_in": len(image_bytes), "bytes_out": len(image_bytes), "mime": mime}
+    return _bytes_to_data_url(image_bytes, mime), info
 
 def ask_binomial(
     image_bytes: Optional[bytes] = None,
@@ -31,40 +184,61 @@ def ask_binomial(
 ) -> Dict[str, Any]:
     """
     Llama a OpenAI Chat Completions con entrada multimodal (texto + imagen).
-    Devuelve: { 'latin_name': str, 'status': 'ok|invalid|empty|error', 'error'?: str }
-    Requiere: OPENAI_API_KEY
+    Devuelve: { 'latin_name': str, 'status': 'ok|invalid|empty|error', 'error'?: str,
+                'latency_ms'?: float, 'retries'?: int,
+                'payload'?: {bytes_in, bytes_out, size_in, size_out, mime} (si hubo bytes) }
+    Requiere: OPENAI_API_KEY (opcional OPENAI_BASE_URL para un servidor compatible)
     """
     if not image_bytes and not (url and str(url).strip()):
         return {"status": "empty", "latin_name": ""}
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return {"status": "error", "latin_name": "", "error": "OPENAI_API_KEY missing"}
+    key = _binomial_key(image_bytes, url, prompt, model, max_tokens, temperature)
+    return dict(_flight.do(key, _ask_binomial_remote, image_bytes, url, prompt, model, max_tokens, temperature))
+
+
+async def aask_binomial(
+    image_bytes: Optional[bytes] = None,
+    url: Optional[str] = None,
+    prompt: Optional[str] = None,
+    model: str = "gpt-4o-mini",
+    max_tokens: int = 16,
+    temperature: float = 0.0,
+) -> Dict[str, Any]:
+    """Variante asyncio de ask_binomial (cliente AsyncOpenAI, sin bloquear el loop)."""
+    if not image_bytes and not (url and str(url).strip()):
+        return {"status": "empty", "latin_name": ""}
+
+    key = _binomial_key(image_bytes, url, prompt, model, max_tokens, temperature)
+    out = await _flight.do_async(key, _aask_binomial_remote, image_bytes, url, prompt, model, max_tokens, temperature)
+    return dict(out)
+
 
-    client = OpenAI(api_key=api_key)
+def _binomial_key(image_bytes, url, prompt, model, max_tokens, temperature) -> tuple:
+    # URL tiene prioridad sobre bytes (igual que en la llamada real)
+    source = url.strip() if (url and str(url).strip()) else (image_bytes or b"")
+    return ("binomial", fingerprint(source, prompt or PROMPT_BINOMIAL, model, int(max_tokens), float(temperature)))
 
-    # Prepara image_url (data URL si son bytes)
-    image_url = url.strip() if (url and str(url).strip()) else _bytes_to_data_url(image_bytes)  # type: ignore[arg-type]
-    prompt = prompt or PROMPT_BINOMIAL
 
+def _binomial_image(image_bytes: Optional[bytes], url: Optional[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    # URL tal cual; bytes -> data URL optimizada (+ info de tamaño)
+    if url and str(url).strip():
+        return url.strip(), None
+    return _vision_payload(image_bytes)  # type: ignore[arg-type]
+
+
+def _binomial_messages(image_url: str, prompt: Optional[str]) -> list:
     # Chat Completions: contenido multimodal estable
     # https://platform.openai.com/docs/guides/vision (estructura messages -> content list)
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": image_url}},
-                ],
-            }],
-            temperature=temperature,
-            max_tokens=max_tokens,
-        )
-    except Exception as e:
-        return {"status": "error", "latin_name": "", "error": str(e)}
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "text", "text": prompt or PROMPT_BINOMIAL},
+            {"type": "image_url", "image_url": {"url": image_url}},
+        ],
+    }]
 
+
+def _binomial_result(resp: Any) -> Dict[str, Any]:
     try:
         text = (resp.choices[0].message.content or "").strip()
     except Exception as e:
@@ -76,6 +250,41 @@ def ask_binomial(
     return {"status": "ok", "latin_name": text}
 
 
+def _ask_binomial_remote(
+    image_bytes: Optional[bytes],
+    url: Optional[str],
+    prompt: Optional[str],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+) -> Dict[str, Any]:
+    image_url, payload = _binomial_image(image_bytes, url)
+    resp, meta = _chat(_binomial_messages(image_url, prompt), model, max_tokens, temperature)
+    if payload is not None:
+        meta["payload"] = payload
+    if resp is None:
+        return {"status": "error", "latin_name": "", **meta}
+    return {**_binomial_result(resp), **meta}
+
+
+async def _aask_binomial_remote(
+    image_bytes: Optional[bytes],
+    url: Optional[str],
+    prompt: Optional[str],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+) -> Dict[str, Any]:
+    # Re-codificar es CPU: fuera del event loop
+    image_url, payload = await asyncio.to_thread(_binomial_image, image_bytes, url)
+    resp, meta = await _achat(_binomial_messages(image_url, prompt), model, max_tokens, temperature)
+    if payload is not None:
+        meta["payload"] = payload
+    if resp is None:
+        return {"status": "error", "latin_name": "", **meta}
+    return {**_binomial_result(resp), **meta}
+
+
 # agent/tools/gpt.py (añade al final)
 
 def ask_gpt_text(
@@ -83,27 +292,69 @@ def ask_gpt_text(
     model: str = "gpt-4.1-mini",   # o gpt-4o-mini si prefieres
     max_tokens: int = 1200,
     temperature: float = 0.2,
+    cache: Optional[bool] = None,
 ) -> Dict[str, Any]:
     """
     Llama a OpenAI Chat Completions con solo texto.
-    Devuelve: { 'answer': str, 'status': 'ok|error', 'error'?: str }
+    Devuelve: { 'answer': str, 'status': 'ok|error', 'error'?: str,
+                'latency_ms'?: float, 'retries'?: int, 'cached'?: True }
+    cache: usa la caché de respuestas (agent/tools/gpt_cache.py);
+           None -> según GPT_CACHE.
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return {"status": "error", "answer": "", "error": "OPENAI_API_KEY missing"}
+    fp = fingerprint(prompt, model, int(max_tokens), float(temperature))
+    rc = _text_cache(cache)
+    hit = _cache_hit(rc, fp)
+    if hit is not None:
+        return hit
+    return dict(_flight.do(("text", fp), _ask_gpt_text_stored, rc, fp, prompt, model, max_tokens, temperature))
 
-    client = OpenAI(api_key=api_key)
 
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=temperature,
-            max_tokens=max_tokens,
-        )
-    except Exception as e:
-        return {"status": "error", "answer": "", "error": str(e)}
+async def aask_gpt_text(
+    prompt: str,
+    model: str = "gpt-4.1-mini",
+    max_tokens: int = 1200,
+    temperature: float = 0.2,
+    cache: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Variante asyncio de ask_gpt_text (cliente AsyncOpenAI, sin bloquear el loop)."""
+    fp = fingerprint(prompt, model, int(max_tokens), float(temperature))
+    rc = _text_cache(cache)
+    hit = _cache_hit(rc, fp)
+    if hit is not None:
+        return hit
+    out = await _flight.do_async(("text", fp), _aask_gpt_text_stored, rc, fp, prompt, model, max_tokens, temperature)
+    return dict(out)
+
+
+def _text_cache(cache: Optional[bool]) -> Optional[ResponseCache]:
+    return get_response_cache() if (GPT_CACHE if cache is None else cache) else None
 
+
+def _cache_hit(rc: Optional[ResponseCache], fp: str) -> Optional[Dict[str, Any]]:
+    if rc is None:
+        return None
+    t0 = time.perf_counter()
+    hit = rc.get(fp)
+    if hit is None:
+        return None
+    return {**hit, "cached": True, "latency_ms": _ms(t0)}
+
+
+def _ask_gpt_text_stored(rc: Optional[ResponseCache], fp: str, prompt: str, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    out = _ask_gpt_text_remote(prompt, model, max_tokens, temperature)
+    if rc is not None:
+        rc.put(fp, out)
+    return out
+
+
+async def _aask_gpt_text_stored(rc: Optional[ResponseCache], fp: str, prompt: str, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    out = await _aask_gpt_text_remote(prompt, model, max_tokens, temperature)
+    if rc is not None:
+        rc.put(fp, out)
+    return out
+
+
+def _text_result(resp: Any) -> Dict[str, Any]:
     try:
         text = (resp.choices[0].message.content or "").strip()
     except Exception as e:
@@ -111,3 +362,206 @@ def ask_gpt_text(
 
     return {"status": "ok", "answer": text}
 
+
+def _ask_gpt_text_remote(prompt: str, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    resp, meta = _chat([{"role": "user", "content": prompt}], model, max_tokens, temperature)
+    if resp is None:
+        return {"status": "error", "answer": "", **meta}
+    return {**_text_result(resp), **meta}
+
+
+async def _aask_gpt_text_remote(prompt: str, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    resp, meta = await _achat([{"role": "user", "content": prompt}], model, max_tokens, temperature)
+    if resp is None:
+        return {"status": "error", "answer": "", **meta}
+    return {**_text_result(resp), **meta}
+
+
+# -----------------------
+# Streaming (deltas de texto según llegan)
+# -----------------------
+DeltaFn = Callable[[str], None]
+
+
+def _stream_kwargs(prompt: str, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    return dict(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+    )
+
+
+def _chunk_text(chunk: Any) -> str:
+    if not getattr(chunk, "choices", None):
+        return ""
+    return getattr(chunk.choices[0].delta, "content", None) or ""
+
+
+def _open_stream(prompt: str, model: str, max_tokens: int, temperature: float) -> Tuple[Any, int]:
+    """Abre el stream con el cliente compartido: (Stream, reintentos del SDK hasta abrirlo)."""
+    client = get_client()
+    if client is None:
+        raise RuntimeError("OPENAI_API_KEY missing")
+    raw = client.chat.completions.with_raw_response.create(**_stream_kwargs(prompt, model, max_tokens, temperature))
+    return raw.parse(), getattr(raw, "retries_taken", 0)
+
+
+async def _aopen_stream(prompt: str, model: str, max_tokens: int, temperature: float) -> Tuple[Any, int]:
+    client = get_async_client()
+    if client is None:
+        raise RuntimeError("OPENAI_API_KEY missing")
+    raw = await client.chat.completions.with_raw_response.create(**_stream_kwargs(prompt, model, max_tokens, temperature))
+    return raw.parse(), getattr(raw, "retries_taken", 0)
+
+
+def _iter_stream(stream: Any) -> Iterator[str]:
+    try:
+        for chunk in stream:
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+    finally:
+        stream.close()
+
+
+async def _aiter_stream(stream: Any) -> AsyncIterator[str]:
+    try:
+        async for chunk in stream:
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+    finally:
+        await stream.close()
+
+
+def ask_gpt_text_stream(
+    prompt: str,
+    model: str = "gpt-4.1-mini",
+    max_tokens: int = 1200,
+    temperature: float = 0.2,
+) -> Iterator[str]:
+    """Generador de deltas de texto (stream=True). Lanza si la llamada falla."""
+    stream, _ = _open_stream(prompt, model, max_tokens, temperature)
+    yield from _iter_stream(stream)
+
+
+async def aask_gpt_text_stream(
+    prompt: str,
+    model: str = "gpt-4.1-mini",
+    max_tokens: int = 1200,
+    temperature: float = 0.2,
+) -> AsyncIterator[str]:
+    """Variante asyncio de ask_gpt_text_stream."""
+    stream, _ = await _aopen_stream(prompt, model, max_tokens, temperature)
+    async for text in _aiter_stream(stream):
+        yield text
+
+
+def _streamed_result(parts: list, t0: float, ttft: Optional[float], retries: int, error: Optional[Exception]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"answer": "".join(parts).strip(), "latency_ms": _ms(t0), "ttft_ms": ttft, "retries": retries}
+    if error is not None:
+        out.update(status="error", error=str(error))
+    else:
+        out["status"] = "ok"
+    return out
+
+
+def stream_gpt_text(
+    prompt: str,
+    on_delta: DeltaFn,
+    model: str = "gpt-4.1-mini",
+    max_tokens: int = 1200,
+    temperature: float = 0.2,
+    cache: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Como ask_gpt_text pero entregando cada delta a `on_delta` según llega.
+    Devuelve el mismo dict que ask_gpt_text (+ 'ttft_ms'). Comparte el
+    single-flight de ask_gpt_text: si ya hay una llamada en vuelo con el mismo
+    prompt (con o sin streaming), se une a ella y, como un acierto de la caché
+    de respuestas, recibe la respuesta en un único delta. Si el stream se
+    corta, 'answer' lleva lo recibido hasta entonces y status='error'.
+    """
+    fp = fingerprint(prompt, model, int(max_tokens), float(temperature))
+    rc = _text_cache(cache)
+    hit = _cache_hit(rc, fp)
+    if hit is not None:
+        on_delta(hit.get("answer", ""))
+        return hit
+
+    led = []
+
+    def run() -> Dict[str, Any]:
+        led.append(True)
+        return _stream_gpt_text_stored(rc, fp, prompt, on_delta, model, max_tokens, temperature)
+
+    out = dict(_flight.do(("text", fp), run))
+    if not led:
+        on_delta(out.get("answer", ""))
+    return out
+
+
+def _stream_gpt_text_stored(rc: Optional[ResponseCache], fp: str, prompt: str, on_delta: DeltaFn, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    t0, ttft, parts, retries, error = time.perf_counter(), None, [], 0, None
+    try:
+        stream, retries = _open_stream(prompt, model, max_tokens, temperature)
+        for text in _iter_stream(stream):
+            if ttft is None:
+                ttft = _ms(t0)
+            parts.append(text)
+            on_delta(text)
+    except Exception as e:
+        error = e
+
+    out = _streamed_result(parts, t0, ttft, retries, error)
+    if rc is not None:
+        rc.put(fp, out)
+    return out
+
+
+async def astream_gpt_text(
+    prompt: str,
+    on_delta: DeltaFn,
+    model: str = "gpt-4.1-mini",
+    max_tokens: int = 1200,
+    temperature: float = 0.2,
+    cache: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Variante asyncio de stream_gpt_text (mismo single-flight por event loop)."""
+    fp = fingerprint(prompt, model, int(max_tokens), float(temperature))
+    rc = _text_cache(cache)
+    hit = _cache_hit(rc, fp)
+    if hit is not None:
+        on_delta(hit.get("answer", ""))
+        return hit
+
+    led = []
+
+    async def run() -> Dict[str, Any]:
+        led.append(True)
+        return await _astream_gpt_text_stored(rc, fp, prompt, on_delta, model, max_tokens, temperature)
+
+    out = dict(await _flight.do_async(("text", fp), run))
+    if not led:
+        on_delta(out.get("answer", ""))
+    return out
+
+
+async def _astream_gpt_text_stored(rc: Optional[ResponseCache], fp: str, prompt: str, on_delta: DeltaFn, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    t0, ttft, parts, retries, error = time.perf_counter(), None, [], 0, None
+    try:
+        stream, retries = await _aopen_stream(prompt, model, max_tokens, temperature)
+        async for text in _aiter_stream(stream):
+            if ttft is None:
+                ttft = _ms(t0)
+            parts.append(text)
+            on_delta(text)
+    except Exception as e:
+        error = e
+
+    out = _streamed_result(parts, t0, ttft, retries, error)
+    if rc is not None:
+        rc.put(fp, out)
+    return out
@@ -0,0 +1,187 @@
+# agent/tools/gpt_cache.py
+from __future__ import annotations
+from typing import Any, Dict, Optional
+import hashlib
+import os
+import threading
+import time
+
+from agent.utils.cache import LRUCache, SQLiteStore
+from agent.utils.singleflight import fingerprint
+
+"""
+Caché de respuestas exactas para ask_gpt_text (opt-in: GPT_CACHE=1 o cache=True)
+y de la verificación por visión de ask_gpt41_vision (VisionResultCache).
+
+Clave: fingerprint(prompt, model, max_tokens, temperature) — la misma que
+usa el single-flight. finalize_answer construye el prompt desde la página
+de Wikipedia cacheada, así que para un set fijo de etiquetas casi todos los
+prompts se repiten.
+
+  1) LRU en proceso (GPT_CACHE_MEM_SIZE)
+  2) SQLite en disco, opcional: solo si se define GPT_CACHE_PATH (p. ej.
+     ~/.cache/monoagent/gpt_cache.sqlite), acotada a GPT_CACHE_DISK_MAX
+     entradas
+TTL común GPT_CACHE_TTL. Solo se guardan respuestas 'ok'.
+"""
+
+GPT_CACHE = os.getenv("GPT_CACHE", "0") == "1"
+GPT_CACHE_TTL = float(os.getenv("GPT_CACHE_TTL", str(24 * 3600)))
+GPT_CACHE_MEM_SIZE = int(os.getenv("GPT_CACHE_MEM_SIZE", "256"))
+GPT_CACHE_DISK_MAX = int(os.getenv("GPT_CACHE_DISK_MAX", "5000"))
+
+
+GPT_CACHE_PATH = os.getenv("GPT_CACHE_PATH", "")   # vacío: solo memoria
+
+# Verificación por visión (ask_gpt41_vision): activa por defecto en memoria
+# (en disco con GPT_CACHE_PATH); misma imagen -> mismo binomial. Los 'invalid' se guardan menos tiempo (reintento barato
+# si cambia el prompt o el modelo mejora); 'error'/'empty' nunca.
+GPT_VISION_CACHE = os.getenv("GPT_VISION_CACHE", "1") == "1"
+GPT_VISION_CACHE_TTL = float(os.getenv("GPT_VISION_CACHE_TTL", str(30 * 24 * 3600)))
+GPT_VISION_CACHE_INVALID_TTL = float(os.getenv("GPT_VISION_CACHE_INVALID_TTL", str(24 * 3600)))
+
+
+class ResponseCache:
+    table = "gpt_responses"
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = GPT_CACHE_TTL,
+        mem_size: int = GPT_CACHE_MEM_SIZE,
+        disk_max: int = GPT_CACHE_DISK_MAX,
+    ) -> None:
+        self.ttl = float(ttl)
+        self.mem = LRUCache(mem_size)
+        self.disk: Optional[SQLiteStore] = None
+        if path and path.lower() not in {"off", "none", "0"}:
+            try:
+                self.disk = SQLiteStore(path, table=self.table, max_entries=disk_max)
+            except Exception as e:
+                print(f"[gpt_cache] disco desactivado ({path}): {e}")
+        self._lock = threading.Lock()
+        self._counts = {"hits_mem": 0, "hits_disk": 0, "misses": 0, "stores": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.mem.get(key)
+        if value is not None:
+            self._count("hits_mem")
+            return dict(value)
+        if self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None and entry[1] > time.time():
+                self.mem.set(key, entry[0], entry[1] - time.time())
+                self._count("hits_disk")
+                return dict(entry[0])
+        self._count("misses")
+        return None
+
+    def _ttl_for(self, result: Dict[str, Any]) -> Optional[float]:
+        return self.ttl if result.get("status") == "ok" else None
+
+    def _record(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        # Metadatos de la llamada original no aplican a un acierto
+        return {k: v for k, v in result.items() if k not in {"latency_ms", "retries", "cached"}}
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        ttl = self._ttl_for(result)
+        if ttl is None or ttl <= 0:
+            return
+        record = self._record(result)
+        self.mem.set(key, record, ttl)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, record, ttl)
+            except Exception as e:
+                print(f"[gpt_cache] no pude escribir en disco: {e}")
+        self._count("stores")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._counts)
+        lookups = out["hits_mem"] + out["hits_disk"] + out["misses"]
+        out["hit_rate"] = round((out["hits_mem"] + out["hits_disk"]) / lookups, 4) if lookups else 0.0
+        out["mem_entries"] = len(self.mem)
+        out["evictions"] = self.mem.evictions + (self.disk.evictions if self.disk is not None else 0)
+        if self.disk is not None:
+            out["disk_entries"] = len(self.disk)
+        return out
+
+    def clear(self) -> None:
+        self.mem.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        with self._lock:
+            self._counts = {k: 0 for k in self._counts}
+
+
+class VisionResultCache(ResponseCache):
+    """
+    {status, latin_name} de ask_binomial por imagen: clave = hash del
+    contenido (o la URL para image_url) + modelo + prompt.
+    """
+
+    table = "gpt_vision"
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = GPT_VISION_CACHE_TTL,
+        invalid_ttl: float = GPT_VISION_CACHE_INVALID_TTL,
+        mem_size: int = GPT_CACHE_MEM_SIZE,
+        disk_max: int = GPT_CACHE_DISK_MAX,
+    ) -> None:
+        super().__init__(path, ttl=ttl, mem_size=mem_size, disk_max=disk_max)
+        self.invalid_ttl = float(invalid_ttl)
+
+    def _ttl_for(self, result: Dict[str, Any]) -> Optional[float]:
+        status = result.get("status")
+        if status == "ok":
+            return self.ttl
+        if status == "invalid":
+            return self.invalid_ttl
+        return None
+
+    def _record(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        return {"status": result.get("status"), "latin_name": result.get("latin_name", "")}
+
+
+def vision_cache_key(image_bytes: Optional[bytes], url: Optional[str], prompt: str, model: str) -> Optional[str]:
+    """URL (si hay, igual que ask_binomial) o SHA-256 de los bytes; None si no hay imagen."""
+    if url and str(url).strip():
+        source = ("url", str(url).strip())
+    elif image_bytes:
+        source = ("sha256", hashlib.sha256(image_bytes).hexdigest())
+    else:
+        return None
+    return fingerprint(*source, model, prompt)
+
+
+_cache: Optional[ResponseCache] = None
+_vision_cache: Optional[VisionResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(GPT_CACHE_PATH)
+    return _cache
+
+
+def get_vision_cache() -> Optional[VisionResultCache]:
+    """Caché de verificación por visión o None si GPT_VISION_CACHE=0."""
+    global _vision_cache
+    if not GPT_VISION_CACHE:
+        return None
+    if _vision_cache is None:
+        with _cache_lock:
+            if _vision_cache is None:
+                _vision_cache = VisionResultCache(GPT_CACHE_PATH)
+    return _vision_cache
@@ -0,0 +1,302 @@
+# agent/tools/model_export.py
+from __future__ import annotations
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import torch
+
+from agent.tools import model_registry
+from agent.tools.backends import META_KEY, OnnxRuntimeBackend, load_torchscript
+
+"""
+Variantes exportadas del clasificador TorchScript.
+
+  python -m agent.tools.model_export fold [--model M.pt] [--labels labels.json] [--out M.u8.pt]
+  python -m agent.tools.model_export quantize --calib fotos/ [--mode static|dynamic] [--out M.int8.pt]
+  python -m agent.tools.model_export onnx [--model M.pt] [--out M.onnx]
+
+`fold` envuelve el modelo para que acepte uint8 [N,3,H,W] y aplique dentro
+la normalización de labels.json (x * 1/(255·std) - mean/std, una sola
+operación afín), y guarda ese contrato en el propio .pt (_extra_files,
+"preprocess.json"). Con MONKEY_MODEL_FILE apuntando al resultado, el camino
+en ejecución es decodificar -> resize uint8 -> forward, sin ToTensor ni
+Normalize en Python. Antes de guardar comprueba que los logits coinciden con
+los del modelo original sobre el transform de siempre.
+
+`quantize` genera la variante int8 (cuantización en modo grafo de
+TorchScript): `static` calibra las activaciones con las fotos de --calib
+(convoluciones y lineales en int8), `dynamic` solo cuantiza los pesos de
+las capas lineales y no necesita imágenes. vision.py la carga con
+MONKEY_PRECISION=int8; benchmarks/compare_precision.py la compara con fp32.
+Se cuantiza el modelo original; `fold` puede aplicarse después.
+
+`onnx` exporta el TorchScript fp32 (plegado o no) a ONNX con lote dinámico
+para MONKEY_BACKEND=onnx (agent/tools/backends.py), con los mismos
+metadatos en metadata_props, y comprueba la paridad de logits con ONNX
+Runtime si está instalado.
+"""
+
+PARITY_ATOL = 1e-4
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+class FoldedInput(torch.nn.Module):
+    """uint8 [N,3,H,W] -> logits; la normalización viaja con el modelo."""
+
+    def __init__(self, model: torch.nn.Module, mean: Sequence[float], std: Sequence[float]) -> None:
+        super().__init__()
+        self.model = model
+        mean_t = torch.tensor(list(mean), dtype=torch.float32).view(1, 3, 1, 1)
+        std_t = torch.tensor(list(std), dtype=torch.float32).view(1, 3, 1, 1)
+        self.register_buffer("scale", 1.0 / (255.0 * std_t))
+        self.register_buffer("shift", -mean_t / std_t)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.model(torch.addcmul(self.shift, x.float(), self.scale))
+
+
+def fold_normalization(model: torch.nn.Module, mean: Sequence[float], std: Sequence[float]) -> torch.jit.ScriptModule:
+    return torch.jit.script(FoldedInput(model, mean, std).eval())
+
+
+def preprocess_meta(labels_meta: Dict[str, Any]) -> Dict[str, Any]:
+    norm = labels_meta.get("normalize", {})
+    return {
+        "input": "uint8",
+        "input_size": labels_meta.get("input_size", [1, 3, 224, 224]),
+        "mean": norm.get("mean", model_registry.DEFAULT_MEAN),
+        "std": norm.get("std", model_registry.DEFAULT_STD),
+    }
+
+
+def save(model: torch.jit.ScriptModule, out_path: str, meta: Dict[str, Any]) -> None:
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    torch.jit.save(model, out_path, _extra_files={META_KEY: json.dumps(meta)})
+
+
+@torch.inference_mode()
+def parity(original: torch.nn.Module, folded: torch.nn.Module, meta: Dict[str, Any], n: int = 4) -> float:
+    """Máx. |Δlogit| entre original(normalize(x)) y folded(x) para uint8 aleatorio."""
+    _, _, h, w = meta["input_size"]
+    x = torch.randint(0, 256, (n, 3, int(h), int(w)), dtype=torch.uint8, generator=torch.Generator().manual_seed(0))
+    mean = torch.tensor(meta["mean"]).view(1, 3, 1, 1)
+    std = torch.tensor(meta["std"]).view(1, 3, 1, 1)
+    ref = original((x.float() / 255.0 - mean) / std)
+    return float((folded(x) - ref).abs().max())
+
+
+def fold(model_path: str, labels_path: str, out_path: str) -> Dict[str, Any]:
+    original, embedded = load_torchscript(Path(model_path))
+    if embedded.get("input") == "uint8":
+        raise ValueError(f"{model_path} ya tiene la normalización plegada")
+    original = original.eval()
+    with open(labels_path, "r", encoding="utf-8") as f:
+        meta = preprocess_meta(json.load(f))
+
+    folded = fold_normalization(original, meta["mean"], meta["std"])
+    diff = parity(original, folded, meta)
+    if diff > PARITY_ATOL:
+        raise RuntimeError(f"paridad de logits fuera de tolerancia: {diff:.2e} > {PARITY_ATOL:.0e}")
+    meta = {**embedded, **meta}   # conserva precision/quantized_engine
+    save(folded, out_path, meta)
+    return {"out": out_path, "max_abs_logit_diff": diff, **meta}
+
+
+def calibration_batches(calib_dir: str, labels_meta: Dict[str, Any], limit: int = 256, batch_size: int = 8) -> List[torch.Tensor]:
+    """Fotos de calib_dir (recursivo) con el transform de siempre, en lotes."""
+    from agent.utils.images import decode_image
+
+    paths = sorted(p for p in Path(calib_dir).rglob("*") if p.suffix.lower() in IMAGE_EXTS)[:limit]
+    if not paths:
+        raise FileNotFoundError(f"no hay imágenes de calibración en {calib_dir}")
+    meta = preprocess_meta(labels_meta)
+    h, w = int(meta["input_size"][2]), int(meta["input_size"][3])
+    transform = model_registry.pil_transform((h, w), meta["mean"], meta["std"])
+    xs = [transform(decode_image(p.read_bytes(), (w, h))) for p in paths]
+    return [torch.stack(xs[i:i + batch_size]) for i in range(0, len(xs), batch_size)]
+
+
+def _default_engine() -> str:
+    engines = torch.backends.quantized.supported_engines
+    return next((e for e in ("x86", "fbgemm", "qnnpack") if e in engines), "none")
+
+
+def quantize_model(
+    model: torch.jit.ScriptModule,
+    mode: str = "static",
+    batches: Optional[Sequence[torch.Tensor]] = None,
+    engine: Optional[str] = None,
+) -> torch.jit.ScriptModule:
+    from torch.ao.quantization import default_dynamic_qconfig, get_default_qconfig
+    from torch.ao.quantization.quantize_jit import quantize_dynamic_jit, quantize_jit
+
+    torch.backends.quantized.engine = engine or _default_engine()
+    if mode == "dynamic":
+        return quantize_dynamic_jit(model, {"": default_dynamic_qconfig})
+    if not batches:
+        raise ValueError("la cuantización estática necesita imágenes de calibración")
+
+    def _calibrate(m: torch.nn.Module, data: Sequence[torch.Tensor]) -> None:
+        with torch.inference_mode():
+            for x in data:
+                m(x)
+
+    qconfig = get_default_qconfig(torch.backends.quantized.engine)
+    return quantize_jit(model, {"": qconfig}, _calibrate, [list(batches)])
+
+
+def quantize(
+    model_path: str,
+    labels_path: str,
+    out_path: str,
+    mode: str = "static",
+    calib_dir: Optional[str] = None,
+    calib_max: int = 256,
+) -> Dict[str, Any]:
+    original, embedded = load_torchscript(Path(model_path))
+    if embedded.get("input") == "uint8" or embedded.get("precision") == "int8":
+        raise ValueError(f"{model_path} no es el modelo fp32 original (cuantiza antes de plegar)")
+    with open(labels_path, "r", encoding="utf-8") as f:
+        labels_meta = json.load(f)
+
+    batches = calibration_batches(calib_dir, labels_meta, calib_max) if (mode == "static" and calib_dir) else None
+    engine = _default_engine()
+    quantized = quantize_model(original.eval(), mode, batches, engine)
+
+    meta = {
+        "precision": "int8",
+        "quantization": mode,
+        "quantized_engine": engine,
+        "calibration_images": sum(len(b) for b in batches) if batches else 0,
+    }
+    save(quantized, out_path, meta)
+    return {"out": out_path, **meta}
+
+
+def _set_onnx_meta(path: str, meta: Dict[str, Any]) -> None:
+    import onnx  # type: ignore
+
+    proto = onnx.load(path)
+    entry = next((p for p in proto.metadata_props if p.key == META_KEY), None) or proto.metadata_props.add()
+    entry.key, entry.value = META_KEY, json.dumps(meta)
+    onnx.save(proto, path)
+
+
+@torch.inference_mode()
+def onnx_parity(module: torch.nn.Module, onnx_path: str, x: torch.Tensor) -> Optional[float]:
+    """Máx. |Δlogit| TorchScript vs ONNX Runtime (None si no hay onnxruntime)."""
+    try:
+        onnx_backend = OnnxRuntimeBackend(onnx_path)
+    except RuntimeError:
+        return None
+    return float((onnx_backend(x) - module(x)).abs().max())
+
+
+def export_onnx(model_path: str, labels_path: str, out_path: str, opset: int = 17) -> Dict[str, Any]:
+    module, embedded = load_torchscript(Path(model_path))
+    if embedded.get("precision") == "int8":
+        raise ValueError(f"{model_path} es int8: exporta a ONNX el modelo fp32")
+    with open(labels_path, "r", encoding="utf-8") as f:
+        _, _, h, w = preprocess_meta(json.load(f))["input_size"]
+
+    g = torch.Generator().manual_seed(0)
+    if embedded.get("input") == "uint8":
+        x = torch.randint(0, 256, (2, 3, int(h), int(w)), dtype=torch.uint8, generator=g)
+    else:
+        x = torch.randn(2, 3, int(h), int(w), generator=g)
+
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    torch.onnx.export(
+        module, (x,), out_path,
+        input_names=["input"], output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset, dynamo=False,
+    )
+    meta = {**embedded, "exported_from": Path(model_path).name}
+    try:
+        _set_onnx_meta(out_path, meta)
+    except ImportError:
+        if embedded:
+            raise RuntimeError("hace falta el paquete onnx para guardar los metadatos del modelo")
+
+    diff = onnx_parity(module, out_path, x)
+    if diff is not None and diff > PARITY_ATOL * 10:
+        raise RuntimeError(f"paridad ONNX fuera de tolerancia: {diff:.2e}")
+    return {"out": out_path, "max_abs_logit_diff": diff, **meta}
+
+
+def _default_paths() -> List[str]:
+    try:
+        model_path, labels_path = model_registry.resolve_paths()
+    except FileNotFoundError:
+        return ["", ""]
+    return [str(model_path), str(labels_path)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m agent.tools.model_export")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_fold = sub.add_parser("fold", help="pliega mean/std de labels.json en la entrada del modelo (uint8)")
+    p_fold.add_argument("--model", default=None, help="TorchScript original (por defecto el de MONKEY_MODEL_FILE)")
+    p_fold.add_argument("--labels", default=None, help="labels.json (por defecto el del modelo)")
+    p_fold.add_argument("--out", default=None, help="por defecto <modelo>.u8.pt junto al original")
+
+    p_q = sub.add_parser("quantize", help="genera la variante int8 (MONKEY_PRECISION=int8)")
+    p_q.add_argument("--model", default=None, help="TorchScript fp32 (por defecto el de MONKEY_MODEL_FILE)")
+    p_q.add_argument("--labels", default=None, help="labels.json (por defecto el del modelo)")
+    p_q.add_argument("--out", default=None, help="por defecto <modelo>.int8.pt junto al original")
+    p_q.add_argument("--mode", choices=["static", "dynamic"], default=None,
+                     help="static (con --calib) o dynamic (solo pesos de capas lineales)")
+    p_q.add_argument("--calib", default=None, help="carpeta con fotos de calibración (recursiva)")
+    p_q.add_argument("--calib-max", type=int, default=256)
+
+    p_onnx = sub.add_parser("onnx", help="exporta a ONNX para MONKEY_BACKEND=onnx")
+    p_onnx.add_argument("--model", default=None, help="TorchScript fp32 (por defecto el de MONKEY_MODEL_FILE)")
+    p_onnx.add_argument("--labels", default=None, help="labels.json (por defecto el del modelo)")
+    p_onnx.add_argument("--out", default=None, help="por defecto <modelo>.onnx junto al original")
+    p_onnx.add_argument("--opset", type=int, default=17)
+
+    args = parser.parse_args(argv)
+    default_model, default_labels = _default_paths()
+    model_path = args.model or default_model
+    labels_path = args.labels or default_labels
+    if not model_path or not labels_path:
+        print("[model_export] modelo o labels no encontrados (usa --model/--labels)")
+        return 1
+
+    if args.cmd == "quantize":
+        mode = args.mode or ("static" if args.calib else "dynamic")
+        if mode == "static" and not args.calib:
+            print("[model_export] --mode static necesita --calib")
+            return 1
+        p = Path(model_path)
+        out_path = args.out or str(p.with_name(f"{p.stem}.int8{p.suffix}"))
+        info = quantize(model_path, labels_path, out_path, mode, args.calib, args.calib_max)
+        mib = lambda path: Path(path).stat().st_size / 2**20  # noqa: E731
+        print(f"[model_export] {model_path} ({mib(model_path):.1f} MiB) -> {out_path} ({mib(out_path):.1f} MiB), "
+              f"{mode}, motor {info['quantized_engine']}, {info['calibration_images']} imágenes de calibración")
+        print("[model_export] úsalo con MONKEY_PRECISION=int8; compáralo con benchmarks/compare_precision.py")
+        return 0
+
+    if args.cmd == "onnx":
+        out_path = args.out or str(Path(model_path).with_suffix(".onnx"))
+        info = export_onnx(model_path, labels_path, out_path, args.opset)
+        diff = info["max_abs_logit_diff"]
+        print(f"[model_export] {model_path} -> {out_path} "
+              + (f"(máx |Δlogit| ONNX Runtime = {diff:.2e})" if diff is not None else "(onnxruntime no instalado: sin paridad)"))
+        print("[model_export] úsalo con MONKEY_BACKEND=onnx")
+        return 0
+
+    out_path = args.out or str(Path(model_path).with_suffix(".u8.pt"))
+    info = fold(model_path, labels_path, out_path)
+    print(f"[model_export] {model_path} -> {out_path} (máx |Δlogit| = {info['max_abs_logit_diff']:.2e})")
+    print(f"[model_export] úsalo con MONKEY_MODEL_FILE={Path(out_path).name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
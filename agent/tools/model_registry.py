@@ -0,0 +1,345 @@
+# agent/tools/model_registry.py
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+
+import torch
+import torchvision.transforms as T
+import torchvision.transforms.functional as TF
+
+from agent.tools.backends import SUFFIXES, InferenceBackend, open_backend
+
+"""
+Registro único del clasificador: rutas, labels, configuración de
+preprocesado y la instancia cargada. Lo consumen el grafo (vision.py) y la
+demo de Gradio (app.py), así que en un mismo proceso el modelo se carga una
+sola vez y ambos preprocesan exactamente igual.
+
+  loaded = get()          # carga (una vez, thread-safe) y devuelve LoadedModel
+  preload(background=True)  # carga + calentamiento en un hilo; la UI arranca ya
+  readiness()             # {"ready": ..., "error": ..., ...} para health checks
+  fingerprint()           # identidad del modelo servido (claves de caché)
+"""
+
+# -----------------------
+# Config / rutas
+# -----------------------
+MODEL_FILE = os.getenv("MONKEY_MODEL_FILE", "monkey_classifier_ts-v0.1.pt")
+LABELS_FILE = os.getenv("MONKEY_LABELS_FILE", "labels.json")
+
+# Precisión del clasificador: "fp32" (MODEL_FILE tal cual) o "int8" (la
+# variante <modelo>.int8.pt de `python -m agent.tools.model_export quantize`)
+PRECISION = os.getenv("MONKEY_PRECISION", "fp32").lower()
+
+# Backend de inferencia (agent/tools/backends.py): "torchscript" o "onnx"
+# (el <modelo>.onnx de `python -m agent.tools.model_export onnx`)
+BACKEND = os.getenv("MONKEY_BACKEND", "torchscript").lower()
+
+# Carga optimizada (opt-in): torch.jit.freeze + optimize_for_inference al
+# cargar; el congelado se cachea en MONKEY_OPT_CACHE_DIR (ver backends.py).
+# Siempre: forwards de calentamiento antes de marcar el modelo como listo y,
+# con EAGER_LOAD, carga al importar el módulo en lugar de en la primera
+# petición (en un hilo si BACKGROUND_LOAD).
+OPTIMIZE = os.getenv("MONKEY_OPTIMIZE", "0") == "1"
+WARMUP_BATCHES = int(os.getenv("MONKEY_WARMUP_BATCHES", "2"))
+EAGER_LOAD = os.getenv("MONKEY_EAGER_LOAD", "0") == "1"
+BACKGROUND_LOAD = os.getenv("MONKEY_BACKGROUND_LOAD", "1") == "1"
+
+# Normalización con la que se entrenó v0.1 (model/modelcard.md); solo se usa
+# si labels.json no trae "normalize"
+DEFAULT_MEAN = [0.4363, 0.4328, 0.3291]
+DEFAULT_STD = [0.2129, 0.2075, 0.2038]
+
+
+def _candidate_model_dirs() -> List[Path]:
+    cands: List[Path] = []
+
+    # 1) Override por entorno
+    env_dir = os.getenv("MONKEY_MODEL_DIR")
+    if env_dir:
+        cands.append(Path(env_dir))
+
+    # 2) agent/model (layout original)
+    here = Path(__file__).resolve()
+    agent_root = here.parent.parent         # .../agent
+    cands.append(agent_root / "model")
+
+    # 3) ./model (raíz del repo — tu layout actual)
+    project_root = agent_root.parent
+    cands.append(project_root / "model")
+
+    # 4) cwd/model
+    cands.append(Path.cwd() / "model")
+
+    # dedupe preservando orden
+    seen = set()
+    uniq: List[Path] = []
+    for d in cands:
+        if d not in seen:
+            uniq.append(d)
+            seen.add(d)
+    return uniq
+
+
+def _model_file() -> str:
+    """MODEL_FILE para la precisión y el backend pedidos (m.pt -> m.int8.pt / m.onnx)."""
+    p = Path(MODEL_FILE)
+    stem = p.stem
+    if PRECISION not in {"", "fp32"} and f".{PRECISION}" not in p.name:
+        stem = f"{stem}.{PRECISION}"
+    return f"{stem}{SUFFIXES.get(BACKEND, p.suffix)}"
+
+
+def resolve_paths() -> Tuple[Path, Path]:
+    tried_model, tried_labels = [], []
+    model_file = _model_file()
+    for d in _candidate_model_dirs():
+        mp = d / model_file
+        lp = d / LABELS_FILE
+        tried_model.append(str(mp))
+        tried_labels.append(str(lp))
+        if mp.exists() and lp.exists():
+            return mp, lp
+
+    msg = (
+        "Modelo o labels no encontrados.\n"
+        f"Busqué (en orden):\n  modelos: {', '.join(tried_model)}\n"
+        f"  labels: {', '.join(tried_labels)}\n"
+        "Soluciones:\n"
+        "  1) Mueve 'model/' a 'agent/model/'.\n"
+        "  2) O define MONKEY_MODEL_DIR apuntando a la carpeta con los ficheros.\n"
+        "  3) O ajusta MONKEY_MODEL_FILE / MONKEY_LABELS_FILE.\n"
+        "  4) Con MONKEY_PRECISION=int8 o MONKEY_BACKEND=onnx, genera antes esa\n"
+        "     variante (python -m agent.tools.model_export quantize | onnx).\n"
+    )
+    raise FileNotFoundError(msg)
+
+
+# -----------------------
+# Labels / preprocesado
+# -----------------------
+def image_hw(meta: Dict[str, Any]) -> Tuple[int, int]:
+    input_size = meta.get("input_size", [1, 3, 224, 224])
+    return (int(input_size[2]), int(input_size[3])) if len(input_size) >= 4 else (224, 224)
+
+
+_input_hw: Optional[Tuple[int, int]] = None
+
+
+def input_hw() -> Tuple[int, int]:
+    """
+    (alto, ancho) de entrada del modelo según labels.json, sin cargar el
+    modelo. (224, 224) si no hay labels.
+    """
+    global _input_hw
+    if _input_hw is None:
+        hw = (224, 224)
+        for d in _candidate_model_dirs():
+            lp = d / LABELS_FILE
+            if lp.exists():
+                try:
+                    with open(lp, "r", encoding="utf-8") as f:
+                        hw = image_hw(json.load(f))
+                except Exception:
+                    pass
+                break
+        _input_hw = hw
+    return _input_hw
+
+
+def parse_classes(meta: Dict[str, Any]) -> List[str]:
+    if "id2label" in meta:
+        id2label = {int(k): v for k, v in meta["id2label"].items()}
+        return [id2label[i] for i in range(len(id2label))]
+    if "classes" in meta:
+        return list(meta["classes"])
+    raise ValueError("labels.json debe contener 'id2label' o 'classes'")
+
+
+def pil_transform(image_hw: Tuple[int, int], mean: Sequence[float], std: Sequence[float]):
+    return T.Compose([
+        T.Resize(image_hw),
+        T.ToTensor(),
+        T.Normalize(mean, std),   # listas/tuplas OK en TorchVision
+    ])
+
+
+@dataclass(frozen=True)
+class Preprocessing:
+    image_hw: Tuple[int, int]
+    mean: List[float]
+    std: List[float]
+    transform: Any              # PIL -> float [3,H,W] normalizado
+    scale: torch.Tensor         # 1 / (255 * std), [1,3,1,1]
+    shift: torch.Tensor         # -mean / std,     [1,3,1,1]
+
+    @classmethod
+    def from_meta(cls, meta: Dict[str, Any]) -> "Preprocessing":
+        mean = list(meta.get("normalize", {}).get("mean", DEFAULT_MEAN))
+        std = list(meta.get("normalize", {}).get("std", DEFAULT_STD))
+        hw = image_hw(meta)
+        # ToTensor + Normalize como una sola operación afín sobre uint8
+        mean_t = torch.tensor(mean, dtype=torch.float32).view(1, 3, 1, 1)
+        std_t = torch.tensor(std, dtype=torch.float32).view(1, 3, 1, 1)
+        return cls(hw, mean, std, pil_transform(hw, mean, std), 1.0 / (255.0 * std_t), -mean_t / std_t)
+
+    def normalize_uint8(self, x: torch.Tensor) -> torch.Tensor:
+        return torch.addcmul(self.shift, x.float(), self.scale)
+
+    def batch(self, images: Sequence[Any], uint8: bool = False) -> torch.Tensor:
+        """
+        Lote [N,3,H,W] de imágenes PIL: el transform PIL de siempre o, para
+        un modelo con la normalización plegada (uint8=True), uint8 reescalado.
+        """
+        if not uint8:
+            return torch.stack([self.transform(img.convert("RGB")) for img in images])
+        return torch.stack([
+            TF.resize(TF.pil_to_tensor(img.convert("RGB")), list(self.image_hw),
+                      interpolation=T.InterpolationMode.BILINEAR, antialias=True)
+            for img in images
+        ])
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    backend: InferenceBackend
+    classes: List[str]
+    preprocessing: Preprocessing
+    labels: Dict[str, Any]      # labels.json tal cual
+    model_path: Path
+    labels_path: Path
+    fingerprint: str = ""       # ver fingerprint()
+
+    @property
+    def folded(self) -> bool:
+        return self.backend.folded
+
+
+# -----------------------
+# Instancia + readiness
+# -----------------------
+_loaded: Optional[LoadedModel] = None
+_load_lock = threading.Lock()
+_ready = threading.Event()
+_status: Dict[str, Any] = {"error": None, "load_ms": None, "warmup_ms": None}
+
+
+def get() -> LoadedModel:
+    """Modelo cargado (lo carga la primera vez; las llamadas concurrentes esperan)."""
+    global _loaded, _input_hw
+    if _loaded is not None:
+        return _loaded
+
+    with _load_lock:
+        if _loaded is not None:
+            return _loaded
+        t0 = time.perf_counter()
+        model_path, labels_path = resolve_paths()
+
+        backend = open_backend(model_path, BACKEND)
+        if OPTIMIZE:
+            backend.optimize()
+
+        with open(labels_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        pre = Preprocessing.from_meta(meta)
+        _input_hw = pre.image_hw
+        _loaded = LoadedModel(backend, parse_classes(meta), pre, meta, model_path, labels_path,
+                              _fingerprint(model_path, labels_path))
+        _status["load_ms"] = (time.perf_counter() - t0) * 1000
+    return _loaded
+
+
+def _fingerprint(model_path: Path, labels_path: Path) -> str:
+    # Fichero del modelo (ruta/mtime/tamaño), variante y labels.json (clases + preprocesado)
+    parts = [BACKEND, PRECISION]
+    for p in (model_path, labels_path):
+        st = p.stat()
+        parts += [str(p.resolve()), str(st.st_mtime_ns), str(st.st_size)]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def fingerprint() -> str:
+    """
+    Identidad del modelo que sirve (o servirá) este proceso: cambia si se
+    sustituye el fichero, la variante (backend/precisión) o labels.json. No
+    carga el modelo; FileNotFoundError si no se encuentra.
+    """
+    loaded = _loaded
+    if loaded is not None and loaded.fingerprint:
+        return loaded.fingerprint
+    return _fingerprint(*resolve_paths())
+
+
+def _warmup_sizes(batches: int, max_batch: int) -> List[int]:
+    # Lote 1 y, si hay micro-batching, también el lote máximo
+    sizes = [1, max_batch] if max_batch > 1 else [1]
+    return [sizes[i % len(sizes)] for i in range(max(0, batches))]
+
+
+@torch.inference_mode()
+def warmup(batches: int = WARMUP_BATCHES, max_batch: int = 1, views: int = 1) -> float:
+    """
+    Carga el modelo y hace `batches` forwards con entradas sintéticas (el
+    JIT perfila y especializa el grafo en las primeras llamadas). `views`
+    multiplica el lote (vistas de TTA). Marca el modelo como listo. Devuelve
+    los ms del calentamiento.
+    """
+    loaded = get()
+    h, w = loaded.preprocessing.image_hw
+    t0 = time.perf_counter()
+    for n in _warmup_sizes(batches, max_batch):
+        x = torch.zeros(n * max(1, views), 3, h, w, dtype=torch.uint8)
+        loaded.backend(x if loaded.folded else loaded.preprocessing.normalize_uint8(x))
+    _status["warmup_ms"] = (time.perf_counter() - t0) * 1000
+    mark_ready()
+    return _status["warmup_ms"]
+
+
+def preload(background: bool = False, **warmup_kwargs: Any) -> Optional[threading.Thread]:
+    """Carga + calentamiento ahora (o en un hilo daemon con background=True)."""
+    def run() -> None:
+        try:
+            warmup(**warmup_kwargs)
+            _status["error"] = None
+        except Exception as e:
+            _status["error"] = f"{type(e).__name__}: {e}"
+            print(f"[model_registry] precarga fallida: {_status['error']}")
+            if not background:
+                raise
+    if not background:
+        run()
+        return None
+    t = threading.Thread(target=run, name="model-preload", daemon=True)
+    t.start()
+    return t
+
+
+def mark_ready() -> None:
+    _ready.set()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def wait_ready(timeout: Optional[float] = None) -> bool:
+    return _ready.wait(timeout)
+
+
+def readiness() -> Dict[str, Any]:
+    """Estado para un health check: solo aceptar tráfico con ready=True."""
+    backend = _loaded.backend if _loaded is not None else None
+    return {
+        "ready": _ready.is_set(),
+        "backend": getattr(backend, "name", None),
+        "optimized": getattr(backend, "optimized", None),
+        **_status,
+    }
@@ -0,0 +1,100 @@
+# agent/tools/prefetch.py
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Mapping, Optional
+import os
+import threading
+
+from agent.tools.wiki import fetch_fullpage
+from agent.tools.wiki_cache import normalize_title
+from agent.tools.wiki_pack import get_pack
+
+"""
+Prefetch especulativo de páginas de Wikipedia.
+
+infer_local conoce los candidatos (top-k) antes de que gate_uncertainty y
+map_to_scientific_name (o la visión GPT) decidan el taxón: lanzamos ya
+fetch_fullpage en segundo plano para los primeros WIKI_PREFETCH_TOPK.
+Opcional: desactivado por defecto (WIKI_PREFETCH_TOPK=0, o `prefetch_topk`
+en el estado); el pool de hilos solo se crea con el primer prefetch.
+
+- fetch_fullpage pasa por single-flight + caché: si el nodo wiki pide el
+  mismo título mientras el prefetch vuela, se une a esa llamada; si ya
+  terminó, es un acierto de caché.
+- prefetch() devuelve los futures que lanzó; infer_local los guarda en
+  `_tmp["prefetch"]` (estado de SU ejecución). El nodo wiki llama a
+  settle(latin, esos futures): cancela los de otros títulos que aún no
+  arrancaron; los que ya corren terminan y quedan en caché. Los prefetch de
+  otras ejecuciones concurrentes no se tocan.
+- `_inflight` (global) solo sirve para no lanzar dos veces el mismo título.
+- Taxones del paquete offline no se prefetchean (ya no tocan la red).
+"""
+
+WIKI_PREFETCH_TOPK = int(os.getenv("WIKI_PREFETCH_TOPK", "0"))   # 0 desactiva
+WIKI_PREFETCH_WORKERS = int(os.getenv("WIKI_PREFETCH_WORKERS", "2"))
+
+_pool: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_inflight: Dict[str, Future] = {}
+
+
+def _in_pack(latin: str) -> bool:
+    pack = get_pack()
+    return pack is not None and latin in pack
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    # Llamar con _lock tomado
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=WIKI_PREFETCH_WORKERS, thread_name_prefix="wiki-prefetch")
+    return _pool
+
+
+def _run(latin: str) -> None:
+    try:
+        fetch_fullpage(latin)
+    except Exception as e:
+        print(f"[prefetch] '{latin}': {e}")
+
+
+def _forget(key: str, fut: Future) -> None:
+    with _lock:
+        if _inflight.get(key) is fut:
+            del _inflight[key]
+
+
+def prefetch(latins: Iterable[str]) -> Dict[str, Future]:
+    """Lanza fetch_fullpage en segundo plano. Devuelve {título: future} de los lanzados."""
+    started: Dict[str, Future] = {}
+    for latin in latins:
+        if not latin:
+            continue
+        if _in_pack(latin):
+            continue
+        key = normalize_title(latin)
+        with _lock:
+            if key in _inflight:
+                continue
+            fut = _get_pool().submit(_run, latin)
+            _inflight[key] = fut
+        fut.add_done_callback(lambda f, k=key: _forget(k, f))
+        started[latin] = fut
+    return started
+
+
+def pending(latin: str) -> Optional[Future]:
+    """Future del prefetch de `latin` si aún no ha terminado."""
+    with _lock:
+        return _inflight.get(normalize_title(latin or ""))
+
+
+def settle(latin: str, futures: Optional[Mapping[str, Future]]) -> None:
+    """
+    El taxón ya está decidido: descarta los prefetch de otros títulos que no
+    han empezado. `futures` son los de esta ejecución (_tmp["prefetch"]).
+    """
+    keep = normalize_title(latin or "")
+    for title, fut in (futures or {}).items():
+        if normalize_title(title) != keep:
+            fut.cancel()   # no-op si ya está corriendo: su resultado acaba en caché
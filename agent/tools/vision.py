@@ -1,145 +1,311 @@
 # agent/tools/vision.py
 from __future__ import annotations
-import json, os
-from pathlib import Path
-from typing import List, Tuple, Optional
+import asyncio, os, threading
+from typing import Any, Dict, List, Sequence, Tuple, Optional, Union
 
 import torch
 import torchvision.transforms as T
+import torchvision.transforms.functional as TF
 from PIL import Image
 
-# -----------------------
-# Config / rutas
-# -----------------------
-MODEL_FILE = os.getenv("MONKEY_MODEL_FILE", "monkey_classifier_ts-v0.1.pt")
-LABELS_FILE = os.getenv("MONKEY_LABELS_FILE", "labels.json")
+from agent.tools import model_registry
+from agent.tools.backends import META_KEY
+from agent.utils.images import decode_image
 
+# Ficheros, precisión, backend y carga optimizada se configuran en
+# agent/tools/model_registry.py (MONKEY_MODEL_FILE, MONKEY_PRECISION,
+# MONKEY_BACKEND, MONKEY_OPTIMIZE, ...): app.py y el grafo comparten instancia.
+
+# Micro-batching opt-in: agrupa llamadas concurrentes a infer() en un forward
+MICROBATCH = os.getenv("MONKEY_MICROBATCH", "0") == "1"
+MICROBATCH_MAX_SIZE = int(os.getenv("MONKEY_MICROBATCH_MAX_SIZE", "8"))
+MICROBATCH_WAIT_MS = float(os.getenv("MONKEY_MICROBATCH_WAIT_MS", "10"))
+
+# Pool de procesos opt-in (agent/utils/inference_pool.py): N workers fijados a
+# tramos de núcleos que comparten los pesos copy-on-write; los forwards van al
+# menos cargado. THREADS=0 -> tantos hilos como núcleos tenga el tramo.
+POOL_WORKERS = int(os.getenv("MONKEY_POOL_WORKERS", "0"))
+POOL_THREADS = int(os.getenv("MONKEY_POOL_THREADS", "0"))
+POOL_PIN = os.getenv("MONKEY_POOL_PIN", "1") == "1"
+
+# Preprocesado: "pil" (Resize/ToTensor/Normalize sobre PIL, el de siempre) o
+# "tensor" (uint8 -> resize en tensor -> normalización afín). Un modelo
+# exportado con la normalización plegada (agent/tools/model_export.py fold)
+# usa siempre "tensor" y recibe el uint8 directamente.
+PREPROCESS = os.getenv("MONKEY_PREPROCESS", "pil").lower()
+
+# Test-time augmentation opt-in: "flip" (original + espejo) o "crops" (además
+# centro y esquinas al TTA_CROP_SCALE del encuadre, reescalados a la entrada).
+# Las vistas de todo el lote van en UN forward y las probabilidades se
+# promedian por imagen; p1/p2/entropía salen de la distribución agregada.
+TTA = os.getenv("MONKEY_TTA", "off").lower()
+TTA_CROP_SCALE = float(os.getenv("MONKEY_TTA_CROP_SCALE", "0.875"))
+
+# Metadatos que model_export guarda dentro del modelo exportado
+PREPROCESS_EXTRA = META_KEY
+
+# Vista del modelo del registro que usa el camino caliente (load_model la
+# rellena; los tests pueden sustituir cada pieza)
 _model = None
 _classes: Optional[List[str]] = None
 _transform = None
+_folded = False                          # el modelo espera uint8 [N,3,H,W]
+_scale: Optional[torch.Tensor] = None    # 1 / (255 * std), [1,3,1,1]
+_shift: Optional[torch.Tensor] = None    # -mean / std,     [1,3,1,1]
+_batcher = None
+_batcher_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+_pool_disabled = False                   # el pool no pudo arrancar: todo en proceso
+_input_hw: Optional[Tuple[int, int]] = None
 
-def _candidate_model_dirs() -> List[Path]:
-    cands: List[Path] = []
-
-    # 1) Override por entorno
-    env_dir = os.getenv("MONKEY_MODEL_DIR")
-    if env_dir:
-        cands.append(Path(env_dir))
-
-    # 2) agent/model (layout original)
-    here = Path(__file__).resolve()
-    agent_root = here.parent.parent         # .../agent
-    cands.append(agent_root / "model")
-
-    # 3) ./model (raíz del repo — tu layout actual)
-    project_root = agent_root.parent
-    cands.append(project_root / "model")
-
-    # 4) cwd/model
-    cands.append(Path.cwd() / "model")
-
-    # dedupe preservando orden
-    seen = set()
-    uniq: List[Path] = []
-    for d in cands:
-        if d not in seen:
-            uniq.append(d)
-            seen.add(d)
-    return uniq
-
-def _resolve_paths() -> Tuple[Path, Path]:
-    tried_model, tried_labels = [], []
-    for d in _candidate_model_dirs():
-        mp = d / MODEL_FILE
-        lp = d / LABELS_FILE
-        tried_model.append(str(mp))
-        tried_labels.append(str(lp))
-        if mp.exists() and lp.exists():
-            return mp, lp
-
-    msg = (
-        "Modelo o labels no encontrados.\n"
-        f"Busqué (en orden):\n  modelos: {', '.join(tried_model)}\n"
-        f"  labels: {', '.join(tried_labels)}\n"
-        "Soluciones:\n"
-        "  1) Mueve 'model/' a 'agent/model/'.\n"
-        "  2) O define MONKEY_MODEL_DIR apuntando a la carpeta con los ficheros.\n"
-        "  3) O ajusta MONKEY_MODEL_FILE / MONKEY_LABELS_FILE.\n"
-    )
-    raise FileNotFoundError(msg)
-
-def _softmax_1d(logits: torch.Tensor) -> torch.Tensor:
-    # logits: [1, C] o [C]
-    if logits.dim() == 2:
-        return torch.softmax(logits, dim=1).squeeze(0)  # [C]
-    return torch.softmax(logits, dim=0)  # [C]
+ImageInput = Union[Image.Image, bytes, bytearray]
+
+def _softmax_2d(logits: torch.Tensor) -> torch.Tensor:
+    # logits: [N, C] o [C] -> probs [N, C]
+    if logits.dim() == 1:
+        logits = logits.unsqueeze(0)
+    return torch.softmax(logits, dim=1)
+
+def input_hw() -> Tuple[int, int]:
+    """
+    (alto, ancho) de entrada del modelo según labels.json, sin cargar el
+    modelo. Lo usan los decodificadores para no decodificar más de lo que
+    el Resize del transform va a conservar. (224, 224) si no hay labels.
+    """
+    return _input_hw or model_registry.input_hw()
 
 def load_model():
-    global _model, _classes, _transform
-    if _model is not None:
-        return _model
-
-    model_path, labels_path = _resolve_paths()
-
-    _model = torch.jit.load(str(model_path), map_location="cpu").eval()
-
-    with open(labels_path, "r", encoding="utf-8") as f:
-        meta = json.load(f)
-
-    # Clases
-    if "id2label" in meta:
-        id2label = {int(k): v for k, v in meta["id2label"].items()}
-        _classes = [id2label[i] for i in range(len(id2label))]
-    elif "classes" in meta:
-        _classes = list(meta["classes"])
-    else:
-        raise ValueError("labels.json debe contener 'id2label' o 'classes'")
-
-    # Normalización + tamaño
-    mean = meta.get("normalize", {}).get("mean", [0.485, 0.456, 0.406])
-    std  = meta.get("normalize", {}).get("std",  [0.229, 0.224, 0.225])
-    input_size = meta.get("input_size", [1, 3, 224, 224])
-    image_hw = (int(input_size[2]), int(input_size[3])) if len(input_size) >= 4 else (224, 224)
-
-    _transform = T.Compose([
-        T.Resize(image_hw),
-        T.ToTensor(),
-        T.Normalize(mean, std),   # listas/tuplas OK en TorchVision
-    ])
+    """Backend del registro (una sola carga por proceso, compartida con app.py)."""
+    global _model, _folded
+    if _model is None:
+        loaded = model_registry.get()
+        _use(loaded.classes, loaded.preprocessing)
+        _folded = loaded.folded
+        _model = loaded.backend
     return _model
 
+def _use(classes: List[str], pre: model_registry.Preprocessing) -> None:
+    global _classes, _transform, _input_hw, _scale, _shift
+    _classes = classes
+    _transform, _input_hw, _scale, _shift = pre.transform, pre.image_hw, pre.scale, pre.shift
+
+def _configure(meta: Dict[str, Any]) -> None:
+    """Clases, transform PIL y constantes del camino tensor desde labels.json."""
+    _use(model_registry.parse_classes(meta), model_registry.Preprocessing.from_meta(meta))
+
+def warmup(batches: Optional[int] = None) -> float:
+    """Calentamiento del registro con los tamaños de lote que verá infer()."""
+    if batches is None:
+        batches = model_registry.WARMUP_BATCHES
+    return model_registry.warmup(batches, MICROBATCH_MAX_SIZE if MICROBATCH else 1, views=tta_views())
+
+def preload(background: bool = False) -> Optional[threading.Thread]:
+    """
+    Carga + calentamiento al arrancar. Con pool lo arranca ya, en el hilo que
+    llama y sin hilo de fondo (fork antes de cualquier forward en el padre,
+    ver _get_pool); si no, precarga el registro.
+    """
+    if POOL_WORKERS > 0:
+        # Con pool el padre no hace forwards: cargan y calientan los workers.
+        # Aquí solo se cargan los pesos y se hace el fork (start no espera al
+        # calentamiento), así que `background` no aplica.
+        _get_pool()
+        return None
+    return model_registry.preload(background, max_batch=MICROBATCH_MAX_SIZE if MICROBATCH else 1)
+
+def _to_pil(img: ImageInput) -> Image.Image:
+    if isinstance(img, (bytes, bytearray)):
+        h, w = input_hw()
+        return decode_image(img, (w, h))
+    return img.convert("RGB")
+
+def _to_uint8(img: ImageInput) -> torch.Tensor:
+    """
+    [3,H,W] uint8 a la entrada del modelo. Los bytes pasan por decode_image
+    (draft JPEG a ~la escala final, más barato que decode_jpeg a resolución
+    completa); PIL -> tensor sin pasar por float.
+    """
+    x = TF.pil_to_tensor(_to_pil(img))
+    return TF.resize(x, list(input_hw()), interpolation=T.InterpolationMode.BILINEAR, antialias=True)
+
+def _normalize_uint8(x: torch.Tensor) -> torch.Tensor:
+    assert _scale is not None and _shift is not None
+    return torch.addcmul(_shift, x.float(), _scale)
+
+def _preprocess(images: Sequence[ImageInput]) -> torch.Tensor:
+    """Lote [N,C,H,W] listo para el modelo cargado."""
+    if not (_folded or PREPROCESS == "tensor"):
+        assert _transform is not None
+        return torch.stack([_transform(_to_pil(img)) for img in images])
+    x = torch.stack([_to_uint8(img) for img in images])
+    return x if _folded else _normalize_uint8(x)
+
+def model_fingerprint() -> str:
+    """Identidad de lo que devuelve infer(): modelo del registro + preprocesado + TTA."""
+    return f"{model_registry.fingerprint()}:{PREPROCESS}:{TTA}"
+
+def tta_views(mode: Optional[str] = None) -> int:
+    """Vistas por imagen del modo TTA (1 = sin TTA)."""
+    mode = TTA if mode is None else mode
+    return {"flip": 2, "crops": 7}.get(mode, 1)
+
+def _crop_boxes(h: int, w: int, scale: float) -> List[Tuple[int, int, int, int]]:
+    """(top, left, alto, ancho) de centro y esquinas."""
+    ch, cw = max(1, round(h * scale)), max(1, round(w * scale))
+    return [((h - ch) // 2, (w - cw) // 2, ch, cw),
+            (0, 0, ch, cw), (0, w - cw, ch, cw), (h - ch, 0, ch, cw), (h - ch, w - cw, ch, cw)]
+
+def _tta_batch(x: torch.Tensor) -> torch.Tensor:
+    """[N,C,H,W] -> [V*N,C,H,W] (vista por bloques de N); sirve para uint8 y float."""
+    views = tta_views()
+    if views == 1:
+        return x
+    out = [x, x.flip(-1)]
+    if views > 2:
+        h, w = x.shape[-2:]
+        for top, left, ch, cw in _crop_boxes(h, w, TTA_CROP_SCALE):
+            out.append(TF.resized_crop(x, top, left, ch, cw, [h, w],
+                                       interpolation=T.InterpolationMode.BILINEAR, antialias=True))
+    return torch.cat(out)
+
+def _postprocess_batch(probs: torch.Tensor, topks: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    probs: [N, C]. Softmax/top-k/entropía en operaciones de tensor para todo
+    el lote; solo se baja a Python una vez (tolist) al final.
+    """
+    assert _classes is not None
+    n_classes = len(_classes)
+    ks = [min(int(k), n_classes) for k in topks]
+
+    vals, idxs = torch.topk(probs, k=max(ks), dim=1)       # [N, kmax]
+    eps = 1e-12
+    entropy = -(probs * (probs + eps).log()).sum(dim=1)    # [N] (base e)
+
+    vals_l, idxs_l, ent_l = vals.tolist(), idxs.tolist(), entropy.tolist()
+
+    out: List[Dict[str, Any]] = []
+    for n, k in enumerate(ks):
+        row_v, row_i = vals_l[n][:k], idxs_l[n][:k]
+        out.append({
+            "topk": [{"label": _classes[i], "prob": float(v)} for v, i in zip(row_v, row_i)],
+            "metrics": {
+                "p1": float(row_v[0]),
+                "p2": float(row_v[1]) if k >= 2 else 0.0,
+                "entropy": float(ent_l[n]),
+            },
+        })
+    return out
+
 @torch.inference_mode()
-def infer(pil_img: Image.Image, topk: int = 5):
+def _infer_many(items: List[Tuple[ImageInput, int]]) -> List[Dict[str, Any]]:
+    """
+    Un único forward [N,C,H,W] para N peticiones (imagen, topk).
+    Devuelve un dict top-k/metrics por petición, en el mismo orden.
+    """
+    model = load_model()
+    assert _classes is not None
+
+    x = _preprocess([img for img, _ in items])  # [N,C,H,W]
+    probs = _softmax_2d(model(_tta_batch(x)))  # [V*N, C]
+    if probs.shape[0] != x.shape[0]:
+        probs = probs.view(-1, x.shape[0], probs.shape[1]).mean(dim=0)  # media de las V vistas
+    return _postprocess_batch(probs, [topk for _, topk in items])
+
+def _get_pool():
+    """
+    Pool de procesos (se arranca una vez; None si no se puede usar). Los
+    workers se crean con fork: arráncalo con preload() desde el hilo
+    principal, antes de que el padre haga forwards (los pools de hilos de
+    OpenMP no sobreviven al fork) y antes de lanzar otros hilos (un fork
+    hereda los locks que tuvieran tomados). Pedido por primera vez desde otro
+    hilo, el pool se desactiva y todo corre en proceso.
+    """
+    global _pool, _pool_disabled
+    if _pool is None and not _pool_disabled:
+        with _pool_lock:
+            if _pool is None and not _pool_disabled and POOL_WORKERS > 0:
+                if threading.current_thread() is not threading.main_thread():
+                    print("[vision] pool de inferencia desactivado: arráncalo con preload() "
+                          "desde el hilo principal (fork fuera de él)")
+                    _pool_disabled = True
+                    return None
+                from agent.utils.inference_pool import InferencePool
+                try:
+                    load_model()   # pesos en el padre antes del fork, sin forwards
+                    _pool = InferencePool(
+                        _infer_many,
+                        workers=POOL_WORKERS,
+                        threads=POOL_THREADS or None,
+                        pin=POOL_PIN,
+                        init=warmup,
+                        on_ready=model_registry.mark_ready,
+                        name="vision-pool",
+                    ).start()
+                except Exception as e:
+                    print(f"[vision] pool de inferencia desactivado: {e}")
+                    _pool_disabled = True
+    return _pool
+
+def _run(items: List[Tuple[ImageInput, int]]) -> List[Dict[str, Any]]:
+    """_infer_many en este proceso o en el worker menos cargado del pool."""
+    pool = _get_pool() if POOL_WORKERS > 0 else None
+    return pool(items) if pool is not None else _infer_many(items)
+
+def infer_batch(images: Sequence[ImageInput], topk: int = 5, batch_size: int = 32) -> List[Dict[str, Any]]:
+    """
+    Inferencia por lotes (PIL.Image o bytes crudos). Devuelve una lista con el
+    mismo formato que infer(), en el orden de entrada. `batch_size` acota la
+    memoria del tensor apilado en trabajos largos (re-scoring nocturno).
+    """
+    results: List[Dict[str, Any]] = []
+    step = max(1, int(batch_size))
+    for start in range(0, len(images), step):
+        chunk = images[start:start + step]
+        results.extend(_run([(img, int(topk)) for img in chunk]))
+    return results
+
+def _get_batcher():
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                from agent.utils.batching import MicroBatcher
+                _batcher = MicroBatcher(
+                    _run,
+                    max_batch_size=MICROBATCH_MAX_SIZE,
+                    max_wait_ms=MICROBATCH_WAIT_MS,
+                    name="vision-microbatcher",
+                )
+    return _batcher
+
+def infer(pil_img: Image.Image, topk: int = 5) -> Dict[str, Any]:
     """
     Devuelve:
       {
         "topk": [{"label": str, "prob": float}, ...],
         "metrics": {"p1": float, "p2": float, "entropy": float},
       }
+    Con MONKEY_MICROBATCH=1 la petición pasa por el micro-batcher y comparte
+    forward con otras llamadas concurrentes (mismo resultado por llamador).
+    Con MONKEY_POOL_WORKERS>0 el forward corre en un proceso del pool.
+    Con MONKEY_TTA=flip|crops las métricas son las de la media de las vistas.
     """
-    model = load_model()
-    assert _classes is not None and _transform is not None
+    if MICROBATCH:
+        return _get_batcher()((pil_img, int(topk)))
+    return _run([(pil_img, int(topk))])[0]
 
-    x = _transform(pil_img.convert("RGB")).unsqueeze(0)  # [1,C,H,W]
-    logits = model(x)
-    probs = _softmax_1d(logits)  # [C]
 
-    k = min(int(topk), len(_classes))
-    vals, idxs = torch.topk(probs, k=k)  # [k]
+async def ainfer(pil_img: Image.Image, topk: int = 5) -> Dict[str, Any]:
+    """Variante asyncio de infer: el forward nunca corre en el event loop."""
+    if MICROBATCH:
+        return await asyncio.wrap_future(_get_batcher().submit((pil_img, int(topk))))
+    return await asyncio.to_thread(_infer_many_one, pil_img, int(topk))
 
-    p1 = float(vals[0].item())
-    p2 = float(vals[1].item()) if k >= 2 else 0.0
 
-    # entropía (base e)
-    eps = 1e-12
-    entropy = -float((probs * (probs + eps).log()).sum().item())
+def _infer_many_one(pil_img: Image.Image, topk: int) -> Dict[str, Any]:
+    return _run([(pil_img, topk)])[0]
 
-    topk_list = [
-        {"label": _classes[i.item()], "prob": float(v.item())}
-        for v, i in zip(vals, idxs)
-    ]
 
-    return {
-        "topk": topk_list,
-        "metrics": {"p1": p1, "p2": p2, "entropy": entropy},
-    }
+if model_registry.EAGER_LOAD:
+    preload(background=model_registry.BACKGROUND_LOAD)
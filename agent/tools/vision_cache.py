@@ -0,0 +1,140 @@
+# agent/tools/vision_cache.py
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import copy
+import hashlib
+import os
+import threading
+
+from PIL import Image
+
+"""
+Caché de clasificación delante de infer_local / vision.infer.
+
+Dos claves:
+  - exacta: SHA-256 de los bytes subidos -> ni se decodifica la imagen
+  - perceptual (opcional): dHash de 64 bits; acierto si la distancia de
+    Hamming a una entrada guardada es <= VISION_CACHE_PHASH_MAX_DIST.
+    Cubre re-subidas recomprimidas, redimensionadas o ráfagas de
+    fototrampeo casi idénticas. 0 la desactiva (por defecto).
+
+Guarda el payload de vision.infer ({"topk", "metrics"}) por (modelo, imagen,
+topk): `model` es la huella de vision.model_fingerprint(), así que cambiar el
+fichero del modelo, su variante o el preprocesado nunca sirve resultados del
+modelo anterior (ni exactos ni por dHash). Acotado a VISION_CACHE_SIZE entradas (LRU) con contadores de aciertos y
+expulsiones. VISION_CACHE=0 desactiva la caché entera.
+"""
+
+VISION_CACHE = os.getenv("VISION_CACHE", "1") == "1"
+VISION_CACHE_SIZE = int(os.getenv("VISION_CACHE_SIZE", "1024"))
+VISION_CACHE_PHASH_MAX_DIST = int(os.getenv("VISION_CACHE_PHASH_MAX_DIST", "0"))
+
+Key = Tuple[str, str, int]   # (modelo, sha256, topk)
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def dhash(img: Image.Image, size: int = 8) -> int:
+    """Difference hash: gris (size+1)x size y compara píxeles vecinos -> size*size bits."""
+    small = img.convert("L").resize((size + 1, size), Image.BILINEAR)
+    px = small.tobytes()   # modo L: 1 byte por píxel
+    bits = 0
+    for row in range(size):
+        base = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (px[base + col] > px[base + col + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ClassificationCache:
+    def __init__(self, maxsize: int = VISION_CACHE_SIZE, phash_max_dist: int = VISION_CACHE_PHASH_MAX_DIST) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self.phash_max_dist = max(0, int(phash_max_dist))
+        self._lock = threading.Lock()
+        # (modelo, sha256, topk) -> (payload, phash | None)
+        self._data: "OrderedDict[Key, Tuple[Dict[str, Any], Optional[int]]]" = OrderedDict()
+        self._counts = {"hits_exact": 0, "hits_near": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def near_enabled(self) -> bool:
+        return self.phash_max_dist > 0
+
+    def get_exact(self, sha: str, topk: int, model: str = "") -> Optional[Dict[str, Any]]:
+        key = (model, sha, int(topk))
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            self._counts["hits_exact"] += 1
+            return copy.deepcopy(entry[0])
+
+    def get_near(self, phash: int, topk: int, model: str = "") -> Optional[Dict[str, Any]]:
+        if not self.near_enabled:
+            return None
+        topk = int(topk)
+        with self._lock:
+            best: Optional[Key] = None
+            best_d = self.phash_max_dist + 1
+            # Escaneo lineal: con ~1k entradas son microsegundos frente al forward
+            for key, (_, ph) in self._data.items():
+                if ph is None or key[0] != model or key[2] != topk:
+                    continue
+                d = hamming(ph, phash)
+                if d < best_d:
+                    best, best_d = key, d
+            if best is None:
+                return None
+            self._data.move_to_end(best)
+            self._counts["hits_near"] += 1
+            return copy.deepcopy(self._data[best][0])
+
+    def miss(self) -> None:
+        with self._lock:
+            self._counts["misses"] += 1
+
+    def put(self, sha: str, topk: int, payload: Dict[str, Any], phash: Optional[int] = None,
+            model: str = "") -> None:
+        key = (model, sha, int(topk))
+        with self._lock:
+            self._data[key] = (copy.deepcopy(payload), phash)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._counts["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._counts)
+            out["entries"] = len(self._data)
+        lookups = out["hits_exact"] + out["hits_near"] + out["misses"]
+        out["hit_rate"] = round((out["hits_exact"] + out["hits_near"]) / lookups, 4) if lookups else 0.0
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._counts = {k: 0 for k in self._counts}
+
+
+_cache: Optional[ClassificationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_classification_cache() -> Optional[ClassificationCache]:
+    """Caché del proceso o None si VISION_CACHE=0."""
+    global _cache
+    if not VISION_CACHE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ClassificationCache()
+    return _cache
@@ -1,22 +1,40 @@
 # agent/tools/wiki.py
 from __future__ import annotations
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Tuple, Union
+import asyncio
+import copy
+import os
 import re
-import requests
 from bs4 import BeautifulSoup, Tag, NavigableString
 
+from agent.tools.wiki_cache import WikiPageCache, WIKI_CACHE_PATH, normalize_title
+from agent.utils.singleflight import SingleFlight
+from agent.utils import transport
+
 WIKI_API = "https://en.wikipedia.org/w/api.php"
 WIKI_PAGE_TMPL = "https://en.wikipedia.org/wiki/{title}"
 UA = "MonoAgent/0.1 (contact: you@example.com)"
 
+# Backend de BeautifulSoup: lxml (C, bastante más rápido) si está instalado
+try:
+    import lxml  # type: ignore  # noqa: F401
+    _DEFAULT_PARSER = "lxml"
+except Exception:
+    _DEFAULT_PARSER = "html.parser"
+HTML_PARSER = os.getenv("WIKI_HTML_PARSER", _DEFAULT_PARSER)
+
 # Regex para limpiar refs y espacios
 _REF_PAT = re.compile(r"\[citation needed\]|\[[0-9]+\]|\[[a-z]\]", re.IGNORECASE)
 _WS_PAT = re.compile(r"[ \t\u00A0]+")
+_NL_PAT = re.compile(r"\n{3,}")
+
+# Nodos que nunca aportan texto (se eliminan UNA vez por página)
+_NOISE_SELECTOR = "sup.reference, sup[role='note'], table.navbox, table.metadata, figure, style, script"
 
 def _clean_text(s: str) -> str:
     s = _REF_PAT.sub("", s)           # quita referencias [1], [a], [citation needed]
     s = _WS_PAT.sub(" ", s)
-    s = re.sub(r"\n{3,}", "\n\n", s)  # colapsa saltos de línea múltiples
+    s = _NL_PAT.sub("\n\n", s)        # colapsa saltos de línea múltiples
     return s.strip()
 
 def _html_to_text(el: Union[Tag, NavigableString]) -> str:
@@ -50,16 +68,24 @@ def _parse_infobox(root: Tag) -> Dict[str, str]:
             info[key] = val
     return info
 
-def _extract_full_plaintext(html: str) -> str:
+def _make_soup(html: str, parser: Optional[str] = None) -> BeautifulSoup:
+    return BeautifulSoup(html, parser or HTML_PARSER)
+
+def _content_root(soup: BeautifulSoup) -> Tag:
+    return soup.select_one("div.mw-parser-output") or soup
+
+def _node_text(el: Tag) -> str:
+    # El ruido ya se quitó en _extract_page: aquí solo texto + limpieza
+    return _clean_text(el.get_text(separator="\n", strip=True))
+
+def _plaintext_from(content: Tag) -> str:
     """
     Extrae TODO el texto útil de la página:
     - Párrafos y listas
     - Sin encabezados ni referencias
     - Sin tablas salvo infobox (que se parsea aparte)
+    Requiere que _NOISE_SELECTOR ya se haya eliminado de `content`.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    content = soup.select_one("div.mw-parser-output") or soup
-
     parts: List[str] = []
     for el in content.children:
         if not isinstance(el, Tag):
@@ -75,21 +101,105 @@ def _extract_full_plaintext(html: str) -> str:
             continue
 
         if el.name == "p":
-            txt = _html_to_text(el)
+            txt = _node_text(el)
             if txt:
                 parts.append(txt)
         elif el.name in {"ul", "ol"}:
-            items = [_html_to_text(li) for li in el.find_all("li", recursive=False)]
+            items = [_node_text(li) for li in el.find_all("li", recursive=False)]
             items = [i for i in items if i]
             if items:
                 parts.append("\n".join(items))
         elif el.name == "div":
             for p in el.find_all("p", recursive=False):
-                t = _html_to_text(p)
+                t = _node_text(p)
                 if t:
                     parts.append(t)
 
-    return _clean_text("\n\n".join(parts))
+    # Cada parte ya está limpia y sin bordes: no hace falta otra pasada de regex
+    return "\n\n".join(parts)
+
+def _extract_page(html: str, parser: Optional[str] = None) -> Tuple[str, Dict[str, str]]:
+    """
+    Un único parseo del HTML -> (plain_text, infobox).
+    1) infobox (solo toca las celdas de su tabla)
+    2) elimina el ruido de toda la página de una vez
+    3) recorre el contenido para el texto plano
+    """
+    content = _content_root(_make_soup(html, parser))
+    infobox = _parse_infobox(content)
+    for rm in content.select(_NOISE_SELECTOR):
+        rm.decompose()
+    return _plaintext_from(content), infobox
+
+def _extract_full_plaintext(html: str) -> str:
+    return _extract_page(html)[0]
+
+_cache: Optional[WikiPageCache] = None
+_flight = SingleFlight()
+
+def get_cache() -> WikiPageCache:
+    global _cache
+    if _cache is None:
+        _cache = WikiPageCache(WIKI_CACHE_PATH)
+    return _cache
+
+def _revid_params(latin: str) -> Dict[str, object]:
+    return {
+        "action": "query",
+        "prop": "info",
+        "titles": latin.strip().replace(" ", "_"),
+        "format": "json",
+        "redirects": 1,
+    }
+
+def _parse_params(latin: str) -> Dict[str, object]:
+    return {
+        "action": "parse",
+        "page": latin.strip().replace(" ", "_"),
+        "prop": "text|displaytitle|revid",
+        "format": "json",
+        "redirects": 1,
+    }
+
+def _revid_from_query(data: Dict[str, object]) -> Optional[int]:
+    pages = (data.get("query") or {}).get("pages") or {}  # type: ignore[union-attr]
+    for page in pages.values():
+        if "missing" in page:
+            return None
+        revid = page.get("lastrevid")
+        return int(revid) if revid else None
+    return None
+
+def _page_from_parse(latin: str, data: Dict[str, object]) -> Dict[str, object]:
+    """Respuesta JSON de action=parse -> página (parte CPU: BeautifulSoup)."""
+    if "error" in data or "parse" not in data:
+        return {"status": "not_found"}
+
+    url = WIKI_PAGE_TMPL.format(title=latin.strip().replace(" ", "_"))
+    parsed = data["parse"]
+    display_title_html = parsed.get("displaytitle") or parsed.get("title") or latin  # type: ignore[union-attr]
+    display_title = _clean_text(BeautifulSoup(display_title_html, "html.parser").get_text(" ", strip=True))
+    html = parsed["text"]["*"]  # type: ignore[index]
+
+    plain_text, infobox = _extract_page(html)
+
+    return {
+        "title": display_title,
+        "url": url,
+        "plain_text": plain_text,
+        "infobox": infobox,
+        "status": "ok",
+        "revid": parsed.get("revid"),  # type: ignore[union-attr]
+    }
+
+def _fetch_revid(latin: str) -> Optional[int]:
+    """Pide SOLO el id de la última revisión (mucho más barato que action=parse)."""
+    r = transport.get(WIKI_API, headers={"User-Agent": UA}, params=_revid_params(latin), timeout=12)
+    return _revid_from_query(r.json())
+
+async def _afetch_revid(latin: str) -> Optional[int]:
+    r = await transport.aget(WIKI_API, headers={"User-Agent": UA}, params=_revid_params(latin), timeout=12)
+    return _revid_from_query(r.json())
 
 def fetch_fullpage(latin: str) -> Dict[str, object]:
     """
@@ -100,48 +210,48 @@ def fetch_fullpage(latin: str) -> Dict[str, object]:
         "plain_text": str,   # TODO el texto útil de la página
         "infobox": Dict[str, str],
         "status": "ok"|"not_found"|"error",
+        "revid": int,        # revisión de la página (si ok)
         "error": Optional[str]
       }
+    Pasa por la caché LRU + disco (ver agent/tools/wiki_cache.py); peticiones
+    concurrentes del mismo título comparten una única llamada (single-flight).
+    Cada llamador recibe su propia copia profunda (el infobox incluido): el
+    resultado compartido y el de la caché no se tocan.
+    """
+    if not latin:
+        return {"status": "not_found", "error": "empty_title"}
+    page = _flight.do(("wiki", normalize_title(latin)), _fetch_cached, latin)
+    return copy.deepcopy(page)
+
+async def afetch_fullpage(latin: str) -> Dict[str, object]:
+    """
+    Igual que fetch_fullpage para llamadores asyncio: HTTP asíncrono y el
+    parseo HTML (CPU) en el executor para no bloquear el event loop. El
+    single-flight es por event loop: no se comparte vuelo con los llamadores
+    síncronos (solo la caché).
     """
     if not latin:
         return {"status": "not_found", "error": "empty_title"}
+    page = await _flight.do_async(("wiki", normalize_title(latin)), _afetch_cached, latin)
+    return copy.deepcopy(page)
+
+def _fetch_cached(latin: str) -> Dict[str, object]:
+    return get_cache().get_or_fetch(latin, _fetch_fullpage_remote, _fetch_revid)
 
-    title = latin.strip().replace(" ", "_")
-    url = WIKI_PAGE_TMPL.format(title=title)
+async def _afetch_cached(latin: str) -> Dict[str, object]:
+    return await get_cache().aget_or_fetch(latin, _afetch_fullpage_remote, _afetch_revid)
+
+def _fetch_fullpage_remote(latin: str) -> Dict[str, object]:
+    try:
+        r = transport.get(WIKI_API, headers={"User-Agent": UA}, params=_parse_params(latin), timeout=12)
+        return _page_from_parse(latin, r.json())
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
 
+async def _afetch_fullpage_remote(latin: str) -> Dict[str, object]:
     try:
-        r = requests.get(
-            WIKI_API,
-            headers={"User-Agent": UA},
-            params={
-                "action": "parse",
-                "page": title,
-                "prop": "text|displaytitle",
-                "format": "json",
-                "redirects": 1,
-            },
-            timeout=12,
-        )
+        r = await transport.aget(WIKI_API, headers={"User-Agent": UA}, params=_parse_params(latin), timeout=12)
         data = r.json()
-        if "error" in data or "parse" not in data:
-            return {"status": "not_found"}
-
-        parsed = data["parse"]
-        display_title_html = parsed.get("displaytitle") or parsed.get("title") or latin
-        display_title = _clean_text(BeautifulSoup(display_title_html, "html.parser").get_text(" ", strip=True))
-        html = parsed["text"]["*"]
-
-        soup = BeautifulSoup(html, "html.parser")
-        content = soup.select_one("div.mw-parser-output") or soup
-        infobox = _parse_infobox(content)
-        plain_text = _extract_full_plaintext(html)
-
-        return {
-            "title": display_title,
-            "url": url,
-            "plain_text": plain_text,
-            "infobox": infobox,
-            "status": "ok",
-        }
+        return await asyncio.to_thread(_page_from_parse, latin, data)
     except Exception as e:
         return {"status": "error", "error": str(e)}
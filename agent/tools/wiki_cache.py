@@ -0,0 +1,175 @@
+# agent/tools/wiki_cache.py
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import os
+import time
+
+from agent.utils.cache import LRUCache, SQLiteStore
+
+"""
+Caché de dos niveles para fetch_fullpage:
+  1) LRU en proceso (siempre activa)
+  2) SQLite en disco, opt-in: solo si WIKI_CACHE_PATH apunta a un fichero
+     (p. ej. ~/.cache/monoagent/wiki_cache.sqlite); vacío u 'off' = sin disco
+
+Clave: título normalizado ("Macaca fuscata"). Valor:
+  { "page": {title,url,plain_text,infobox,status,revid?}, "revid": int|None }
+
+- status 'ok'        -> TTL largo (WIKI_CACHE_TTL)
+- status 'not_found' -> TTL corto (WIKI_CACHE_NEG_TTL)
+- status 'error'     -> nunca se cachea
+Al caducar una entrada 'ok' con revid, se pregunta a la API solo por la
+revisión actual (prop=info); si no ha cambiado se renueva sin re-descargar.
+"""
+
+WIKI_CACHE_TTL = float(os.getenv("WIKI_CACHE_TTL", str(7 * 24 * 3600)))
+WIKI_CACHE_NEG_TTL = float(os.getenv("WIKI_CACHE_NEG_TTL", "3600"))
+WIKI_CACHE_MEM_SIZE = int(os.getenv("WIKI_CACHE_MEM_SIZE", "64"))
+
+
+WIKI_CACHE_PATH = os.getenv("WIKI_CACHE_PATH", "")
+
+FetchFn = Callable[[str], Dict[str, Any]]
+RevidFn = Callable[[str], Optional[int]]
+AFetchFn = Callable[[str], Awaitable[Dict[str, Any]]]
+ARevidFn = Callable[[str], Awaitable[Optional[int]]]
+
+
+def normalize_title(latin: str) -> str:
+    """'macaca_fuscata ' -> 'Macaca fuscata' (como MediaWiki: 1ª letra en mayúscula)."""
+    t = " ".join(str(latin or "").replace("_", " ").split())
+    return t[:1].upper() + t[1:]
+
+
+def _copy_page(page: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(page)
+    if isinstance(out.get("infobox"), dict):
+        out["infobox"] = dict(out["infobox"])
+    return out
+
+
+class WikiPageCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = WIKI_CACHE_TTL,
+        negative_ttl: float = WIKI_CACHE_NEG_TTL,
+        mem_size: int = WIKI_CACHE_MEM_SIZE,
+    ) -> None:
+        self.ttl = float(ttl)
+        self.negative_ttl = float(negative_ttl)
+        self.mem = LRUCache(mem_size)
+        self.disk: Optional[SQLiteStore] = None
+        if path and path.lower() not in {"off", "none", "0"}:
+            try:
+                self.disk = SQLiteStore(path, table="wiki_pages")
+            except Exception as e:
+                # Sin disco seguimos con la LRU; nunca rompemos el fetch
+                print(f"[wiki_cache] disco desactivado ({path}): {e}")
+
+    # -----------------------
+    # Lectura / escritura
+    # -----------------------
+    def _lookup(self, key: str):
+        entry = self.mem.get_entry(key)
+        if entry is not None:
+            return entry
+        if self.disk is None:
+            return None
+        entry = self.disk.get_entry(key)
+        if entry is not None:
+            # Promociona a memoria conservando la caducidad original
+            self.mem.set(key, entry[0], max(0.0, entry[1] - time.time()))
+        return entry
+
+    def _store(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        self.mem.set(key, record, ttl)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, record, ttl)
+            except Exception as e:
+                print(f"[wiki_cache] no pude escribir '{key}' en disco: {e}")
+
+    def put(self, latin: str, page: Dict[str, Any]) -> None:
+        status = page.get("status")
+        if status == "ok":
+            ttl = self.ttl
+        elif status == "not_found":
+            ttl = self.negative_ttl
+        else:
+            return
+        record = {"page": _copy_page(page), "revid": page.get("revid")}
+        self._store(normalize_title(latin), record, ttl)
+
+    def get(self, latin: str) -> Optional[Dict[str, Any]]:
+        """Solo entradas vigentes (sin red)."""
+        entry = self._lookup(normalize_title(latin))
+        if entry is None or entry[1] <= time.time():
+            return None
+        return _copy_page(entry[0]["page"])
+
+    # -----------------------
+    # Camino principal (sync / async comparten las decisiones)
+    # -----------------------
+    def _fresh(self, latin: str) -> Tuple[str, Optional[tuple], Optional[Dict[str, Any]]]:
+        key = normalize_title(latin)
+        entry = self._lookup(key)
+        if entry is not None and entry[1] > time.time():
+            return key, entry, _copy_page(entry[0]["page"])
+        return key, entry, None
+
+    @staticmethod
+    def _needs_revalidation(entry: Optional[tuple]) -> bool:
+        return bool(entry is not None and entry[0].get("revid") and entry[0]["page"].get("status") == "ok")
+
+    def _revalidated(self, key: str, entry: tuple, current: Optional[int]) -> Optional[Dict[str, Any]]:
+        record = entry[0]
+        if current is not None and int(current) == int(record["revid"]):
+            self._store(key, record, self.ttl)
+            return _copy_page(record["page"])
+        return None
+
+    def _finish(self, latin: str, entry: Optional[tuple], page: Dict[str, Any]) -> Dict[str, Any]:
+        if page.get("status") == "error" and entry is not None and entry[0]["page"].get("status") == "ok":
+            # Wikipedia caída: mejor servir la copia caducada que nada
+            return _copy_page(entry[0]["page"])
+        self.put(latin, page)
+        return page
+
+    def get_or_fetch(self, latin: str, fetch_fn: FetchFn, revid_fn: Optional[RevidFn] = None) -> Dict[str, Any]:
+        key, entry, page = self._fresh(latin)
+        if page is not None:
+            return page
+
+        # Caducada: revalidación barata por id de revisión
+        if revid_fn is not None and self._needs_revalidation(entry):
+            try:
+                current = revid_fn(latin)
+            except Exception:
+                current = None
+            page = self._revalidated(key, entry, current)  # type: ignore[arg-type]
+            if page is not None:
+                return page
+
+        return self._finish(latin, entry, fetch_fn(latin))
+
+    async def aget_or_fetch(self, latin: str, afetch_fn: AFetchFn, arevid_fn: Optional[ARevidFn] = None) -> Dict[str, Any]:
+        key, entry, page = self._fresh(latin)
+        if page is not None:
+            return page
+
+        if arevid_fn is not None and self._needs_revalidation(entry):
+            try:
+                current = await arevid_fn(latin)
+            except Exception:
+                current = None
+            page = self._revalidated(key, entry, current)  # type: ignore[arg-type]
+            if page is not None:
+                return page
+
+        return self._finish(latin, entry, await afetch_fn(latin))
+
+    def clear(self) -> None:
+        self.mem.clear()
+        if self.disk is not None:
+            self.disk.clear()
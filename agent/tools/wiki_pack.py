@@ -0,0 +1,245 @@
+# agent/tools/wiki_pack.py
+"""
+Paquete offline de conocimiento (Wikipedia) para el set fijo de etiquetas.
+
+Formato (little-endian):
+  header  : MAGIC(4s) | version(H) | flags(H) | index_len(I)
+  index   : JSON comprimido con zlib
+              {"format", "built_at", "labels_version",
+               "entries": {titulo_norm: [offset, length]},
+               "aliases": {alias_norm: titulo_norm}}
+  records : un JSON zlib por página; offset relativo al final del índice
+
+En runtime se abre con mmap y solo se descomprime la página pedida.
+
+CLI:
+  python -m agent.tools.wiki_pack build [--out model/wiki_pack.bin]
+  python -m agent.tools.wiki_pack info  [model/wiki_pack.bin]
+"""
+from __future__ import annotations
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+
+from agent.tools.wiki_cache import normalize_title
+
+MAGIC = b"MWKP"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHHI")
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+WIKI_PACK_FILE = os.getenv("WIKI_PACK_FILE", str(_PROJECT_ROOT / "model" / "wiki_pack.bin"))
+_DEFAULT_LABELS = _PROJECT_ROOT / "model" / "labels.json"
+
+
+# -----------------------
+# Escritura
+# -----------------------
+def write_pack(
+    pages: Iterable[Tuple[str, Dict[str, Any]]],
+    out_path: str,
+    labels_version: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    pages: (taxón pedido, página de fetch_fullpage). Solo se guardan las 'ok'.
+    Cada página queda accesible por el taxón pedido y por su título.
+    """
+    entries: Dict[str, List[int]] = {}
+    aliases: Dict[str, str] = {}
+    blobs: List[bytes] = []
+    offset = 0
+
+    for latin, page in pages:
+        if page.get("status") != "ok":
+            continue
+        key = normalize_title(latin)
+        if key in entries or key in aliases:
+            continue
+        blob = zlib.compress(json.dumps(page, ensure_ascii=False).encode("utf-8"), 9)
+        entries[key] = [offset, len(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+
+        title_key = normalize_title(str(page.get("title") or ""))
+        if title_key and title_key != key and title_key not in entries:
+            aliases.setdefault(title_key, key)
+
+    index = {
+        "format": FORMAT_VERSION,
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "labels_version": labels_version,
+        "entries": entries,
+        "aliases": aliases,
+    }
+    index_blob = zlib.compress(json.dumps(index, ensure_ascii=False).encode("utf-8"), 9)
+
+    out = Path(out_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(index_blob)))
+        f.write(index_blob)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, out)  # atómico: un lector nunca ve un paquete a medias
+    return index
+
+
+# -----------------------
+# Lectura (mmap)
+# -----------------------
+class WikiPack:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, _flags, index_len = _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: no es un paquete wiki (magic={magic!r})")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"{path}: versión {version} no soportada (esperada {FORMAT_VERSION})")
+            start = _HEADER.size
+            self.index: Dict[str, Any] = json.loads(zlib.decompress(self._mm[start:start + index_len]))
+            self._data_start = start + index_len
+        except Exception:
+            self._file.close()
+            raise
+
+    @property
+    def titles(self) -> List[str]:
+        return list(self.index.get("entries", {}).keys())
+
+    def __contains__(self, latin: str) -> bool:
+        return self._resolve(latin) is not None
+
+    def _resolve(self, latin: str) -> Optional[List[int]]:
+        key = normalize_title(latin)
+        entries = self.index.get("entries", {})
+        if key not in entries:
+            key = self.index.get("aliases", {}).get(key, key)
+        return entries.get(key)
+
+    def get(self, latin: str) -> Optional[Dict[str, Any]]:
+        loc = self._resolve(latin)
+        if loc is None:
+            return None
+        offset, length = loc
+        start = self._data_start + offset
+        return json.loads(zlib.decompress(self._mm[start:start + length]))
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+
+_pack: Optional[WikiPack] = None
+_pack_loaded = False
+_pack_lock = threading.Lock()
+
+
+def get_pack() -> Optional[WikiPack]:
+    """Paquete por defecto (WIKI_PACK_FILE) o None si no existe / no es válido."""
+    global _pack, _pack_loaded
+    if _pack_loaded:
+        return _pack
+    with _pack_lock:
+        if not _pack_loaded:
+            if os.path.exists(WIKI_PACK_FILE):
+                try:
+                    _pack = WikiPack(WIKI_PACK_FILE)
+                except Exception as e:
+                    print(f"[wiki_pack] ignorado '{WIKI_PACK_FILE}': {e}")
+                    _pack = None
+            _pack_loaded = True
+    return _pack
+
+
+def lookup(latin: str) -> Optional[Dict[str, Any]]:
+    """Página del paquete (sin red) o None si el taxón no está empaquetado."""
+    if not latin:
+        return None
+    pack = get_pack()
+    return pack.get(latin) if pack is not None else None
+
+
+# -----------------------
+# Construcción (CLI)
+# -----------------------
+def taxa_from_labels(labels_path: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+    """Taxones de agent/labels.py + id2label/classes de labels.json (sin duplicados)."""
+    from agent.labels import LABEL_TO_LATIN
+
+    taxa: List[str] = list(LABEL_TO_LATIN.values())
+    version: Optional[str] = None
+    path = Path(labels_path) if labels_path else _DEFAULT_LABELS
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        version = meta.get("version")
+        names = list((meta.get("id2label") or {}).values()) or list(meta.get("classes") or [])
+        # Nombres comunes ("Mantled_howler") -> latín; los ya latinos pasan tal cual
+        taxa.extend(LABEL_TO_LATIN.get(n, n) for n in names)
+
+    seen, uniq = set(), []
+    for t in taxa:
+        k = normalize_title(t)
+        if k and k not in seen:
+            seen.add(k)
+            uniq.append(k)
+    return uniq, version
+
+
+def build(out_path: str, labels_path: Optional[str] = None, extra: Iterable[str] = ()) -> Dict[str, Any]:
+    from agent.tools.wiki import fetch_fullpage
+
+    taxa, version = taxa_from_labels(labels_path)
+    taxa.extend(normalize_title(x) for x in extra if normalize_title(x) not in taxa)
+
+    pages: List[Tuple[str, Dict[str, Any]]] = []
+    for latin in taxa:
+        page = fetch_fullpage(latin)
+        print(f"[wiki_pack] {latin}: {page.get('status')}"
+              + (f" ({len(page.get('plain_text') or '')} chars)" if page.get("status") == "ok" else ""))
+        pages.append((latin, page))
+    return write_pack(pages, out_path, labels_version=version)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m agent.tools.wiki_pack")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_build = sub.add_parser("build", help="descarga y empaqueta las páginas de los taxones del modelo")
+    p_build.add_argument("--out", default=WIKI_PACK_FILE)
+    p_build.add_argument("--labels", default=None, help="labels.json (por defecto model/labels.json)")
+    p_build.add_argument("--extra", nargs="*", default=[], help="taxones adicionales 'Genus species'")
+
+    p_info = sub.add_parser("info", help="muestra el índice de un paquete")
+    p_info.add_argument("path", nargs="?", default=WIKI_PACK_FILE)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "build":
+        index = build(args.out, args.labels, args.extra)
+        size = os.path.getsize(args.out)
+        print(f"[wiki_pack] {len(index['entries'])} páginas -> {args.out} ({size / 1024:.1f} KiB)")
+        return 0 if index["entries"] else 1
+
+    pack = WikiPack(args.path)
+    meta = {k: v for k, v in pack.index.items() if k not in {"entries", "aliases"}}
+    print(json.dumps(meta, indent=2, ensure_ascii=False))
+    for title in pack.titles:
+        print(" -", title)
+    pack.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# agent/utils/batching.py
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import queue
+import threading
+import time
+
+"""
+Micro-batching genérico:
+  - Los llamadores concurrentes hacen submit(item) y reciben un Future.
+  - Un hilo de fondo agrupa items durante como mucho `max_wait_ms`
+    o hasta `max_batch_size`, y llama UNA vez a fn(items) -> results.
+  - fn debe devolver una lista con el mismo orden y longitud que items.
+  - Tras close(), submit() falla al instante y lo que quedara en cola se
+    resuelve con error: ningún Future se queda sin resolver.
+"""
+
+_STOP = object()
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        name: str = "microbatcher",
+    ) -> None:
+        self.fn = fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._batches = 0
+        self._items = 0
+
+    # -----------------------
+    # API pública
+    # -----------------------
+    def submit(self, item: Any) -> Future:
+        fut: Future = Future()
+        # Mismo lock que close(): nada se encola detrás del _STOP
+        with self._lock:
+            if self._closed:
+                fut.set_exception(RuntimeError(f"{self.name}: cerrado"))
+                return fut
+            self._ensure_worker_locked()
+            self._queue.put((item, fut))
+        return fut
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            t = self._thread
+            self._thread = None
+            if t is not None:
+                self._queue.put(_STOP)
+        if t is not None:
+            t.join(timeout=timeout)
+        self._fail_leftovers()
+        if t is not None and t.is_alive():
+            # El drenaje se llevó el _STOP: el worker lo recibe al acabar su lote
+            self._queue.put(_STOP)
+
+    def stats(self) -> Dict[str, float]:
+        avg = (self._items / self._batches) if self._batches else 0.0
+        return {"batches": self._batches, "items": self._items, "avg_batch_size": avg}
+
+    # -----------------------
+    # Worker
+    # -----------------------
+    def _ensure_worker_locked(self) -> None:
+        if self._thread is None:
+            t = threading.Thread(target=self._run, name=self.name, daemon=True)
+            t.start()
+            self._thread = t
+
+    def _fail_leftovers(self) -> None:
+        # Lo que el worker no llegó a despachar (p. ej. join con timeout)
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is _STOP:
+                continue
+            _, fut = entry
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(RuntimeError(f"{self.name}: cerrado"))
+
+    def _collect(self, first: Tuple[Any, Future]) -> Tuple[List[Tuple[Any, Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Con ventana 0 solo vaciamos lo que ya esté encolado
+                nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is _STOP:
+                return batch, True
+            batch.append(nxt)
+        return batch, False
+
+    def _dispatch(self, batch: List[Tuple[Any, Future]]) -> None:
+        # Descarta futures cancelados antes de arrancar
+        live = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+        if not live:
+            return
+        try:
+            results = self.fn([item for item, _ in live])
+            if len(results) != len(live):
+                raise RuntimeError(
+                    f"{self.name}: fn devolvió {len(results)} resultados para {len(live)} items"
+                )
+        except BaseException as e:  # se propaga a TODOS los llamadores del lote
+            for _, fut in live:
+                fut.set_exception(e)
+            return
+
+        self._batches += 1
+        self._items += len(live)
+        for (_, fut), res in zip(live, results):
+            fut.set_result(res)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            self._dispatch(batch)
+            if stop:
+                return
@@ -0,0 +1,142 @@
+# agent/utils/cache.py
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Tuple, Union
+import json
+import sqlite3
+import threading
+import time
+
+"""
+Primitivas de caché reutilizables por las tools:
+  - LRUCache: en memoria, acotada por nº de entradas, TTL por entrada.
+  - SQLiteStore: persistente (JSON), TTL por entrada; opcionalmente acotada
+    (max_entries: fuera primero lo caducado y luego lo más antiguo).
+
+Las dos cuentan `evictions` (entradas expulsadas por tamaño).
+
+Ambas exponen:
+  get(key)        -> valor si existe y NO ha caducado, si no None
+  get_entry(key)  -> (valor, expires_at) aunque haya caducado (para revalidar)
+  set(key, value, ttl)
+"""
+
+Entry = Tuple[Any, float]
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get_entry(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + float(ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteStore:
+    def __init__(self, path: Union[str, Path], table: str = "cache", max_entries: Optional[int] = None) -> None:
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.max_entries = int(max_entries) if max_entries else None
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def get_entry(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0]), float(row[1])
+        except ValueError:
+            return None
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, time.time() + float(ttl)),
+            )
+            if self.max_entries is not None:
+                self._prune_locked()
+
+    def _prune_locked(self) -> None:
+        now = time.time()
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        if count <= self.max_entries:  # type: ignore[operator]
+            return
+        expired = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,)).rowcount
+        excess = count - expired - self.max_entries  # type: ignore[operator]
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN"
+                f" (SELECT key FROM {self.table} ORDER BY expires_at ASC LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+
+    def pop(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,81 @@
+# agent/utils/image_artifact.py
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+import hashlib
+import io
+import os
+
+from PIL import Image
+
+from agent.utils.cache import LRUCache
+from agent.utils.images import apply_draft
+
+"""
+Imagen decodificada una sola vez por subida (ensure_image) y compartida por
+infer_local (píxeles + SHA-256) y ask_gpt41_vision (bytes originales).
+
+El artefacto vive en un registro en proceso; el estado del grafo solo lleva
+la referencia (_tmp.image_ref) y metadatos serializables (formato, tamaño),
+así que un checkpointer nunca persiste objetos PIL. Si la referencia ya no
+está (reinicio, otro worker, expulsada del LRU) o no corresponde a los
+image_bytes actuales, get_artifact devuelve None y el nodo decodifica como
+antes.
+"""
+
+IMAGE_ARTIFACT_MAX = int(os.getenv("IMAGE_ARTIFACT_MAX", "64"))
+IMAGE_ARTIFACT_TTL = float(os.getenv("IMAGE_ARTIFACT_TTL", "600"))
+
+
+@dataclass(frozen=True)
+class ImageArtifact:
+    pil: Image.Image          # RGB; JPEG reducido a min_size (draft)
+    data: bytes               # bytes originales, tal cual se subieron
+    format: Optional[str]     # JPEG | PNG | WEBP | ...
+    width: int                # dimensiones originales
+    height: int
+    sha256: str
+
+    @property
+    def ref(self) -> str:
+        return f"img-{self.sha256}"
+
+    def meta(self) -> Dict[str, Any]:
+        """Lo que sí puede ir al estado."""
+        return {"image_ref": self.ref, "image_format": self.format, "image_size": [self.width, self.height]}
+
+
+def decode_artifact(src: Union[bytes, bytearray, str], min_size: Optional[Tuple[int, int]] = None) -> ImageArtifact:
+    """Bytes o ruta -> ImageArtifact con un único Image.open (ver decode_image)."""
+    data = bytes(src) if isinstance(src, (bytes, bytearray)) else Path(src).read_bytes()
+    img = Image.open(io.BytesIO(data))
+    fmt, (width, height) = img.format, img.size
+    pil = apply_draft(img, min_size).convert("RGB")
+    return ImageArtifact(pil, data, fmt, width, height, hashlib.sha256(data).hexdigest())
+
+
+_registry = LRUCache(IMAGE_ARTIFACT_MAX)
+
+
+def register(artifact: ImageArtifact) -> str:
+    _registry.set(artifact.ref, artifact, IMAGE_ARTIFACT_TTL)
+    return artifact.ref
+
+
+def get_artifact(state: Dict[str, Any]) -> Optional[ImageArtifact]:
+    """Artefacto de _tmp.image_ref si sigue registrado y es el de image_bytes."""
+    ref = (state.get("_tmp") or {}).get("image_ref")
+    if not ref:
+        return None
+    artifact = _registry.get(ref)
+    if artifact is None:
+        return None
+    img_bytes = state.get("image_bytes")
+    if img_bytes and img_bytes is not artifact.data and bytes(img_bytes) != artifact.data:
+        return None   # nueva subida sin pasar por ensure_image
+    return artifact
+
+
+def clear() -> None:
+    _registry.clear()
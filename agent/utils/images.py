@@ -1,15 +1,19 @@
 import io
-import requests
-from PIL import Image
+import os
+from typing import Any, Dict, Optional, Tuple, Union
+from PIL import Image, ImageOps
 
-import requests
+from agent.utils import transport
+
+# Decodificación JPEG reducida (draft): el clasificador solo ve min_size
+IMAGE_DRAFT_DECODE = os.getenv("IMAGE_DRAFT_DECODE", "1") == "1"
 
 def download_to_bytes(url: str) -> bytes:
     """Descarga una imagen desde una URL y devuelve bytes."""
     headers = {
         "User-Agent": "MonoAgentBot/0.1 (https://github.com/Barearojojuan/monoagent-langgraph; mailto:tu-email@example.com)"
     }
-    resp = requests.get(url, headers=headers, timeout=10)
+    resp = transport.get(url, headers=headers, timeout=10)
     resp.raise_for_status()
     return resp.content
 
@@ -20,6 +24,70 @@ def image_to_bytes(pil_img, format: str = "PNG") -> bytes:
     pil_img.save(buf, format=format)
     return buf.getvalue()
 
+def decode_image(src: Union[bytes, bytearray, str], min_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """
+    Bytes o ruta -> PIL RGB. Con min_size=(ancho, alto) y JPEG, el decoder
+    escala en el propio IDCT (draft: 1/2, 1/4, 1/8) a la menor resolución
+    que sigue cubriendo min_size en ambos lados; una foto de 12 MP para un
+    modelo de 224 px se decodifica a ~1/8, con mucha menos CPU y memoria.
+    Otros formatos (PNG, WebP...) se decodifican completos.
+    """
+    img = Image.open(io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else src)
+    return apply_draft(img, min_size).convert("RGB")
+
+def apply_draft(img: Image.Image, min_size: Optional[Tuple[int, int]]) -> Image.Image:
+    """Configura el decoder JPEG de una imagen recién abierta (no-op si no aplica)."""
+    if min_size and IMAGE_DRAFT_DECODE and img.format == "JPEG":
+        img.draft("RGB", (int(min_size[0]), int(min_size[1])))
+    return img
+
+_MIME = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+def image_mime(data: bytes) -> str:
+    """MIME según el contenido (no la extensión); image/jpeg si no se reconoce."""
+    try:
+        return _MIME.get(Image.open(io.BytesIO(data)).format or "", "image/jpeg")
+    except Exception:
+        return "image/jpeg"
+
+def prepare_vision_payload(
+    data: bytes,
+    max_side: int = 768,
+    format: str = "JPEG",
+    quality: int = 85,
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    Imagen para un modelo de visión remoto: orientación EXIF aplicada, lado
+    mayor <= max_side, sin EXIF/ICC y re-codificada como JPEG o WebP con
+    `quality`. Si el original ya es más pequeño, cabe en max_side y no
+    lleva metadatos, se envía tal cual.
+    Devuelve (bytes, mime, info) con info = {bytes_in, bytes_out, size_in,
+    size_out, mime}.
+    """
+    fmt = {"JPG": "JPEG"}.get(format.upper(), format.upper())
+    if fmt not in {"JPEG", "WEBP"}:
+        raise ValueError(f"formato no soportado para visión: {format}")
+    img = Image.open(io.BytesIO(data))
+    size_in = list(img.size)
+    has_meta = bool(img.info.get("exif") or img.info.get("icc_profile"))
+    orig_mime = _MIME.get(img.format or "")
+
+    img = apply_draft(img, (max_side, max_side))
+    img = ImageOps.exif_transpose(img).convert("RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, quality=int(quality), optimize=(fmt == "JPEG"))
+    out, mime, size_out = buf.getvalue(), _MIME[fmt], list(img.size)
+
+    if orig_mime and not has_meta and max(size_in) <= max_side and len(data) <= len(out):
+        out, mime, size_out = data, orig_mime, size_in
+
+    return out, mime, {
+        "bytes_in": len(data), "bytes_out": len(out),
+        "size_in": size_in, "size_out": size_out, "mime": mime,
+    }
+
 def is_valid_image_bytes(data: bytes) -> bool:
     """Verifica que los bytes corresponden a una imagen válida."""
     try:
@@ -0,0 +1,258 @@
+# agent/utils/inference_pool.py
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import multiprocessing as mp
+import os
+import queue
+import threading
+
+"""
+Pool de procesos para inferencia CPU:
+  - N procesos hijos, cada uno fijado (sched_setaffinity) a un tramo de
+    núcleos y con torch.set_num_threads igual al tamaño del tramo: varios
+    forwards en paralelo en vez de uno con intra-op mal aprovechado a lote 1.
+  - Los hijos se crean con fork DESPUÉS de que el padre cargue el modelo, así
+    que los pesos se comparten copy-on-write (nadie los escribe) en lugar de
+    duplicarse por proceso. El padre no debe haber hecho forwards antes del
+    fork (los pools de hilos de OpenMP no sobreviven a fork).
+  - submit(items) elige el hijo con menos trabajos en curso y devuelve un
+    Future; fn(items) -> results corre en el hijo (mismo contrato que
+    MicroBatcher: misma longitud y orden).
+  - Si un hijo muere, sus trabajos pendientes fallan con RuntimeError y deja
+    de recibir trabajo.
+"""
+
+_STOP = None
+
+
+def core_slices(workers: int, cores: Optional[Sequence[int]] = None) -> List[List[int]]:
+    """Reparte los núcleos disponibles en `workers` tramos contiguos (reutiliza si faltan)."""
+    if cores is None:
+        try:
+            cores = sorted(os.sched_getaffinity(0))
+        except AttributeError:   # macOS / Windows
+            cores = list(range(os.cpu_count() or 1))
+    cores = list(cores)
+    if workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    size, extra = divmod(len(cores), workers)
+    out, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        out.append(cores[start:end])
+        start = end
+    return out
+
+
+def _worker_main(idx: int, cores: List[int], threads: int, pin: bool,
+                 fn: Callable[[List[Any]], List[Any]], init: Optional[Callable[[], Any]],
+                 jobs: "mp.Queue", results: "mp.Queue") -> None:
+    import torch
+
+    if pin and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError as e:
+            print(f"[inference_pool] worker {idx}: no pude fijar núcleos {cores}: {e}")
+    torch.set_num_threads(max(1, threads))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass   # solo se puede fijar antes del primer trabajo inter-op
+
+    try:
+        if init is not None:
+            init()
+        results.put(("ready", idx, None, None))
+    except BaseException as e:
+        results.put(("ready", idx, None, f"{type(e).__name__}: {e}"))
+        return
+
+    while True:
+        job = jobs.get()
+        if job is _STOP:
+            return
+        job_id, items = job
+        try:
+            results.put((job_id, idx, fn(items), None))
+        except BaseException as e:
+            results.put((job_id, idx, None, f"{type(e).__name__}: {e}"))
+
+
+class InferencePool:
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        workers: int = 2,
+        threads: Optional[int] = None,
+        pin: bool = True,
+        init: Optional[Callable[[], Any]] = None,
+        on_ready: Optional[Callable[[], Any]] = None,
+        name: str = "inference-pool",
+    ) -> None:
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.threads = threads
+        self.pin = pin
+        self.init = init
+        self.on_ready = on_ready
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._procs: List[Any] = []
+        self._jobs: List[Any] = []
+        self._results: Any = None
+        self._collector: Optional[threading.Thread] = None
+        self._pending: Dict[int, Future] = {}
+        self._owner: Dict[int, int] = {}          # job_id -> worker
+        self._inflight: List[int] = []
+        self._done: List[int] = []
+        self._alive: List[bool] = []
+        self._ready = threading.Event()
+        self._started: set = set()               # workers que ya pasaron init()
+        self._errors: List[str] = []
+        self._next_id = 0
+        self._closed = False
+
+    # -----------------------
+    # API pública
+    # -----------------------
+    def start(self) -> "InferencePool":
+        if self._procs:
+            return self
+        if "fork" not in mp.get_all_start_methods():
+            raise RuntimeError("InferencePool necesita fork (pesos compartidos copy-on-write)")
+        ctx = mp.get_context("fork")
+        slices = core_slices(self.workers)
+        self._results = ctx.Queue()
+        for idx, cores in enumerate(slices):
+            jobs = ctx.Queue()
+            p = ctx.Process(
+                target=_worker_main,
+                args=(idx, cores, self.threads or len(cores), self.pin, self.fn, self.init, jobs, self._results),
+                name=f"{self.name}-{idx}",
+                daemon=True,
+            )
+            p.start()
+            self._procs.append(p)
+            self._jobs.append(jobs)
+        self._inflight = [0] * len(self._procs)
+        self._done = [0] * len(self._procs)
+        self._alive = [True] * len(self._procs)
+        self._collector = threading.Thread(target=self._collect, name=f"{self.name}-collector", daemon=True)
+        self._collector.start()
+        return self
+
+    def submit(self, items: List[Any]) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            live = [i for i, ok in enumerate(self._alive) if ok]
+            if self._closed or not live:
+                fut.set_exception(RuntimeError(f"{self.name}: sin workers activos"))
+                return fut
+            idx = min(live, key=lambda i: self._inflight[i])   # el menos cargado
+            job_id = self._next_id
+            self._next_id += 1
+            self._pending[job_id] = fut
+            self._owner[job_id] = idx
+            self._inflight[idx] += 1
+        self._jobs[idx].put((job_id, list(items)))
+        return fut
+
+    def __call__(self, items: List[Any], timeout: Optional[float] = None) -> List[Any]:
+        return self.submit(items).result(timeout=timeout)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """True cuando todos los workers han terminado init() (calentamiento)."""
+        return self._ready.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for jobs in self._jobs:
+            jobs.put(_STOP)
+        for p in self._procs:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        if self._results is not None:
+            self._results.put(("stop", -1, None, None))
+        if self._collector is not None:
+            self._collector.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._procs),
+                "alive": sum(self._alive),
+                "inflight": list(self._inflight),
+                "done": list(self._done),
+                "errors": list(self._errors),
+            }
+
+    # -----------------------
+    # Resultados
+    # -----------------------
+    def _collect(self) -> None:
+        while True:
+            self._reap()
+            try:
+                job_id, idx, res, err = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if job_id == "stop":
+                self._fail_pending(None, RuntimeError(f"{self.name}: cerrado"))
+                return
+            if job_id == "ready":
+                self._on_ready(idx, err)
+                continue
+            with self._lock:
+                fut = self._pending.pop(job_id, None)
+                if fut is not None:
+                    self._owner.pop(job_id, None)
+                    self._inflight[idx] -= 1
+                    self._done[idx] += 1
+            if fut is None:
+                continue   # resultado tardío de un job que _fail_pending ya descontó
+            if err is not None:
+                fut.set_exception(RuntimeError(f"{self.name}[{idx}]: {err}"))
+            else:
+                fut.set_result(res)
+
+    def _on_ready(self, idx: int, err: Optional[str]) -> None:
+        with self._lock:
+            if idx in self._started:
+                return
+            self._started.add(idx)
+            if err is not None:
+                self._errors.append(f"worker {idx}: {err}")
+                self._alive[idx] = False
+                print(f"[inference_pool] worker {idx} no arrancó: {err}")
+            if len(self._started) < len(self._procs):
+                return
+            self._ready.set()
+        if self.on_ready is not None and any(self._alive):
+            self.on_ready()
+
+    def _reap(self) -> None:
+        for idx, p in enumerate(self._procs):
+            if self._alive[idx] and not p.is_alive():
+                with self._lock:
+                    self._alive[idx] = False
+                    self._errors.append(f"worker {idx}: terminó con código {p.exitcode}")
+                print(f"[inference_pool] worker {idx} terminó (exitcode={p.exitcode})")
+                self._on_ready(idx, f"terminó con código {p.exitcode}")
+                self._fail_pending(idx, RuntimeError(f"{self.name}[{idx}]: worker caído"))
+
+    def _fail_pending(self, idx: Optional[int], exc: BaseException) -> None:
+        with self._lock:
+            ids = [j for j, w in self._owner.items() if idx is None or w == idx]
+            futs = [self._pending.pop(j) for j in ids if j in self._pending]
+            for j in ids:
+                w = self._owner.pop(j)
+                self._inflight[w] -= 1
+        for fut in futs:
+            fut.set_exception(exc)
@@ -0,0 +1,114 @@
+# agent/utils/singleflight.py
+from __future__ import annotations
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import functools
+import hashlib
+import inspect
+import threading
+
+"""
+Single-flight: llamadas concurrentes con la MISMA clave comparten una única
+ejecución en vuelo y su resultado (o su excepción).
+
+  - do(key, fn, *args)              -> para llamadores en hilos
+  - await do_async(key, fn, *args)  -> para llamadores asyncio
+      · si fn es una corrutina, se comparte una Task dentro de su event
+        loop: NO se coalesce con los llamadores en hilos (do()) ni con
+        otros loops, cada uno tiene su propio vuelo para la misma clave
+      · si fn es síncrona, va al executor pasando por do(), así que se
+        coalesce también con los llamadores en hilos
+
+Todos los llamadores reciben el MISMO objeto resultado: trátalo como de
+solo lectura o cópialo (en profundidad) antes de modificarlo.
+
+No es una caché: en cuanto la llamada termina, la clave se libera.
+"""
+
+
+def fingerprint(*parts: Any) -> str:
+    """Hash estable de argumentos (bytes se hashean tal cual, el resto vía repr)."""
+    h = hashlib.sha256()
+    for p in parts:
+        if isinstance(p, (bytes, bytearray, memoryview)):
+            h.update(b"b:")
+            h.update(bytes(p))
+        else:
+            h.update(b"r:")
+            h.update(repr(p).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], "asyncio.Future[Any]"] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls or any(k == key for _, k in self._async_calls)
+
+    # -----------------------
+    # Hilos
+    # -----------------------
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        assert call is not None
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    # -----------------------
+    # asyncio
+    # -----------------------
+    async def do_async(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        akey = (loop, key)
+        with self._lock:
+            fut = self._async_calls.get(akey)
+            if fut is None:
+                if inspect.iscoroutinefunction(fn):
+                    fut = loop.create_task(fn(*args, **kwargs))
+                else:
+                    fut = loop.run_in_executor(None, functools.partial(self.do, key, fn, *args, **kwargs))
+                self._async_calls[akey] = fut
+                fut.add_done_callback(functools.partial(self._forget_async, akey))
+        # shield: si un llamador se cancela no cancela la llamada compartida
+        return await asyncio.shield(fut)
+
+    def _forget_async(self, akey: Tuple[asyncio.AbstractEventLoop, Hashable], fut: "asyncio.Future[Any]") -> None:
+        with self._lock:
+            if self._async_calls.get(akey) is fut:
+                del self._async_calls[akey]
+        if not fut.cancelled():
+            fut.exception()  # marca la excepción como recuperada (evita warnings)
@@ -0,0 +1,53 @@
+# agent/utils/streaming.py
+from __future__ import annotations
+from typing import Any, Dict, Optional
+import os
+import uuid
+
+from langchain_core.messages import AIMessageChunk
+
+"""
+Emisión de tokens desde los nodos por el stream "custom" de LangGraph.
+
+    for mode, data in app.stream(inputs, stream_mode=["custom", "values"]):
+        if mode == "custom" and data.get("type") == "token":
+            print(data["chunk"].content, end="", flush=True)
+
+Cada evento es {"type": "token", "node": str, "chunk": AIMessageChunk}; todos
+los chunks de una respuesta comparten id con el AIMessage final que el nodo
+añade a `messages`, así que el consumidor puede reconciliarlos.
+
+Opt-in: solo si el consumidor lo pide con state['stream_tokens']=True (por
+defecto GPT_STREAM=0) junto con stream_mode="custom". LangGraph da un writer
+también a runs que no escuchan "custom" (invoke, stream "values"), así que
+sin la marca los nodos usan ask_gpt_text normal. Fuera de un run del grafo
+(llamada directa al nodo) no hay writer y tampoco se hace streaming.
+"""
+
+GPT_STREAM = os.getenv("GPT_STREAM", "0") == "1"
+
+
+class TokenStream:
+    def __init__(self, writer: Any, node: str) -> None:
+        self._writer = writer
+        self.node = node
+        self.id = f"run-{uuid.uuid4()}"
+        self.sent = 0   # nº de caracteres emitidos
+
+    def emit(self, text: str) -> None:
+        if not text:
+            return
+        self.sent += len(text)
+        self._writer({"type": "token", "node": self.node, "chunk": AIMessageChunk(content=text, id=self.id)})
+
+
+def token_stream(state: Dict[str, Any], node: str) -> Optional[TokenStream]:
+    """TokenStream si hay que emitir tokens en este run, si no None."""
+    if not state.get("stream_tokens", GPT_STREAM):
+        return None
+    try:
+        from langgraph.config import get_stream_writer  # type: ignore
+        writer = get_stream_writer()
+    except Exception:
+        return None   # fuera de un run del grafo
+    return TokenStream(writer, node)
@@ -0,0 +1,298 @@
+# agent/utils/transport.py
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+"""
+Transporte HTTP compartido (Wikipedia, descargas de imágenes, ...):
+  - Una requests.Session por proceso con pools acotados y keep-alive
+  - Reintentos con backoff exponencial + jitter en 429/5xx y errores de
+    conexión, respetando Retry-After (acotado)
+  - Circuit breaker por host: tras N fallos seguidos se falla al instante
+    (CircuitOpenError) durante HTTP_CB_RESET_S; luego se deja pasar una
+    petición de prueba (half-open)
+
+CircuitOpenError hereda de requests.ConnectionError, así que los
+`except requests.RequestException` / `except Exception` existentes lo cubren.
+
+Versión asyncio: aget(). Usa httpx.AsyncClient (uno por event loop, mismos
+límites de pool, breakers compartidos con la versión síncrona) y, si httpx
+no está instalado, cae a get() en un hilo del executor. Antes de cerrar el
+loop, `await aclose()` cierra su cliente (conexiones keep-alive incluidas).
+"""
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))    # nº de hosts con pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))           # conexiones por host
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", "0.3"))
+HTTP_RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "5"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_CB_FAILURES = int(os.getenv("HTTP_CB_FAILURES", "5"))
+HTTP_CB_RESET_S = float(os.getenv("HTTP_CB_RESET_S", "30"))
+
+_RETRY_STATUS = (429, 500, 502, 503, 504)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """El host está marcado como caído: no se intenta la petición."""
+
+
+class _CappedRetry(Retry):
+    # Un Retry-After enorme no debe bloquear un run del grafo
+    def parse_retry_after(self, retry_after: str) -> float:
+        return min(super().parse_retry_after(retry_after), HTTP_RETRY_AFTER_MAX)
+
+
+def _make_retry() -> Retry:
+    kwargs: Dict[str, Any] = dict(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=_RETRY_STATUS,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return _CappedRetry(backoff_jitter=HTTP_BACKOFF_JITTER, **kwargs)
+    except TypeError:  # urllib3 < 2 no tiene backoff_jitter
+        return _CappedRetry(**kwargs)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = HTTP_CB_FAILURES, reset_timeout: float = HTTP_CB_RESET_S) -> None:
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True  # una sola petición de prueba
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """
+        La petición terminó sin veredicto sobre el host (cancelada,
+        KeyboardInterrupt, error al decodificar...): libera la prueba
+        half-open sin contar éxito ni fallo.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    max_retries=_make_retry(),
+                )
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session = s
+    return _session
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    with _session_lock:
+        br = _breakers.get(host)
+        if br is None:
+            br = _breakers[host] = CircuitBreaker()
+        return br
+
+
+def request(method: str, url: str, timeout: Timeout = 12, **kwargs: Any) -> requests.Response:
+    host = urlsplit(url).netloc
+    br = breaker_for(host)
+    if not br.allow():
+        raise CircuitOpenError(f"circuit open for {host}")
+
+    # Conexión rápida: si el host no responde al handshake no esperamos el read timeout
+    if isinstance(timeout, (int, float)):
+        timeout = (min(HTTP_CONNECT_TIMEOUT, float(timeout)), float(timeout))
+
+    recorded = False
+    try:
+        try:
+            resp = get_session().request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            recorded = True
+            br.record_failure()
+            raise
+
+        recorded = True
+        if resp.status_code in _RETRY_STATUS:
+            br.record_failure()   # ya agotó los reintentos
+        else:
+            br.record_success()
+        return resp
+    finally:
+        if not recorded:
+            br.release()  # cualquier otra excepción no deja el breaker abierto para siempre
+
+
+def get(url: str, timeout: Timeout = 12, **kwargs: Any) -> requests.Response:
+    return request("GET", url, timeout=timeout, **kwargs)
+
+
+# -----------------------
+# asyncio (httpx opcional)
+# -----------------------
+try:
+    import httpx  # type: ignore
+except Exception:  # pragma: no cover - depende del entorno
+    httpx = None
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+
+class AsyncResponse:
+    """Vista mínima compatible con lo que usan las tools (status_code, json, content, text)."""
+
+    def __init__(self, status_code: int, content: bytes, headers: Dict[str, str], text: str) -> None:
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.text = text
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=None)
+
+
+def get_async_client():
+    if httpx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAXSIZE * HTTP_POOL_CONNECTIONS,
+                max_keepalive_connections=HTTP_POOL_MAXSIZE,
+            ),
+            follow_redirects=True,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[str]) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), HTTP_RETRY_AFTER_MAX)
+        except ValueError:
+            pass
+    return HTTP_BACKOFF * (2 ** attempt) + random.uniform(0, HTTP_BACKOFF_JITTER)
+
+
+async def aget(url: str, timeout: Timeout = 12, **kwargs: Any) -> Union[requests.Response, AsyncResponse]:
+    client = get_async_client()
+    if client is None:
+        return await asyncio.to_thread(get, url, timeout, **kwargs)
+
+    host = urlsplit(url).netloc
+    br = breaker_for(host)
+    if not br.allow():
+        raise CircuitOpenError(f"circuit open for {host}")
+
+    read_t = float(timeout[1] if isinstance(timeout, tuple) else timeout)
+    connect_t = float(timeout[0]) if isinstance(timeout, tuple) else min(HTTP_CONNECT_TIMEOUT, read_t)
+    httpx_timeout = httpx.Timeout(read_t, connect=connect_t)
+
+    attempt = 0
+    recorded = False
+    try:
+        while True:
+            try:
+                resp = await client.get(url, timeout=httpx_timeout, **kwargs)
+            except httpx.HTTPError as e:
+                if attempt < HTTP_RETRIES:
+                    await asyncio.sleep(_backoff_delay(attempt, None))
+                    attempt += 1
+                    continue
+                recorded = True
+                br.record_failure()
+                raise requests.ConnectionError(str(e)) from e
+
+            if resp.status_code in _RETRY_STATUS and attempt < HTTP_RETRIES:
+                await asyncio.sleep(_backoff_delay(attempt, resp.headers.get("Retry-After")))
+                attempt += 1
+                continue
+            break
+
+        out = AsyncResponse(resp.status_code, resp.content, dict(resp.headers), resp.text)
+        recorded = True
+        if resp.status_code in _RETRY_STATUS:
+            br.record_failure()
+        else:
+            br.record_success()
+        return out
+    finally:
+        if not recorded:
+            br.release()  # CancelledError, decodificación, ...: sin veredicto
+
+
+async def aclose() -> None:
+    """Cierra el httpx.AsyncClient del event loop actual (si se creó)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -1,49 +1,22 @@
-import json
 import time
-from pathlib import Path
 
 import gradio as gr
 import torch
-import torchvision.transforms as T
 from PIL import Image
 
-# ------------------ Rutas y carga de artefactos ------------------
-ROOT = Path(__file__).parent
-MODEL_DIR = ROOT / "model"
-MODEL_PATH = MODEL_DIR / "monkey_classifier_ts-v0.1.pt"
-LABELS_PATH = MODEL_DIR / "labels.json"
-
-assert MODEL_PATH.exists(), f"Modelo no encontrado: {MODEL_PATH}"
-assert LABELS_PATH.exists(), f"labels.json no encontrado: {LABELS_PATH}"
-
-# Cargar modelo TorchScript (CPU)
-model = torch.jit.load(str(MODEL_PATH), map_location="cpu").eval()
-
-# Cargar metadatos / labels
-with open(LABELS_PATH, "r", encoding="utf-8") as f:
-    meta = json.load(f)
-
-# Soporta ambos formatos: id2label o lista "classes"
-if "id2label" in meta:
-    id2label = {int(k): v for k, v in meta["id2label"].items()}
-    classes = [id2label[i] for i in range(len(id2label))]
-elif "classes" in meta:
-    classes = meta["classes"]
-    id2label = {i: classes[i] for i in range(len(classes))}
-else:
-    raise ValueError("labels.json debe contener 'id2label' o 'classes'")
-
-mean = meta.get("normalize", {}).get("mean", [0.4363, 0.4328, 0.3291])
-std  = meta.get("normalize", {}).get("std",  [0.2129, 0.2075, 0.2038])
-input_size = meta.get("input_size", [1, 3, 224, 224])
-image_hw = tuple(input_size[2:4])  # [H, W]
-NUM_CLASSES = len(classes)
-
-transform = T.Compose([
-    T.Resize(image_hw),
-    T.ToTensor(),
-    T.Normalize(torch.tensor(mean), torch.tensor(std))
-])
+from agent.tools import model_registry, vision
+
+# ------------------ Carga del modelo ------------------
+# El registro (agent/tools/model_registry.py) resuelve modelo y labels.json
+# (MONKEY_MODEL_DIR / MONKEY_MODEL_FILE / ...) y mantiene una única instancia
+# compartida con el grafo, con el mismo preprocesado. Con
+# MONKEY_BACKGROUND_LOAD=1 (por defecto) la carga y el calentamiento van en un
+# hilo y la UI arranca ya; una petición que llegue antes espera a la precarga.
+# vision.preload arranca también el pool de MONKEY_POOL_WORKERS (fork) aquí, en
+# el hilo principal y antes de que este proceso haga ningún forward. El pool
+# sirve al grafo (vision.infer); la demo de abajo forwardea en este proceso
+# porque muestra los logits completos y las estadísticas del tensor.
+_preload = vision.preload(background=model_registry.BACKGROUND_LOAD)
 
 # ------------------ Utilidades ------------------
 def softmax_logits(logits: torch.Tensor) -> torch.Tensor:
@@ -83,15 +56,22 @@ def infer(image: Image.Image, topk: int = 5):
       2) JSON con toda la info: predicción, top-k, probs y logits completos, entropía, tiempos, stats
       3) Markdown con resumen formateado
     """
+    if _preload is not None:
+        _preload.join()  # precarga (y fork del pool) antes del primer forward
+    loaded = model_registry.get()  # instancia compartida con el grafo
+    model, classes = loaded.backend, loaded.classes
+    num_classes = len(classes)
+
     t0 = time.perf_counter()
 
-    # Preprocesado
+    # Preprocesado (el mismo que infer_local en el grafo)
     img = image.convert("RGB")
     orig_w, orig_h = img.size
-    x = transform(img).unsqueeze(0)  # [1, C, H, W]
-    x_min, x_max = float(x.min().item()), float(x.max().item())
-    x_mean = float(x.mean().item())
-    x_std = float(x.std().item())
+    x = loaded.preprocessing.batch([img], uint8=loaded.folded)  # [1, C, H, W]
+    xf = x.float()
+    x_min, x_max = float(xf.min().item()), float(xf.max().item())
+    x_mean = float(xf.mean().item())
+    x_std = float(xf.std().item())
 
     t1 = time.perf_counter()
     logits = model(x)
@@ -101,7 +81,7 @@ def infer(image: Image.Image, topk: int = 5):
     probs = softmax_logits(logits)  # [C]
 
     # Top-k
-    k = min(int(topk), NUM_CLASSES)
+    k = min(int(topk), num_classes)
     vals, idxs = torch.topk(probs, k=k)
     topk_labels = [classes[int(i)] for i in idxs.tolist()]
     topk_scores = [float(v) for v in vals.tolist()]
@@ -127,8 +107,8 @@ def infer(image: Image.Image, topk: int = 5):
         "tensor_stats": {"min": x_min, "max": x_max, "mean": x_mean, "std": x_std},
         "prediction": {"label": top1_label, "index": top1_idx, "confidence": top1_conf},
         "topk": [{"label": l, "prob": s} for l, s in zip(topk_labels, topk_scores)],
-        "probs": {classes[i]: float(probs[i].item()) for i in range(NUM_CLASSES)},
-        "logits": {classes[i]: float(logits_list[i]) for i in range(NUM_CLASSES)},
+        "probs": {classes[i]: float(probs[i].item()) for i in range(num_classes)},
+        "logits": {classes[i]: float(logits_list[i]) for i in range(num_classes)},
         "entropy": entropy,
         "timing_ms": {
             "preprocess": (t1 - t0) * 1000.0,
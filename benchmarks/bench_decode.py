@@ -0,0 +1,151 @@
+# benchmarks/bench_decode.py
+"""
+Benchmark de decodificación de imágenes: Image.open().convert("RGB") a
+resolución completa (pipeline anterior) vs decode_image() con draft JPEG a la
+entrada del modelo.
+
+Uso:
+  # fotos reales (*.jpg, *.jpeg, *.png, *.webp)
+  python benchmarks/bench_decode.py --images ruta/a/fotos
+  # sin fotos usa JPEG sintéticos de cámara (12, 24 y 48 MP)
+  python benchmarks/bench_decode.py --synthetic 4032x3024 6000x4000 8000x6000
+
+Por imagen mide el tiempo (mediana de --repeat) y el pico de RSS. El RSS se
+mide en un subproceso por modo (VmHWM) restando el de un subproceso que
+no decodifica nada, para que el pico de una decodificación no contamine la
+siguiente. También informa de la diferencia media por píxel (0-255) tras
+redimensionar ambas salidas a la entrada del modelo: es lo que verá el
+clasificador.
+"""
+from __future__ import annotations
+import argparse
+import io
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageChops, ImageDraw, ImageStat  # noqa: E402
+
+from agent.tools.vision import input_hw  # noqa: E402
+from agent.utils.images import decode_image  # noqa: E402
+
+EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def _full(data: bytes, size: Tuple[int, int]) -> Image.Image:
+    return Image.open(io.BytesIO(data)).convert("RGB")
+
+
+def _draft(data: bytes, size: Tuple[int, int]) -> Image.Image:
+    return decode_image(data, size)
+
+
+MODES = {"full": _full, "draft": _draft}
+
+
+def synthetic_jpeg(w: int, h: int) -> bytes:
+    """Foto sintética con bordes y degradados (no un color plano)."""
+    img = Image.radial_gradient("L").resize((w, h)).convert("RGB")
+    d = ImageDraw.Draw(img)
+    for i in range(0, w, max(1, w // 24)):
+        d.line((i, 0, w - i, h), fill=(i % 255, 120, 255 - i % 255), width=max(1, w // 400))
+    d.ellipse((w // 4, h // 4, 3 * w // 4, 3 * h // 4), outline=(200, 160, 90), width=max(2, w // 100))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def load_images(args) -> List[Tuple[str, bytes]]:
+    if args.images:
+        paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in EXTS)
+        if not paths:
+            raise SystemExit(f"No hay imágenes en {args.images}")
+        return [(p.name, p.read_bytes()) for p in paths]
+    out = []
+    for spec in args.synthetic:
+        w, h = (int(x) for x in spec.lower().split("x"))
+        out.append((f"synthetic {spec}", synthetic_jpeg(w, h)))
+    return out
+
+
+def _time(fn: Callable, data: bytes, size: Tuple[int, int], repeat: int) -> float:
+    fn(data, size)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(data, size)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def _child(mode: str, path: str, w: int, h: int) -> None:
+    if mode != "none":
+        MODES[mode](Path(path).read_bytes(), (w, h))
+    # VmHWM (KiB) se reinicia en exec; ru_maxrss hereda el pico del padre tras fork
+    try:
+        with open("/proc/self/status") as f:
+            print(next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")))
+    except (OSError, StopIteration):
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)  # Linux: KiB, macOS: bytes
+
+
+def _peak_rss_kib(mode: str, path: str, size: Tuple[int, int]) -> int:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, path, str(size[0]), str(size[1])],
+        check=True, capture_output=True, text=True,
+    )
+    return int(out.stdout.strip().splitlines()[-1])
+
+
+def _pixel_diff(a: Image.Image, b: Image.Image, size: Tuple[int, int]) -> float:
+    diff = ImageChops.difference(a.resize(size, Image.BILINEAR), b.resize(size, Image.BILINEAR))
+    return sum(ImageStat.Stat(diff).mean) / 3
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", help="directorio con fotos")
+    ap.add_argument("--synthetic", nargs="+", default=["4032x3024", "6000x4000"], help="WxH de JPEG sintéticos")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        mode, path, w, h = args.child
+        _child(mode, path, int(w), int(h))
+        return 0
+
+    h, w = input_hw()
+    size = (w, h)
+    images = load_images(args)
+    print(f"{len(images)} imágenes, entrada del modelo {w}x{h}, mediana de {args.repeat} repeticiones\n")
+    print(f"{'imagen':<26}{'MP':>6}{'decod.':>12}{'full ms':>10}{'draft ms':>10}{'x':>7}"
+          f"{'full MiB':>10}{'draft MiB':>11}{'Δ px':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = None
+        for name, data in images:
+            path = str(Path(tmp) / "img")
+            Path(path).write_bytes(data)
+            if base is None:
+                base = _peak_rss_kib("none", path, size)
+
+            full, draft = _full(data, size), _draft(data, size)
+            t_full = _time(_full, data, size, args.repeat)
+            t_draft = _time(_draft, data, size, args.repeat)
+            rss = {m: max(0, _peak_rss_kib(m, path, size) - base) / 1024 for m in MODES}
+            print(f"{name[:25]:<26}{full.width * full.height / 1e6:>6.1f}{f'{draft.width}x{draft.height}':>12}"
+                  f"{t_full:>10.1f}{t_draft:>10.1f}{t_full / t_draft:>6.1f}x"
+                  f"{rss['full']:>10.1f}{rss['draft']:>11.1f}{_pixel_diff(full, draft, size):>7.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
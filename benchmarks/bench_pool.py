@@ -0,0 +1,126 @@
+# benchmarks/bench_pool.py
+"""
+Throughput de vision.infer con varios clientes concurrentes: en proceso
+(un forward a la vez por el GIL/intra-op) vs pool de procesos
+(MONKEY_POOL_WORKERS, agent/utils/inference_pool.py).
+
+Uso:
+  python benchmarks/bench_pool.py --workers 1 2 4 --clients 8 --requests 200
+  python benchmarks/bench_pool.py --images ruta/fotos --workers 2 4
+
+Por configuración informa de imágenes/s, latencia p50/p95 por petición y la
+memoria del conjunto padre + workers: RSS suma lo compartido una vez por
+proceso, PSS (smaps_rollup) reparte las páginas compartidas, así que
+PSS total << RSS total indica que los pesos no están duplicados.
+"""
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from agent.tools import vision  # noqa: E402
+from agent.tools.model_export import IMAGE_EXTS  # noqa: E402
+from agent.utils.images import decode_image  # noqa: E402
+
+
+def _images(root: str, limit: int) -> List[Image.Image]:
+    h, w = vision.input_hw()
+    if root:
+        paths = sorted(p for p in Path(root).rglob("*") if p.suffix.lower() in IMAGE_EXTS)[:limit]
+        if not paths:
+            raise SystemExit(f"No hay imágenes en {root}")
+        return [decode_image(p.read_bytes(), (w, h)) for p in paths]
+    out = []
+    for i in range(min(limit, 16)):
+        img = Image.new("RGB", (w * 2, h * 2), (20 + 12 * i, 110, 60))
+        ImageDraw.Draw(img).ellipse((w // 2, h // 3, w + w // 2, h + h // 3), fill=(190, 140 - 5 * i, 90))
+        out.append(img)
+    return out
+
+
+def _mem_kib(pid: int) -> Dict[str, int]:
+    out = {"rss": 0, "pss": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key = line.split(":")[0].lower()
+                if key in out:
+                    out[key] = int(line.split()[1])
+    except OSError:
+        pass
+    return out
+
+
+def _memory(pool: Any) -> Dict[str, float]:
+    pids = [os.getpid()] + ([p.pid for p in pool._procs] if pool is not None else [])
+    mems = [_mem_kib(pid) for pid in pids]
+    return {k: sum(m[k] for m in mems) / 1024 for k in ("rss", "pss")}
+
+
+def run(workers: int, images: List[Image.Image], clients: int, requests: int) -> Dict[str, Any]:
+    vision.POOL_WORKERS = workers
+    vision._pool = None
+    if workers > 0:
+        vision._get_pool().wait_ready()
+    else:
+        vision.warmup()
+
+    lat: List[float] = []
+
+    def one(i: int) -> None:
+        t0 = time.perf_counter()
+        vision.infer(images[i % len(images)], topk=5)
+        lat.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as ex:
+        list(ex.map(one, range(requests)))
+    elapsed = time.perf_counter() - t0
+
+    mem = _memory(vision._pool)
+    if vision._pool is not None:
+        vision._pool.close()
+    lat.sort()
+    return {
+        "workers": workers,
+        "img_s": requests / elapsed,
+        "p50_ms": statistics.median(lat),
+        "p95_ms": lat[int(0.95 * (len(lat) - 1))],
+        **{f"{k}_mib": v for k, v in mem.items()},
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", default="", help="carpeta de fotos (por defecto sintéticas)")
+    ap.add_argument("--workers", type=int, nargs="+", default=[2, 4], help="tamaños de pool a probar")
+    ap.add_argument("--clients", type=int, default=8, help="peticiones concurrentes")
+    ap.add_argument("--requests", type=int, default=200)
+    args = ap.parse_args()
+
+    images = _images(args.images, 64)
+    # Los workers se crean con fork: el padre carga el modelo pero no hace
+    # forwards hasta medir la configuración en proceso (al final)
+    vision.load_model()
+    configs = sorted(set(w for w in args.workers if w > 0)) + [0]
+
+    print(f"{len(images)} imágenes, {args.clients} clientes, {args.requests} peticiones\n")
+    print(f"{'workers':<10}{'img/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'RSS MiB':>10}{'PSS MiB':>10}")
+    rows = [run(w, images, args.clients, args.requests) for w in configs]
+    for r in sorted(rows, key=lambda r: r["workers"]):
+        name = "proceso" if r["workers"] == 0 else str(r["workers"])
+        print(f"{name:<10}{r['img_s']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['rss_mib']:>10.1f}{r['pss_mib']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+# benchmarks/bench_wiki_extract.py
+"""
+Benchmark de extracción de Wikipedia: pipeline antiguo (dos parseos + selects
+por elemento + regex sobre el texto unido) vs _extract_page (un parseo).
+
+Uso:
+  # 1) grabar páginas reales (HTML de action=parse) una vez
+  python benchmarks/bench_wiki_extract.py --record benchmarks/pages
+  # 2) medir sobre las páginas grabadas
+  python benchmarks/bench_wiki_extract.py --pages benchmarks/pages
+  # sin páginas grabadas usa HTML sintético con estructura de Wikipedia
+  python benchmarks/bench_wiki_extract.py --synthetic 5
+
+Además del tiempo, comprueba que (plain_text, infobox) es IDÉNTICO al del
+pipeline antiguo para cada página y backend; si no, sale con código 1.
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup, NavigableString, Tag  # noqa: E402
+
+from agent.tools import wiki  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Referencia: copia congelada del pipeline anterior (html.parser, 2 parseos)
+# ---------------------------------------------------------------------------
+def _legacy_html_to_text(el: Union[Tag, NavigableString]) -> str:
+    if isinstance(el, NavigableString):
+        return wiki._clean_text(str(el))
+    for sup in el.select("sup.reference, sup[role='note']"):
+        sup.decompose()
+    for rm in el.select("table.navbox, table.metadata, figure, style, script"):
+        rm.decompose()
+    return wiki._clean_text(el.get_text(separator="\n", strip=True))
+
+
+def _legacy_infobox(root: Tag) -> Dict[str, str]:
+    def has_infobox_class(c):
+        if not c:
+            return False
+        if isinstance(c, list):
+            return any("infobox" in cls for cls in c)
+        return "infobox" in c
+
+    table = root.find("table", class_=has_infobox_class)
+    if not table:
+        return {}
+    info: Dict[str, str] = {}
+    for tr in table.find_all("tr", recursive=False):
+        th, td = tr.find("th"), tr.find("td")
+        if not th or not td:
+            continue
+        key = wiki._clean_text(th.get_text(" ", strip=True)).rstrip(":")
+        val = _legacy_html_to_text(td)
+        if key and val:
+            info[key] = val
+    return info
+
+
+def _legacy_plaintext(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    content = soup.select_one("div.mw-parser-output") or soup
+    parts: List[str] = []
+    for el in content.children:
+        if not isinstance(el, Tag):
+            continue
+        if el.name in {"h1", "h2", "h3", "h4", "h5", "h6"}:
+            continue
+        if el.get("id") == "toc" or "toc" in el.get("class", []):
+            continue
+        if el.name == "table":
+            continue
+        if el.name in {"figure", "style", "script"}:
+            continue
+        if el.name == "p":
+            txt = _legacy_html_to_text(el)
+            if txt:
+                parts.append(txt)
+        elif el.name in {"ul", "ol"}:
+            items = [_legacy_html_to_text(li) for li in el.find_all("li", recursive=False)]
+            items = [i for i in items if i]
+            if items:
+                parts.append("\n".join(items))
+        elif el.name == "div":
+            for p in el.find_all("p", recursive=False):
+                t = _legacy_html_to_text(p)
+                if t:
+                    parts.append(t)
+    return wiki._clean_text("\n\n".join(parts))
+
+
+def legacy_extract(html: str) -> Tuple[str, Dict[str, str]]:
+    soup = BeautifulSoup(html, "html.parser")
+    content = soup.select_one("div.mw-parser-output") or soup
+    infobox = _legacy_infobox(content)
+    return _legacy_plaintext(html), infobox
+
+
+# ---------------------------------------------------------------------------
+# Páginas
+# ---------------------------------------------------------------------------
+def record_pages(out_dir: Path, taxa: List[str]) -> None:
+    import requests
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for latin in taxa:
+        r = requests.get(
+            wiki.WIKI_API,
+            headers={"User-Agent": wiki.UA},
+            params={"action": "parse", "page": latin.replace(" ", "_"),
+                    "prop": "text", "format": "json", "redirects": 1},
+            timeout=30,
+        )
+        data = r.json()
+        if "parse" not in data:
+            print(f"  {latin}: not_found")
+            continue
+        html = data["parse"]["text"]["*"]
+        path = out_dir / (latin.replace(" ", "_") + ".html")
+        path.write_text(html, encoding="utf-8")
+        print(f"  {latin}: {len(html) / 1024:.0f} KiB -> {path}")
+
+
+def synthetic_page(seed: int, sections: int = 40) -> str:
+    """HTML con la forma de action=parse (infobox, refs, navbox, figuras, listas)."""
+    rows = "".join(
+        f"<tr><th>Field {i}:</th><td>Value {i}<sup class=\"reference\"><a>[{i}]</a></sup>"
+        f" <i>detail</i></td></tr>"
+        for i in range(12)
+    )
+    body = [f'<table class="infobox biota"><tbody>{rows}</tbody></table>']
+    for s in range(sections):
+        body.append(f"<h2><span>Section {s}</span></h2>")
+        body.append('<figure><img src="x.jpg"/><figcaption>Caption</figcaption></figure>')
+        for p in range(4):
+            body.append(
+                "<p>The species <b>Macaca fuscata</b> (seed %d, §%d.%d) lives in forests"
+                "<sup class=\"reference\"><a>[%d]</a></sup> and mountains&#160;of Japan"
+                "<sup role=\"note\">[a]</sup>. It is known as the snow monkey "
+                "[citation needed] and is studied widely. </p>" % (seed, s, p, p + 1)
+            )
+        body.append("<ul>" + "".join(f"<li>Item {k} <style>.x{{}}</style>text</li>" for k in range(5)) + "</ul>")
+        body.append('<div class="thumb"><p>Paragraph in div</p><table class="metadata"><tr><td>m</td></tr></table></div>')
+        body.append('<table class="navbox"><tr><td>Navigation</td></tr></table>')
+    return '<div class="mw-parser-output">' + "\n".join(body) + "</div>"
+
+
+def load_pages(args) -> List[Tuple[str, str]]:
+    if args.pages:
+        files = sorted(Path(args.pages).glob("*.html"))
+        if not files:
+            sys.exit(f"No hay *.html en {args.pages} (usa --record primero)")
+        return [(f.stem, f.read_text(encoding="utf-8")) for f in files]
+    return [(f"synthetic_{i}", synthetic_page(i)) for i in range(args.synthetic)]
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+def _time(fn: Callable[[str], object], html: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(html)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", help="directorio con páginas *.html grabadas")
+    ap.add_argument("--record", help="graba las páginas de los taxones del modelo en este directorio")
+    ap.add_argument("--synthetic", type=int, default=5, help="nº de páginas sintéticas si no hay --pages")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    if args.record:
+        from agent.tools.wiki_pack import taxa_from_labels
+        record_pages(Path(args.record), taxa_from_labels()[0])
+        return 0
+
+    pages = load_pages(args)
+    backends = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+        backends.append("lxml")
+    except Exception:
+        print("(lxml no instalado: solo se mide html.parser)")
+
+    total_kib = sum(len(h) for _, h in pages) / 1024
+    print(f"{len(pages)} páginas, {total_kib:.0f} KiB de HTML, mediana de {args.repeat} repeticiones\n")
+    print(f"{'página':<28}{'KiB':>6}{'legacy ms':>11}" + "".join(f"{b + ' ms':>16}{'x':>7}" for b in backends))
+
+    mismatches = 0
+    totals = {b: 0.0 for b in ["legacy", *backends]}
+    for name, html in pages:
+        ref = legacy_extract(html)
+        t_legacy = _time(legacy_extract, html, args.repeat)
+        totals["legacy"] += t_legacy
+        row = f"{name[:27]:<28}{len(html) / 1024:>6.0f}{t_legacy:>11.1f}"
+        for b in backends:
+            out = wiki._extract_page(html, parser=b)
+            if out != ref:
+                mismatches += 1
+                print(f"  !! {name}: salida distinta con backend {b}")
+            t = _time(lambda h: wiki._extract_page(h, parser=b), html, args.repeat)
+            totals[b] += t
+            row += f"{t:>16.1f}{t_legacy / t:>6.1f}x"
+        print(row)
+
+    print("\nTotal: legacy %.1f ms" % totals["legacy"]
+          + "".join(f" | {b} {totals[b]:.1f} ms ({totals['legacy'] / totals[b]:.1f}x)" for b in backends))
+    print("Salida idéntica en todas las páginas" if not mismatches else f"{mismatches} diferencias")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# benchmarks/compare_precision.py
+"""
+Comparación fp32 vs int8 (o cualquier par de variantes exportadas, también
+TorchScript vs ONNX) del clasificador sobre una carpeta de fotos.
+
+Uso:
+  # 1) generar la variante int8 con fotos de calibración
+  python -m agent.tools.model_export quantize --calib ruta/calibracion
+  # 2) comparar sobre fotos de evaluación (distintas de las de calibración)
+  python benchmarks/compare_precision.py --images ruta/evaluacion
+  # pares explícitos
+  python benchmarks/compare_precision.py --reference model/m.pt --candidate model/m.int8.pt --images fotos/
+  python benchmarks/compare_precision.py --candidate model/m.onnx --images fotos/
+
+Informa de:
+  - acuerdo top-1 entre ambos modelos (y acierto si las fotos están en
+    subcarpetas con el nombre de la etiqueta),
+  - deriva de p1 y entropía, y cuántas decisiones de gate_uncertainty
+    (ACCEPT/REVIEW, umbrales por defecto) cambian,
+  - latencia (mediana por imagen con lote 1 y por lote de --batch),
+  - pico de RSS al cargar el modelo y hacer un forward (subproceso, VmHWM)
+    y tamaño del fichero.
+Sale con código 1 si el acuerdo top-1 baja de --min-agreement.
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import torch  # noqa: E402
+
+from agent.nodes.gate_uncertainty import gate_uncertainty  # noqa: E402
+from agent.tools import model_registry, vision  # noqa: E402
+from agent.tools.backends import open_backend  # noqa: E402
+from agent.tools.model_export import IMAGE_EXTS  # noqa: E402
+from agent.utils.images import decode_image  # noqa: E402
+
+
+def _load(model_path: str) -> Tuple[Any, bool]:
+    backend = open_backend(model_path)   # .pt -> TorchScript, .onnx -> ONNX Runtime
+    return backend, backend.folded
+
+
+@torch.inference_mode()
+def _forward(model: Any, folded: bool, pils: List[Any]) -> torch.Tensor:
+    if folded:
+        x = torch.stack([vision._to_uint8(p) for p in pils])
+    else:
+        x = torch.stack([vision._transform(p) for p in pils])
+    return vision._softmax_2d(model(x))
+
+
+def _predict(model: Any, folded: bool, pils: List[Any], batch: int) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for i in range(0, len(pils), batch):
+        probs = _forward(model, folded, pils[i:i + batch])
+        out.extend(vision._postprocess_batch(probs, [5] * probs.shape[0]))
+    return out
+
+
+def _gate(pred: Dict[str, Any]) -> str:
+    preds = [(d["label"], d["prob"]) for d in pred["topk"]]
+    m = pred["metrics"]
+    tmp = {"preds": preds, "p1": m["p1"], "margin": m["p1"] - m["p2"]}
+    with contextlib.redirect_stdout(io.StringIO()):
+        return gate_uncertainty({"_tmp": tmp})["_tmp"]["gate"]
+
+
+def _latency_ms(model: Any, folded: bool, pils: List[Any], batch: int, repeat: int) -> float:
+    """Mediana de ms por imagen (incluye preprocesado, como en infer)."""
+    chunk = pils[:batch]
+    _forward(model, folded, chunk)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _forward(model, folded, chunk)
+        samples.append((time.perf_counter() - t0) * 1000 / len(chunk))
+    return statistics.median(samples)
+
+
+def _child(model_path: str) -> None:
+    if model_path != "none":
+        model, folded = _load(model_path)
+        h, w = vision.input_hw()
+        x = torch.zeros(1, 3, h, w, dtype=torch.uint8 if folded else torch.float32)
+        with torch.inference_mode():
+            model(x)
+    with open("/proc/self/status") as f:
+        print(next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")))
+
+
+def _peak_rss_mib(model_path: str) -> float:
+    """Pico de RSS de cargar + un forward, descontando el de importar torch."""
+    def run(arg: str) -> int:
+        out = subprocess.run([sys.executable, __file__, "--child", arg],
+                             check=True, capture_output=True, text=True)
+        return int(out.stdout.strip().splitlines()[-1])
+    try:
+        return max(0, run(model_path) - run("none")) / 1024
+    except Exception:
+        return float("nan")
+
+
+def _load_images(root: str, limit: int) -> List[Tuple[Path, Any]]:
+    paths = sorted(p for p in Path(root).rglob("*") if p.suffix.lower() in IMAGE_EXTS)[:limit]
+    if not paths:
+        raise SystemExit(f"No hay imágenes en {root}")
+    h, w = vision.input_hw()
+    return [(p, decode_image(p.read_bytes(), (w, h))) for p in paths]
+
+
+def compare(reference: str, candidate: str, images: List[Tuple[Path, Any]], batch: int, repeat: int) -> Dict[str, Any]:
+    pils = [pil for _, pil in images]
+    ref_model, ref_folded = _load(reference)
+    cand_model, cand_folded = _load(candidate)
+    ref = _predict(ref_model, ref_folded, pils, batch)
+    cand = _predict(cand_model, cand_folded, pils, batch)
+
+    classes = set(vision._classes or [])
+    truth = [p.parent.name if p.parent.name in classes else None for p, _ in images]
+    labelled = [i for i, t in enumerate(truth) if t]
+
+    d_p1 = [abs(a["metrics"]["p1"] - b["metrics"]["p1"]) for a, b in zip(ref, cand)]
+    d_ent = [abs(a["metrics"]["entropy"] - b["metrics"]["entropy"]) for a, b in zip(ref, cand)]
+    gates = [(_gate(a), _gate(b)) for a, b in zip(ref, cand)]
+
+    report: Dict[str, Any] = {
+        "images": len(images),
+        "top1_agreement": sum(a["topk"][0]["label"] == b["topk"][0]["label"] for a, b in zip(ref, cand)) / len(ref),
+        "p1_drift_mean": statistics.fmean(d_p1), "p1_drift_max": max(d_p1),
+        "entropy_drift_mean": statistics.fmean(d_ent), "entropy_drift_max": max(d_ent),
+        "gate_flips": sum(a != b for a, b in gates),
+        "gate_accept": {"reference": sum(a == "ACCEPT" for a, _ in gates),
+                        "candidate": sum(b == "ACCEPT" for _, b in gates)},
+    }
+    if labelled:
+        report["accuracy"] = {
+            name: sum(preds[i]["topk"][0]["label"] == truth[i] for i in labelled) / len(labelled)
+            for name, preds in (("reference", ref), ("candidate", cand))
+        }
+    for name, path, model, folded in (("reference", reference, ref_model, ref_folded),
+                                      ("candidate", candidate, cand_model, cand_folded)):
+        report[name] = {
+            "path": path,
+            "file_mib": Path(path).stat().st_size / 2**20,
+            "ms_per_image_b1": _latency_ms(model, folded, pils, 1, repeat),
+            f"ms_per_image_b{batch}": _latency_ms(model, folded, pils, batch, repeat),
+            "peak_rss_mib": _peak_rss_mib(path),
+        }
+    return report
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", help="carpeta de fotos de evaluación (subcarpetas = etiqueta, opcional)")
+    ap.add_argument("--reference", help="modelo de referencia (por defecto el fp32 de MONKEY_MODEL_FILE)")
+    ap.add_argument("--candidate", help="modelo a comparar (por defecto <referencia>.int8.pt)")
+    ap.add_argument("--limit", type=int, default=500)
+    ap.add_argument("--batch", type=int, default=8)
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--min-agreement", type=float, default=0.98)
+    ap.add_argument("--json", action="store_true", help="imprime el informe en JSON")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.child)
+        return 0
+    if not args.images:
+        ap.error("--images es obligatorio")
+
+    model_registry.PRECISION = "fp32"
+    model_path, labels_path = model_registry.resolve_paths()
+    vision._configure(json.loads(Path(labels_path).read_text(encoding="utf-8")))
+    reference = args.reference or str(model_path)
+    p = Path(reference)
+    candidate = args.candidate or str(p.with_name(f"{p.stem}.int8{p.suffix}"))
+
+    report = compare(reference, candidate, _load_images(args.images, args.limit), args.batch, args.repeat)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"{report['images']} imágenes: {Path(reference).name} vs {Path(candidate).name}\n")
+        print(f"acuerdo top-1      {report['top1_agreement']:.2%}")
+        if "accuracy" in report:
+            acc = report["accuracy"]
+            print(f"acierto            {acc['reference']:.2%} -> {acc['candidate']:.2%}")
+        print(f"|Δp1|              media {report['p1_drift_mean']:.4f}  máx {report['p1_drift_max']:.4f}")
+        print(f"|Δentropía|        media {report['entropy_drift_mean']:.4f}  máx {report['entropy_drift_max']:.4f}")
+        ga = report["gate_accept"]
+        print(f"gate ACCEPT        {ga['reference']} -> {ga['candidate']}  ({report['gate_flips']} decisiones cambian)\n")
+        b = f"ms_per_image_b{args.batch}"
+        print(f"{'modelo':<12}{'MiB':>8}{'ms/img b1':>12}{f'ms/img b{args.batch}':>12}{'RSS MiB':>10}")
+        for name in ("reference", "candidate"):
+            r = report[name]
+            print(f"{name:<12}{r['file_mib']:>8.1f}{r['ms_per_image_b1']:>12.2f}{r[b]:>12.2f}{r['peak_rss_mib']:>10.1f}")
+    return 0 if report["top1_agreement"] >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
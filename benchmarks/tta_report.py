@@ -0,0 +1,121 @@
+# benchmarks/tta_report.py
+"""
+Informe de test-time augmentation (MONKEY_TTA) sobre un conjunto local
+etiquetado: cuánto baja la tasa de REVIEW de gate_uncertainty (cada REVIEW es
+una llamada a ask_gpt41_vision, 10-100x más lenta que la inferencia local)
+frente al coste extra de CPU.
+
+Uso:
+  # fotos en subcarpetas con el nombre de la etiqueta (las demás cuentan sin acierto)
+  python benchmarks/tta_report.py --images ruta/etiquetadas
+  python benchmarks/tta_report.py --images ruta/ --modes off flip crops --accept-threshold 0.7 --min-margin 0.1 --json
+
+Por modo informa de:
+  - review_rate y REVIEW evitados respecto a "off",
+  - acierto global y entre las decisiones ACCEPT (si hay etiquetas),
+  - ms de pared y de CPU del proceso por imagen (lote --batch) y su ratio
+    respecto a "off".
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.nodes.gate_uncertainty import gate_uncertainty  # noqa: E402
+from agent.tools import model_registry, vision  # noqa: E402
+from agent.tools.model_export import IMAGE_EXTS  # noqa: E402
+from agent.utils.images import decode_image  # noqa: E402
+
+
+def _load_images(root: str, limit: int) -> List[Tuple[Path, Any]]:
+    paths = sorted(p for p in Path(root).rglob("*") if p.suffix.lower() in IMAGE_EXTS)[:limit]
+    if not paths:
+        raise SystemExit(f"No hay imágenes en {root}")
+    h, w = vision.input_hw()
+    return [(p, decode_image(p.read_bytes(), (w, h))) for p in paths]
+
+
+def _gate(pred: Dict[str, Any], accept: float, margin: float) -> str:
+    preds = [(d["label"], d["prob"]) for d in pred["topk"]]
+    m = pred["metrics"]
+    state = {"_tmp": {"preds": preds, "p1": m["p1"], "margin": m["p1"] - m["p2"]},
+             "accept_threshold": accept, "min_margin": margin}
+    with contextlib.redirect_stdout(io.StringIO()):
+        return gate_uncertainty(state)["_tmp"]["gate"]
+
+
+def evaluate(mode: str, images: List[Tuple[Path, Any]], batch: int, accept: float, margin: float) -> Dict[str, Any]:
+    vision.TTA = mode
+    pils = [pil for _, pil in images]
+    vision.infer_batch(pils[:batch], topk=5, batch_size=batch)  # warm-up con el tamaño de este modo
+
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    preds = vision.infer_batch(pils, topk=5, batch_size=batch)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+
+    classes = set(model_registry.get().classes)
+    truth: List[Optional[str]] = [p.parent.name if p.parent.name in classes else None for p, _ in images]
+    gates = [_gate(p, accept, margin) for p in preds]
+    n = len(images)
+
+    report: Dict[str, Any] = {
+        "mode": mode,
+        "views": vision.tta_views(mode),
+        "review_rate": sum(g == "REVIEW" for g in gates) / n,
+        "reviews": sum(g == "REVIEW" for g in gates),
+        "ms_per_image": wall * 1000 / n,
+        "cpu_ms_per_image": cpu * 1000 / n,
+    }
+    labelled = [i for i, t in enumerate(truth) if t]
+    if labelled:
+        hit = [preds[i]["topk"][0]["label"] == truth[i] for i in labelled]
+        accepted = [h for i, h in zip(labelled, hit) if gates[i] == "ACCEPT"]
+        report["accuracy"] = sum(hit) / len(hit)
+        report["accept_accuracy"] = sum(accepted) / len(accepted) if accepted else None
+    return report
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", required=True, help="carpeta de fotos (subcarpetas = etiqueta)")
+    ap.add_argument("--modes", nargs="+", default=["off", "flip", "crops"])
+    ap.add_argument("--limit", type=int, default=500)
+    ap.add_argument("--batch", type=int, default=8)
+    ap.add_argument("--accept-threshold", type=float, default=0.7, help="como accept_threshold del grafo")
+    ap.add_argument("--min-margin", type=float, default=0.1, help="como min_margin del grafo")
+    ap.add_argument("--json", action="store_true", help="imprime el informe en JSON")
+    args = ap.parse_args()
+
+    images = _load_images(args.images, args.limit)
+    modes = ["off"] + [m for m in args.modes if m != "off"]
+    rows = [evaluate(m, images, args.batch, args.accept_threshold, args.min_margin) for m in modes]
+    base = rows[0]
+    for r in rows:
+        r["reviews_avoided"] = base["reviews"] - r["reviews"]
+        r["cpu_cost_x"] = r["cpu_ms_per_image"] / base["cpu_ms_per_image"] if base["cpu_ms_per_image"] else None
+
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+        return 0
+
+    print(f"{len(images)} imágenes, umbrales p1>={args.accept_threshold} margen>={args.min_margin}, lote {args.batch}\n")
+    print(f"{'modo':<8}{'vistas':>7}{'REVIEW':>9}{'evitados':>10}{'acierto':>9}{'acierto ACC':>13}"
+          f"{'ms/img':>9}{'CPU ms/img':>12}{'coste CPU':>11}")
+    for r in rows:
+        acc = f"{r['accuracy']:.1%}" if "accuracy" in r else "-"
+        acc_ok = f"{r['accept_accuracy']:.1%}" if r.get("accept_accuracy") is not None else "-"
+        cost = f"{r['cpu_cost_x']:.2f}x" if r["cpu_cost_x"] is not None else "-"
+        print(f"{r['mode']:<8}{r['views']:>7}{r['review_rate']:>9.1%}{r['reviews_avoided']:>10}{acc:>9}{acc_ok:>13}"
+              f"{r['ms_per_image']:>9.2f}{r['cpu_ms_per_image']:>12.2f}{cost:>11}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# tests/conftest.py
+import shutil
+import warnings
+from pathlib import Path
+
+import pytest
+
+try:
+    import torch
+except ImportError:   # los tests de modelo hacen importorskip("torch")
+    torch = None
+
+# labels.json del repo (10 clases, entrada 224x224): lo comparten los modelos de prueba
+LABELS = Path(__file__).resolve().parent.parent / "model" / "labels.json"
+
+
+@pytest.fixture(autouse=True)
+def _isolated_disk_caches(tmp_path, monkeypatch):
+    """Ningún test escribe cachés en ~/.cache: la de disco va a tmp_path."""
+    from agent.tools import gpt_cache, wiki
+
+    monkeypatch.setattr(wiki, "WIKI_CACHE_PATH", str(tmp_path / "wiki_cache.sqlite"))
+    monkeypatch.setattr(wiki, "_cache", None)
+    monkeypatch.setattr(gpt_cache, "GPT_CACHE_PATH", str(tmp_path / "gpt_cache.sqlite"))
+    monkeypatch.setattr(gpt_cache, "_cache", None)
+    monkeypatch.setattr(gpt_cache, "_vision_cache", None)
+
+    # Módulos congelados de backend.optimize() (por defecto en ~/.cache/monoagent/models)
+    try:
+        from agent.tools import backends
+    except ImportError:   # sin torch
+        return
+    monkeypatch.setattr(backends, "OPT_CACHE_DIR", str(tmp_path / "models"))
+
+
+# -----------------------
+# Clasificador de prueba
+# -----------------------
+if torch is not None:
+    class TinyConvNet(torch.nn.Module):
+        """Sustituto del clasificador real (conv + BN + pooling + lineal, 10 clases)."""
+        def __init__(self):
+            super().__init__()
+            torch.manual_seed(0)
+            self.conv = torch.nn.Conv2d(3, 8, 3, stride=2)
+            self.bn = torch.nn.BatchNorm2d(8)
+            self.fc = torch.nn.Linear(8, 10)
+
+        def forward(self, x):
+            return self.fc(torch.relu(self.bn(self.conv(x))).mean(dim=(2, 3)))
+
+
+@pytest.fixture
+def labels_path() -> Path:
+    return LABELS
+
+
+@pytest.fixture
+def tiny_model():
+    """TinyConvNet en eval, ya en TorchScript (pesos fijos: semilla 0)."""
+    if torch is None:
+        pytest.skip("necesita torch")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.jit.script(TinyConvNet().eval())
+
+
+@pytest.fixture
+def model_dir(tmp_path, tiny_model):
+    """Carpeta tipo MONKEY_MODEL_DIR: m.pt (tiny_model) + labels.json."""
+    torch.jit.save(tiny_model, str(tmp_path / "m.pt"))
+    shutil.copy(LABELS, tmp_path / "labels.json")
+    return tmp_path
+
+
+@pytest.fixture
+def registry_dir(model_dir, monkeypatch):
+    """
+    model_registry y la vista de vision.py apuntando a model_dir (m.pt,
+    torchscript fp32, sin optimizar ni micro-batching), sin nada cargado y
+    restaurados al acabar el test.
+    """
+    from agent.tools import model_registry, vision
+
+    for name in ("_classes", "_transform", "_input_hw", "_scale", "_shift", "_folded"):
+        monkeypatch.setattr(vision, name, getattr(vision, name))
+    monkeypatch.setattr(vision, "_model", None)
+    monkeypatch.setattr(vision, "MICROBATCH", False)
+    monkeypatch.setattr(model_registry, "_loaded", None)
+    monkeypatch.setattr(model_registry, "_ready", model_registry.threading.Event())
+    monkeypatch.setattr(model_registry, "_status", {"error": None, "load_ms": None, "warmup_ms": None})
+    monkeypatch.setattr(model_registry, "BACKEND", "torchscript")
+    monkeypatch.setattr(model_registry, "PRECISION", "fp32")
+    monkeypatch.setattr(model_registry, "MODEL_FILE", "m.pt")
+    monkeypatch.setattr(model_registry, "OPTIMIZE", False)
+    monkeypatch.setenv("MONKEY_MODEL_DIR", str(model_dir))
+    return model_dir
@@ -0,0 +1,86 @@
+# tests/test_async_graph.py
+import asyncio
+import io
+
+from PIL import Image
+
+import agent.nodes.finalize as finalize_mod
+import agent.nodes.infer_local as infer_mod
+import agent.nodes.wiki_fullpage as wiki_node
+import agent.tools.wiki as wiki
+from agent.graph import build_graph
+from agent.labels import LABEL_TO_LATIN
+from agent.tools.wiki_cache import WikiPageCache
+
+
+def _jpeg_bytes() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (120, 90, 60)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_afetch_fullpage_coalesces_and_caches(monkeypatch):
+    calls = []
+
+    async def fake_remote(latin):
+        calls.append(latin)
+        await asyncio.sleep(0.05)
+        return {"title": latin, "url": "u", "plain_text": "txt", "infobox": {}, "status": "ok", "revid": 1}
+
+    monkeypatch.setattr(wiki, "_cache", WikiPageCache(path="off"))
+    monkeypatch.setattr(wiki, "_afetch_fullpage_remote", fake_remote)
+
+    async def main():
+        first = await asyncio.gather(*(wiki.afetch_fullpage("macaca_fuscata") for _ in range(5)))
+        again = await wiki.afetch_fullpage("Macaca fuscata")
+        return first, again
+
+    first, again = asyncio.run(main())
+    assert calls == ["macaca_fuscata"]
+    assert all(p["status"] == "ok" for p in first)
+    assert again["plain_text"] == "txt"
+
+
+def test_afetch_fullpage_followers_get_independent_copies(monkeypatch):
+    async def fake_remote(latin):
+        await asyncio.sleep(0.05)
+        return {"title": latin, "url": "u", "plain_text": "txt", "infobox": {"Family": "Cercopithecidae"},
+                "status": "ok", "revid": 1}
+
+    monkeypatch.setattr(wiki, "_cache", WikiPageCache(path="off"))
+    monkeypatch.setattr(wiki, "_afetch_fullpage_remote", fake_remote)
+
+    async def main():
+        return await asyncio.gather(*(wiki.afetch_fullpage("Macaca fuscata") for _ in range(3)))
+
+    a, b, c = asyncio.run(main())
+    a["infobox"]["Family"] = "modificado"
+    assert b["infobox"]["Family"] == c["infobox"]["Family"] == "Cercopithecidae"
+    assert wiki.fetch_fullpage("Macaca fuscata")["infobox"]["Family"] == "Cercopithecidae"
+
+
+def test_async_graph_ainvoke_classify_path(monkeypatch):
+    label, latin = next(iter(LABEL_TO_LATIN.items()))
+
+    async def fake_ainfer(pil, topk=5):
+        return {"topk": [{"label": label, "prob": 0.99}, {"label": "x", "prob": 0.01}],
+                "metrics": {"p1": 0.99, "p2": 0.01, "entropy": 0.05}}
+
+    async def fake_afetch(name):
+        return {"title": name, "url": "https://en.wikipedia.org/wiki/X", "plain_text": "Texto.",
+                "infobox": {}, "status": "ok"}
+
+    async def fake_gpt(prompt, **kw):
+        return {"status": "ok", "answer": "respuesta async"}
+
+    monkeypatch.setattr(infer_mod, "_vision_ainfer", fake_ainfer)
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: None)
+    monkeypatch.setattr(wiki_node, "_pack_lookup", lambda latin: None)
+    monkeypatch.setattr(wiki_node, "afetch_fullpage", fake_afetch)
+    monkeypatch.setattr(finalize_mod, "aask_gpt_text", fake_gpt)
+
+    app = build_graph(async_nodes=True)
+    out = asyncio.run(app.ainvoke({"image_bytes": _jpeg_bytes(), "messages": [], "prefetch_topk": 0, "stream_tokens": False}))
+
+    assert out["current_taxon"] == latin
+    assert out["messages"][-1].content.startswith("respuesta async")
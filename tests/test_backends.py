@@ -0,0 +1,69 @@
+# tests/test_backends.py
+import warnings
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+from PIL import Image, ImageDraw
+
+from agent.tools import backends, model_export, model_registry, vision
+
+
+@pytest.fixture
+def model_dir(model_dir, labels_path):
+    """El model_dir de conftest más su exportación m.onnx."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model_export.export_onnx(str(model_dir / "m.pt"), str(labels_path), str(model_dir / "m.onnx"))
+    return model_dir
+
+
+def test_logits_parity_across_backends(model_dir):
+    ts = backends.open_backend(model_dir / "m.pt")
+    ort = backends.open_backend(model_dir / "m.onnx")
+    assert isinstance(ts, backends.TorchScriptBackend) and isinstance(ort, backends.OnnxRuntimeBackend)
+
+    x = torch.randn(3, 3, 224, 224)   # lote distinto del de la exportación
+    with torch.inference_mode():
+        assert torch.allclose(ts(x), ort(x), atol=1e-4)
+
+
+def test_folded_model_keeps_its_contract_in_onnx(model_dir):
+    labels = str(model_dir / "labels.json")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model_export.fold(str(model_dir / "m.pt"), labels, str(model_dir / "m.u8.pt"))
+        info = model_export.export_onnx(str(model_dir / "m.u8.pt"), labels, str(model_dir / "m.u8.onnx"))
+    assert info["max_abs_logit_diff"] < 1e-3
+
+    ort = backends.open_backend(model_dir / "m.u8.onnx")
+    assert ort.folded and ort.meta["input"] == "uint8"
+    x = torch.randint(0, 256, (2, 3, 224, 224), dtype=torch.uint8)
+    with torch.inference_mode():
+        assert torch.allclose(backends.open_backend(model_dir / "m.u8.pt")(x), ort(x), atol=1e-3)
+
+
+def test_vision_selects_backend_from_config(model_dir, monkeypatch):
+    for name in ("_model", "_classes", "_transform", "_input_hw", "_scale", "_shift", "_folded"):
+        monkeypatch.setattr(vision, name, None if name == "_model" else getattr(vision, name))
+    monkeypatch.setattr(vision, "MICROBATCH", False)
+    monkeypatch.setenv("MONKEY_MODEL_DIR", str(model_dir))
+    monkeypatch.setattr(model_registry, "MODEL_FILE", "m.pt")
+    monkeypatch.setattr(model_registry, "OPTIMIZE", False)
+
+    img = Image.new("RGB", (320, 240), (40, 90, 40))
+    ImageDraw.Draw(img).ellipse((60, 40, 260, 200), fill=(180, 130, 90))
+
+    results = {}
+    for name in ("torchscript", "onnx"):
+        monkeypatch.setattr(model_registry, "BACKEND", name)
+        monkeypatch.setattr(model_registry, "_loaded", None)
+        monkeypatch.setattr(vision, "_model", None)
+        assert vision.load_model().name == name
+        results[name] = vision.infer(img, topk=3)
+
+    a, b = results["torchscript"], results["onnx"]
+    assert [d["label"] for d in a["topk"]] == [d["label"] for d in b["topk"]]
+    assert b["metrics"]["p1"] == pytest.approx(a["metrics"]["p1"], abs=1e-5)
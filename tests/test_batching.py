@@ -0,0 +1,104 @@
+# tests/test_batching.py
+import threading
+import pytest
+
+from agent.utils.batching import MicroBatcher
+
+
+def test_concurrent_submits_share_one_batch():
+    seen_batches = []
+    gate = threading.Event()
+
+    def fn(items):
+        seen_batches.append(list(items))
+        return [x * 10 for x in items]
+
+    mb = MicroBatcher(fn, max_batch_size=4, max_wait_ms=200)
+    results = {}
+
+    def worker(i):
+        gate.wait()
+        results[i] = mb(i, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join()
+    mb.close(timeout=5)
+
+    # Cada llamador recibe SU resultado
+    assert results == {i: i * 10 for i in range(4)}
+    # Y todos salieron en un único forward (ventana amplia + max_batch_size alcanzado)
+    assert len(seen_batches) == 1 and sorted(seen_batches[0]) == [0, 1, 2, 3]
+    assert mb.stats()["avg_batch_size"] == 4
+
+
+def test_max_batch_size_splits_batches():
+    sizes = []
+
+    def fn(items):
+        sizes.append(len(items))
+        return items
+
+    mb = MicroBatcher(fn, max_batch_size=2, max_wait_ms=100)
+    futs = [mb.submit(i) for i in range(5)]
+    assert [f.result(timeout=5) for f in futs] == [0, 1, 2, 3, 4]
+    mb.close(timeout=5)
+    assert max(sizes) <= 2 and sum(sizes) == 5
+
+
+def test_exception_propagates_to_every_caller():
+    def fn(items):
+        raise ValueError("boom")
+
+    mb = MicroBatcher(fn, max_batch_size=3, max_wait_ms=50)
+    futs = [mb.submit(i) for i in range(3)]
+    for f in futs:
+        with pytest.raises(ValueError):
+            f.result(timeout=5)
+    mb.close(timeout=5)
+
+
+def test_length_mismatch_is_an_error():
+    mb = MicroBatcher(lambda items: [], max_batch_size=2, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        mb(1, timeout=5)
+    mb.close(timeout=5)
+
+
+def test_submit_after_close_fails_fast():
+    mb = MicroBatcher(lambda items: list(items), max_batch_size=2, max_wait_ms=1)
+    assert mb(1, timeout=5) == 1
+    mb.close(timeout=5)
+
+    fut = mb.submit(2)
+    with pytest.raises(RuntimeError):
+        fut.result(timeout=1)
+
+
+def test_close_fails_leftover_items():
+    started, release = threading.Event(), threading.Event()
+
+    def fn(items):
+        started.set()
+        release.wait(5)
+        return list(items)
+
+    mb = MicroBatcher(fn, max_batch_size=1, max_wait_ms=1)
+    first = mb.submit("a")
+    assert started.wait(5)
+    leftover = mb.submit("b")     # en cola detrás del lote bloqueado
+    mb.close(timeout=0.05)        # el worker no llega a sacarlo
+    release.set()
+
+    assert first.result(timeout=5) == "a"
+    with pytest.raises(RuntimeError):
+        leftover.result(timeout=1)
+
+
+# --- Ejecutable como script ---
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main(["-q", "-s", __file__]))
@@ -0,0 +1,39 @@
+# tests/test_decode_image.py
+import io
+
+from PIL import Image
+
+import agent.utils.images as images
+from agent.utils.images import decode_image
+
+
+def _encode(size, fmt="JPEG") -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (120, 80, 40)).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def test_jpeg_draft_keeps_model_input_covered():
+    pil = decode_image(_encode((4000, 3000)), (224, 224))
+    assert pil.mode == "RGB"
+    assert pil.size == (500, 375)          # 1/8: la menor escala >= 224 en ambos lados
+    assert decode_image(_encode((800, 300)), (224, 224)).size == (800, 300)
+
+
+def test_other_formats_and_switch_decode_full(monkeypatch):
+    assert decode_image(_encode((1000, 800), "PNG"), (224, 224)).size == (1000, 800)
+    assert decode_image(_encode((1000, 800))).size == (1000, 800)
+    monkeypatch.setattr(images, "IMAGE_DRAFT_DECODE", False)
+    assert decode_image(_encode((4000, 3000)), (224, 224)).size == (4000, 3000)
+
+
+def test_infer_local_decodes_reduced(monkeypatch):
+    import agent.nodes.infer_local as infer_mod
+
+    sizes = []
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: None)
+    monkeypatch.setattr(infer_mod, "_prefetch", None)
+    monkeypatch.setattr(infer_mod, "_vision_infer", lambda pil, topk=5: sizes.append(pil.size) or {
+        "topk": [], "metrics": {"p1": 0.0, "p2": 0.0, "entropy": 0.0}})
+    infer_mod.infer_local({"image_bytes": _encode((4000, 3000))})
+    assert sizes and min(sizes[0]) >= 224 and sizes[0][0] < 4000
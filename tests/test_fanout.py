@@ -0,0 +1,112 @@
+# tests/test_fanout.py
+import asyncio
+import io
+import time
+
+import pytest
+from PIL import Image
+
+import agent.nodes.fanout as fanout
+import agent.nodes.finalize as finalize_mod
+import agent.nodes.infer_local as infer_mod
+from agent.graph import build_graph
+from agent.labels import LABEL_TO_LATIN
+
+LABEL, LATIN = next(iter(LABEL_TO_LATIN.items()))
+DDG_URL = "https://example.org/snow-monkeys"
+
+
+def _jpeg_bytes() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (120, 90, 60)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _result():
+    return {"topk": [{"label": LABEL, "prob": 0.99}], "metrics": {"p1": 0.99, "p2": 0.0, "entropy": 0.05}}
+
+
+def _wiki_node(state):
+    page = {"title": LATIN, "url": "https://en.wikipedia.org/wiki/X", "plain_text": "Wiki text.",
+            "infobox": {}, "status": "ok"}
+    return {"wiki": page, "_tmp": {**state.get("_tmp", {}), "wiki_status": "ok"}}
+
+
+async def _awiki_node(state):
+    return _wiki_node(state)
+
+
+def _ddg_node(delay):
+    def node(state):
+        time.sleep(delay)
+        payload = {"status": "ok", "top_snippet": "Web snippet.",
+                   "results": [{"title": "Snow monkeys", "url": DDG_URL, "snippet": "s"}]}
+        return {"_tmp": {**state.get("_tmp", {}), "ddg": payload, "ddg_status": "ok"}}
+    return node
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    seen = []
+
+    def fake_gpt(prompt, **kw):
+        seen.append(prompt)
+        return {"status": "ok", "answer": "ok"}
+
+    async def afake_gpt(prompt, **kw):
+        return fake_gpt(prompt)
+
+    monkeypatch.setattr(infer_mod, "_vision_infer", lambda pil, topk=5: _result())
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: None)
+    monkeypatch.setattr(fanout, "fetch_wikipedia_fullpage", _wiki_node)
+    monkeypatch.setattr(fanout, "afetch_wikipedia_fullpage", _awiki_node)
+    monkeypatch.setattr(finalize_mod, "ask_gpt_text", fake_gpt)
+    monkeypatch.setattr(finalize_mod, "aask_gpt_text", afake_gpt)
+    return seen
+
+
+def test_fanout_merges_wiki_and_ddg(monkeypatch, prompts):
+    monkeypatch.setattr(fanout, "retrieve_ddg", _ddg_node(0.0))
+    out = build_graph(fanout=True).invoke({"image_bytes": _jpeg_bytes(), "messages": [], "prefetch_topk": 0, "stream_tokens": False})
+
+    assert "Wiki text." in prompts[-1] and "Web snippet." in prompts[-1]
+    assert f"[Snow monkeys]({DDG_URL})" in prompts[-1]
+    assert out["current_taxon"] == LATIN
+
+
+def test_slow_branch_is_cut_by_its_timeout(monkeypatch, prompts):
+    monkeypatch.setattr(fanout, "retrieve_ddg", _ddg_node(2.0))
+    t0 = time.perf_counter()
+    out = build_graph(fanout=True).invoke(
+        {"image_bytes": _jpeg_bytes(), "messages": [], "prefetch_topk": 0, "stream_tokens": False, "ddg_timeout_s": 0.2}
+    )
+    assert time.perf_counter() - t0 < 1.5
+    assert "Wiki text." in prompts[-1] and "Web snippet." not in prompts[-1]
+    assert out["current_taxon"] == LATIN
+
+
+def test_timed_out_branch_does_not_reuse_previous_turn(monkeypatch, prompts):
+    app = build_graph(fanout=True)
+    monkeypatch.setattr(fanout, "retrieve_ddg", _ddg_node(0.0))
+    first = app.invoke({"image_bytes": _jpeg_bytes(), "messages": [], "prefetch_topk": 0, "stream_tokens": False})
+    assert "Web snippet." in prompts[-1] and first["ddg"]
+
+    # 2º turno sobre el estado del 1º: ddg vence y su payload viejo no debe colarse
+    monkeypatch.setattr(fanout, "retrieve_ddg", _ddg_node(2.0))
+    second = app.invoke({**first, "image_bytes": _jpeg_bytes(), "ddg_timeout_s": 0.2})
+    assert "Wiki text." in prompts[-1] and "Web snippet." not in prompts[-1]
+    assert DDG_URL not in prompts[-1]
+    assert not second.get("ddg")
+    assert DDG_URL not in second["_tmp"]["sources"]
+    assert all(s["url"] != DDG_URL for s in second.get("sources") or [])
+
+
+def test_async_fanout_timeout(monkeypatch, prompts):
+    monkeypatch.setattr(fanout, "retrieve_ddg", _ddg_node(2.0))
+    app = build_graph(async_nodes=True, fanout=True)
+    monkeypatch.setattr(infer_mod, "_vision_ainfer", lambda pil, topk=5: asyncio.sleep(0, _result()))
+
+    t0 = time.perf_counter()
+    asyncio.run(app.ainvoke({"image_bytes": _jpeg_bytes(), "messages": [], "prefetch_topk": 0, "stream_tokens": False, "ddg_timeout_s": 0.2}))
+    assert time.perf_counter() - t0 < 1.5
+    assert "Wiki text." in prompts[-1] and "Web snippet." not in prompts[-1]
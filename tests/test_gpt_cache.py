@@ -0,0 +1,87 @@
+# tests/test_gpt_cache.py
+import time
+
+import pytest
+
+import agent.tools.gpt as gpt
+from agent.tools.gpt_cache import ResponseCache
+from agent.utils.cache import SQLiteStore
+
+
+@pytest.fixture
+def remote(monkeypatch):
+    calls = []
+
+    def fake_remote(prompt, model, max_tokens, temperature):
+        calls.append(prompt)
+        if prompt == "falla":
+            return {"status": "error", "answer": "", "error": "boom"}
+        return {"status": "ok", "answer": f"re: {prompt}", "latency_ms": 120.0, "retries": 0}
+
+    monkeypatch.setattr(gpt, "_ask_gpt_text_remote", fake_remote)
+    return calls
+
+
+def test_memory_hit_and_counters(remote, monkeypatch, tmp_path):
+    rc = ResponseCache(str(tmp_path / "gpt.sqlite"))
+    monkeypatch.setattr(gpt, "get_response_cache", lambda: rc)
+
+    first = gpt.ask_gpt_text("hola", cache=True)
+    second = gpt.ask_gpt_text("hola", cache=True)
+
+    assert remote == ["hola"]
+    assert first["answer"] == second["answer"] == "re: hola"
+    assert second["cached"] is True and second["latency_ms"] < 50
+    stats = rc.stats()
+    assert stats["hits_mem"] == 1 and stats["misses"] == 1 and stats["stores"] == 1
+
+
+def test_key_includes_model_params_and_disk_tier(remote, monkeypatch, tmp_path):
+    path = str(tmp_path / "gpt.sqlite")
+    monkeypatch.setattr(gpt, "get_response_cache", lambda: ResponseCache(path))
+    gpt.ask_gpt_text("hola", cache=True)
+    gpt.ask_gpt_text("hola", temperature=0.7, cache=True)
+    assert remote == ["hola", "hola"]
+
+    fresh = ResponseCache(path)           # proceso nuevo: memoria vacía
+    monkeypatch.setattr(gpt, "get_response_cache", lambda: fresh)
+    assert gpt.ask_gpt_text("hola", cache=True)["cached"] is True
+    assert fresh.stats()["hits_disk"] == 1 and len(remote) == 2
+
+
+def test_errors_are_not_cached_and_ttl_expires(remote, monkeypatch):
+    rc = ResponseCache(None, ttl=0.05)
+    monkeypatch.setattr(gpt, "get_response_cache", lambda: rc)
+    gpt.ask_gpt_text("falla", cache=True)
+    gpt.ask_gpt_text("falla", cache=True)
+    gpt.ask_gpt_text("hola", cache=True)
+    time.sleep(0.1)
+    gpt.ask_gpt_text("hola", cache=True)
+    assert remote == ["falla", "falla", "hola", "hola"]
+
+
+def test_cache_off_by_default(remote, monkeypatch):
+    monkeypatch.setattr(gpt, "GPT_CACHE", False)
+    gpt.ask_gpt_text("hola")
+    gpt.ask_gpt_text("hola")
+    assert remote == ["hola", "hola"]
+
+
+def test_sqlite_store_is_size_bounded(tmp_path):
+    store = SQLiteStore(tmp_path / "s.sqlite", max_entries=3)
+    for i in range(5):
+        store.set(f"k{i}", i, ttl=60 + i)
+    assert len(store) == 3 and store.evictions == 2
+    assert store.get("k0") is None and store.get("k4") == 4
+
+
+def test_disk_tier_is_opt_in():
+    import os
+    import subprocess
+    import sys
+
+    env = {k: v for k, v in os.environ.items() if k != "GPT_CACHE_PATH"}
+    code = ("from agent.tools import gpt_cache as g; "
+            "assert g.GPT_CACHE_PATH == ''; "
+            "assert g.get_vision_cache().disk is None and g.get_response_cache().disk is None")
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
@@ -0,0 +1,83 @@
+# tests/test_gpt_client.py
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import agent.tools.gpt as gpt
+
+
+def _completion(text: str) -> bytes:
+    return json.dumps({
+        "id": "cmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stand-in",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": text}}],
+    }).encode()
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Servidor compatible con /v1/chat/completions: 429 las primeras `fail` veces."""
+    state = {"hits": 0, "fail": 1, "ports": set()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            state["hits"] += 1
+            state["ports"].add(self.client_address[1])
+            if state["hits"] <= state["fail"]:
+                code, body = 429, b'{"error": {"message": "slow down"}}'
+            else:
+                code, body = 200, _completion("Macaca fuscata")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("retry-after-ms", "10")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{srv.server_address[1]}/v1")
+    monkeypatch.setattr(gpt, "_clients", {})
+    yield state
+    srv.shutdown()
+
+
+def test_retries_on_429_and_reports_latency(stand_in):
+    out = gpt.ask_binomial(url="https://example.org/a.jpg")
+    assert out["status"] == "ok" and out["latin_name"] == "Macaca fuscata"
+    assert out["retries"] == 1 and out["latency_ms"] > 0
+    assert stand_in["hits"] == 2
+
+
+def test_client_is_reused_across_calls(stand_in):
+    stand_in["fail"] = 0
+    gpt.ask_gpt_text("uno")
+    gpt.ask_gpt_text("dos")
+    assert gpt.get_client() is gpt.get_client()
+    assert len(stand_in["ports"]) == 1   # misma conexión keep-alive
+
+
+def test_async_client_uses_base_url(stand_in):
+    stand_in["fail"] = 0
+    out = asyncio.run(gpt.aask_gpt_text("hola"))
+    assert out["status"] == "ok" and out["answer"] == "Macaca fuscata"
+    assert "latency_ms" in out
+
+
+def test_missing_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    out = gpt.ask_gpt_text("sin clave")
+    assert out["status"] == "error" and out["error"] == "OPENAI_API_KEY missing"
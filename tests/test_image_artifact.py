@@ -0,0 +1,68 @@
+# tests/test_image_artifact.py
+import io
+import pickle
+
+from PIL import Image
+
+import agent.nodes.ask_gpt41_vision as vision_node
+import agent.nodes.infer_local as infer_mod
+from agent.nodes.ensure_image import ensure_image
+from agent.utils import image_artifact
+
+
+def _jpeg(size=(1600, 1200)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (90, 140, 60)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _no_decode(*a, **kw):
+    raise AssertionError("no debería volver a decodificar")
+
+
+def test_ensure_image_keeps_only_a_reference_in_state():
+    data = _jpeg()
+    out = ensure_image({"image_bytes": data})
+    tmp = out["_tmp"]
+
+    assert tmp["image_ok"] is True and "pil_image" not in out
+    assert tmp["image_format"] == "JPEG" and tmp["image_size"] == [1600, 1200]
+    pickle.dumps(out)   # serializable por un checkpointer
+    assert not any(isinstance(v, Image.Image) for v in tmp.values())
+
+    art = image_artifact.get_artifact({"image_bytes": data, "_tmp": tmp})
+    assert art.data is data and min(art.pil.size) >= 224 and art.pil.size[0] < 1600
+
+
+def test_downstream_nodes_reuse_the_artifact(monkeypatch):
+    data = _jpeg()
+    state = {"image_bytes": data, **ensure_image({"image_bytes": data})}
+
+    seen = []
+    monkeypatch.setattr(infer_mod, "decode_image", _no_decode)
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: None)
+    monkeypatch.setattr(infer_mod, "_prefetch", None)
+    monkeypatch.setattr(infer_mod, "_vision_infer", lambda pil, topk=5: seen.append(pil) or {
+        "topk": [], "metrics": {"p1": 0.0, "p2": 0.0, "entropy": 0.0}})
+    infer_mod.infer_local(state)
+    assert seen[0] is image_artifact.get_artifact(state).pil
+
+    sent = []
+    monkeypatch.setattr(vision_node, "_image_to_bytes", _no_decode)
+    monkeypatch.setattr(vision_node, "get_vision_cache", lambda: None)
+    monkeypatch.setattr(vision_node, "_ask_binomial", lambda **kw: sent.append(kw["image_bytes"]) or {
+        "status": "ok", "latin_name": "Macaca fuscata"})
+    vision_node.ask_gpt41_vision(state)
+    assert sent == [data]
+
+
+def test_stale_or_missing_reference_falls_back_to_bytes(monkeypatch):
+    old = ensure_image({"image_bytes": _jpeg((400, 300))})["_tmp"]
+    new = _jpeg((500, 500))
+    assert image_artifact.get_artifact({"image_bytes": new, "_tmp": old}) is None
+
+    image_artifact.clear()
+    assert image_artifact.get_artifact({"_tmp": old}) is None
+
+    bad = ensure_image({"image_bytes": b"not an image", "_tmp": old})["_tmp"]
+    assert bad["image_ok"] is False and "image_ref" not in bad
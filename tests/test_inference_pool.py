@@ -0,0 +1,135 @@
+# tests/test_inference_pool.py
+import multiprocessing as mp
+import os
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from PIL import Image, ImageDraw
+
+from agent.tools import vision
+from agent.utils.inference_pool import InferencePool, core_slices
+
+pytestmark = pytest.mark.skipif("fork" not in mp.get_all_start_methods(), reason="necesita fork")
+
+
+def _slow_square(items):
+    time.sleep(0.05)
+    return [(x * x, os.getpid()) for x in items]
+
+
+def _die_on_negative(items):
+    if any(x < 0 for x in items):
+        os._exit(3)
+    return items
+
+
+def test_core_slices_cover_cores_without_overlap():
+    assert core_slices(2, [0, 1, 2, 3, 4]) == [[0, 1, 2], [3, 4]]
+    assert core_slices(3, [0, 1]) == [[0], [1], [0]]
+
+
+def test_pool_spreads_work_across_workers():
+    pool = InferencePool(_slow_square, workers=2, pin=False).start()
+    try:
+        assert pool.wait_ready(30)
+        futs = [pool.submit([i, i + 1]) for i in range(8)]
+        results = [f.result(timeout=30) for f in futs]
+    finally:
+        pool.close()
+
+    assert [[sq for sq, _ in r] for r in results] == [[i * i, (i + 1) ** 2] for i in range(8)]
+    assert len({pid for r in results for _, pid in r}) == 2
+    assert pool.stats()["done"] == [4, 4]
+
+
+def test_dead_worker_fails_its_jobs_and_is_skipped():
+    pool = InferencePool(_die_on_negative, workers=2, pin=False).start()
+    try:
+        assert pool.wait_ready(30)
+        with pytest.raises(RuntimeError):
+            pool.submit([-1]).result(timeout=30)
+        assert pool([1, 2], timeout=30) == [1, 2]
+        assert pool.stats()["alive"] == 1
+    finally:
+        pool.close()
+
+
+def test_late_result_of_a_failed_job_is_not_counted_twice():
+    import queue
+    from concurrent.futures import Future
+
+    pool = InferencePool(_slow_square, workers=1, pin=False)
+    pool._results = queue.Queue()
+    pool._inflight, pool._done, pool._alive = [1], [0], [True]
+    pool._pending, pool._owner = {0: Future()}, {0: 0}
+
+    pool._fail_pending(0, RuntimeError("worker caído"))
+    pool._results.put((0, 0, "tarde", None))
+    pool._results.put(("stop", -1, None, None))
+    pool._collect()
+    assert pool._inflight == [0] and pool._done == [0]
+
+
+def test_failed_pool_start_disables_the_pool_not_the_setting(monkeypatch):
+    import agent.utils.inference_pool as ip
+
+    def boom(self):
+        raise RuntimeError("sin fork")
+
+    monkeypatch.setattr(ip.InferencePool, "start", boom)
+    monkeypatch.setattr(vision, "_pool", None)
+    monkeypatch.setattr(vision, "_pool_disabled", False)
+    monkeypatch.setattr(vision, "_model", object())   # load_model() sin cargar nada
+    monkeypatch.setattr(vision, "POOL_WORKERS", 2)
+    monkeypatch.setattr(vision, "_infer_many", lambda items: ["local"] * len(items))
+
+    assert vision._get_pool() is None
+    assert vision._pool_disabled and vision.POOL_WORKERS == 2
+    assert vision._run([(None, 1)]) == ["local"]
+
+
+def test_pool_is_never_forked_from_a_background_thread(monkeypatch):
+    import threading
+    import agent.utils.inference_pool as ip
+
+    def forked(self):
+        raise AssertionError("no debería hacer fork fuera del hilo principal")
+
+    monkeypatch.setattr(ip.InferencePool, "start", forked)
+    monkeypatch.setattr(vision, "_pool", None)
+    monkeypatch.setattr(vision, "_pool_disabled", False)
+    monkeypatch.setattr(vision, "POOL_WORKERS", 2)
+    monkeypatch.setattr(vision, "_infer_many", lambda items: ["local"] * len(items))
+
+    out = []
+    t = threading.Thread(target=lambda: out.append(vision._run([(None, 1)])))
+    t.start()
+    t.join()
+    assert out == [["local"]] and vision._pool_disabled
+
+
+def test_vision_infer_through_pool_matches_in_process(registry_dir, monkeypatch):
+    monkeypatch.setattr(vision, "_pool", None)
+    monkeypatch.setattr(vision, "POOL_PIN", False)
+
+    imgs = []
+    for i in range(3):
+        img = Image.new("RGB", (320, 240), (30 + 60 * i, 90, 40))
+        ImageDraw.Draw(img).ellipse((60, 40, 260, 200), fill=(180, 130 - 30 * i, 90))
+        imgs.append(img)
+
+    monkeypatch.setattr(vision, "POOL_WORKERS", 2)
+    try:
+        pooled = vision.infer_batch(imgs, topk=3, batch_size=1)
+        assert vision._pool.stats()["alive"] == 2
+    finally:
+        if vision._pool is not None:
+            vision._pool.close()
+
+    monkeypatch.setattr(vision, "POOL_WORKERS", 0)
+    local = vision.infer_batch(imgs, topk=3)
+    for a, b in zip(pooled, local):
+        assert [d["label"] for d in a["topk"]] == [d["label"] for d in b["topk"]]
+        assert a["metrics"]["p1"] == pytest.approx(b["metrics"]["p1"], abs=1e-6)
@@ -0,0 +1,62 @@
+# tests/test_model_registry.py
+import json
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from PIL import Image
+
+from agent.tools import backends, model_registry, vision
+
+
+@pytest.fixture
+def registry(registry_dir, monkeypatch):
+    opened = []
+
+    def counting_open(path, name=None):
+        opened.append(path)
+        return backends.open_backend(path, name)
+
+    monkeypatch.setattr(model_registry, "open_backend", counting_open)
+    return opened
+
+
+def test_vision_uses_the_registry_instance(registry):
+    threads = [threading.Thread(target=model_registry.get) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    loaded = model_registry.get()
+    assert vision.load_model() is loaded.backend
+    assert vision._classes is loaded.classes
+    assert vision._transform is loaded.preprocessing.transform
+    assert len(registry) == 1
+
+
+def test_preprocessing_matches_labels(registry, labels_path):
+    vision.load_model()
+    meta = json.loads(labels_path.read_text(encoding="utf-8"))
+    img = Image.new("RGB", (300, 200), (120, 80, 40))
+
+    expected = model_registry.pil_transform((224, 224), meta["normalize"]["mean"], meta["normalize"]["std"])(img)
+    assert torch.allclose(vision._preprocess([img])[0], expected)
+    # app.py preprocesa con el registro: mismo tensor que el grafo
+    assert torch.allclose(model_registry.get().preprocessing.batch([img])[0], expected)
+
+
+def test_uint8_batch_matches_the_tensor_path(registry, monkeypatch):
+    vision.load_model()
+    monkeypatch.setattr(vision, "_folded", True)
+    img = Image.new("RGB", (300, 200), (120, 80, 40))
+    x = model_registry.get().preprocessing.batch([img], uint8=True)
+    assert x.dtype == torch.uint8 and torch.equal(x, vision._preprocess([img]))
+
+
+def test_defaults_follow_the_model_card():
+    pre = model_registry.Preprocessing.from_meta({"classes": ["a", "b"]})
+    assert pre.mean == [0.4363, 0.4328, 0.3291] and pre.std == [0.2129, 0.2075, 0.2038]
+    assert pre.image_hw == (224, 224)
+    assert model_registry.parse_classes({"id2label": {"1": "b", "0": "a"}}) == ["a", "b"]
@@ -0,0 +1,82 @@
+# tests/test_model_warmup.py
+import warnings
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from agent.tools import backends, model_registry, vision
+
+
+@pytest.fixture
+def fresh_vision(registry_dir, monkeypatch):
+    monkeypatch.setattr(model_registry, "OPTIMIZE", True)
+    return registry_dir
+
+
+def test_optimized_backend_matches_and_is_cached(model_dir):
+    cache = str(model_dir / "cache")
+    x = torch.randn(2, 3, 224, 224)
+    with torch.inference_mode():
+        ref = backends.open_backend(model_dir / "m.pt")(x)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        first = backends.open_backend(model_dir / "m.pt")
+        first.optimize(cache)
+        second = backends.open_backend(model_dir / "m.pt")
+        second.optimize(cache)
+
+    assert (first.optimized, second.optimized) == ("fresh", "cache")
+    assert len(list((model_dir / "cache").glob("m-*.frozen.pt"))) == 1
+    with torch.inference_mode():
+        assert torch.allclose(second(x), ref, atol=1e-4)
+
+
+def test_cache_disabled_and_key_follows_content(model_dir):
+    assert backends._opt_cache_path("off", model_dir / "m.pt") is None
+    key = backends._opt_cache_path(str(model_dir), model_dir / "m.pt")
+    with open(model_dir / "m.pt", "ab") as f:
+        f.write(b"\0")
+    assert backends._opt_cache_path(str(model_dir), model_dir / "m.pt") != key
+
+
+def test_preload_warms_up_and_flips_readiness(fresh_vision):
+    assert not model_registry.is_ready() and model_registry.readiness()["ready"] is False
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        vision.preload(background=True).join(timeout=60)
+
+    status = model_registry.readiness()
+    assert model_registry.wait_ready(0) and status["ready"] is True
+    assert status["error"] is None and status["optimized"] == "fresh"
+    assert status["backend"] == "torchscript" and status["warmup_ms"] >= 0
+
+
+def test_background_preload_reports_errors(fresh_vision, monkeypatch):
+    monkeypatch.setattr(model_registry, "MODEL_FILE", "missing.pt")
+    vision.preload(background=True).join(timeout=60)
+    status = model_registry.readiness()
+    assert status["ready"] is False and status["error"].startswith("FileNotFoundError")
+
+
+def test_lazy_inference_does_not_mark_ready(fresh_vision):
+    from PIL import Image
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        vision.infer(Image.new("RGB", (64, 64)))
+    # Solo warmup() (o el pool al calentar sus workers) marca el modelo como listo
+    assert not model_registry.is_ready()
+
+
+def test_optimize_is_opt_in():
+    # Sin MONKEY_OPTIMIZE no se congela ni se escribe nada en MONKEY_OPT_CACHE_DIR
+    import os
+    import subprocess
+    import sys
+
+    env = {k: v for k, v in os.environ.items() if k != "MONKEY_OPTIMIZE"}
+    code = "import agent.tools.model_registry as r; assert r.OPTIMIZE is False"
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
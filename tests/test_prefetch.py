@@ -0,0 +1,113 @@
+# tests/test_prefetch.py
+import io
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import agent.nodes.infer_local as infer_mod
+import agent.tools.prefetch as prefetch
+import agent.tools.wiki as wiki
+from agent.labels import LABEL_TO_LATIN
+from agent.tools.wiki_cache import WikiPageCache
+
+
+@pytest.fixture
+def remote(monkeypatch):
+    calls = []
+    gate = threading.Event()
+
+    def fake_remote(latin):
+        calls.append(latin)
+        gate.wait(2)
+        return {"title": latin, "url": "u", "plain_text": "txt", "infobox": {}, "status": "ok", "revid": 1}
+
+    monkeypatch.setattr(wiki, "_cache", WikiPageCache(path="off"))
+    monkeypatch.setattr(wiki, "_fetch_fullpage_remote", fake_remote)
+    monkeypatch.setattr(prefetch, "get_pack", lambda: None)
+    yield calls, gate
+    gate.set()
+
+
+def test_fetch_joins_running_prefetch(remote):
+    calls, gate = remote
+    assert list(prefetch.prefetch(["Macaca fuscata"])) == ["Macaca fuscata"]
+    assert prefetch.prefetch(["macaca_fuscata"]) == {}   # ya en vuelo
+    time.sleep(0.05)
+    threading.Timer(0.1, gate.set).start()
+
+    page = wiki.fetch_fullpage("Macaca fuscata")
+    assert page["status"] == "ok"
+    assert calls == ["Macaca fuscata"]
+
+
+def test_settle_cancels_queued_candidates(remote, monkeypatch):
+    calls, gate = remote
+    monkeypatch.setattr(prefetch, "_pool", prefetch.ThreadPoolExecutor(max_workers=1))
+    futs = prefetch.prefetch(["Macaca fuscata", "Macaca mulatta"])
+    time.sleep(0.05)
+
+    prefetch.settle("Macaca fuscata", futs)
+    gate.set()
+    wiki.fetch_fullpage("Macaca fuscata")
+    prefetch._pool.shutdown(wait=True)
+    assert calls == ["Macaca fuscata"]
+
+
+def test_infer_local_starts_prefetch_for_topk(monkeypatch):
+    labels = list(LABEL_TO_LATIN)[:3]
+    started = []
+    monkeypatch.setattr(infer_mod, "_prefetch", lambda latins: started.extend(latins) or {x: None for x in latins})
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: None)
+    monkeypatch.setattr(infer_mod, "_vision_infer", lambda pil, topk=5: {
+        "topk": [{"label": l, "prob": p} for l, p in zip(labels, (0.6, 0.3, 0.1))],
+        "metrics": {"p1": 0.6, "p2": 0.3, "entropy": 0.9},
+    })
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32)).save(buf, format="PNG")
+
+    out = infer_mod.infer_local({"image_bytes": buf.getvalue(), "prefetch_topk": 2})
+    assert started == [LABEL_TO_LATIN[l] for l in labels[:2]]
+    assert out["_tmp"]["wiki_prefetch"] == started
+    assert list(out["_tmp"]["prefetch"]) == started
+
+
+def test_packed_taxon_still_settles_prefetch(remote, monkeypatch):
+    import agent.nodes.wiki_fullpage as wiki_node
+
+    calls, gate = remote
+    monkeypatch.setattr(prefetch, "_pool", prefetch.ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(wiki_node, "_pack_lookup", lambda latin: {"title": latin, "status": "ok"})
+    futs = prefetch.prefetch(["Macaca fuscata", "Macaca mulatta"])
+    time.sleep(0.05)
+
+    out = wiki_node.fetch_wikipedia_fullpage({"_tmp": {"latin_name": "Macaca nemestrina", "prefetch": futs}})
+    gate.set()
+    prefetch._pool.shutdown(wait=True)
+    assert out["_tmp"]["wiki_source"] == "pack"
+    assert calls == ["Macaca fuscata"]   # el candidato en cola se canceló
+
+
+def test_settle_leaves_other_runs_prefetch_alone(remote, monkeypatch):
+    calls, gate = remote
+    monkeypatch.setattr(prefetch, "_pool", prefetch.ThreadPoolExecutor(max_workers=1))
+    run_a = prefetch.prefetch(["Macaca fuscata"])     # ocupa el único hilo
+    run_b = prefetch.prefetch(["Macaca mulatta"])     # en cola, de otra ejecución
+    time.sleep(0.05)
+
+    prefetch.settle("Macaca fuscata", run_a)          # la ejecución A decide
+    gate.set()
+    prefetch._pool.shutdown(wait=True)
+    assert not run_b["Macaca mulatta"].cancelled()
+    assert calls == ["Macaca fuscata", "Macaca mulatta"]
+
+
+def test_prefetch_is_opt_in_and_lazy():
+    import os
+    import subprocess
+    import sys
+
+    env = {k: v for k, v in os.environ.items() if k != "WIKI_PREFETCH_TOPK"}
+    code = "import agent.tools.prefetch as p; assert p.WIKI_PREFETCH_TOPK == 0 and p._pool is None"
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
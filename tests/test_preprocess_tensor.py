@@ -0,0 +1,70 @@
+# tests/test_preprocess_tensor.py
+import json
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from PIL import Image, ImageDraw
+
+from agent.tools import backends, model_export, vision
+
+def _photo(size=(640, 480)) -> Image.Image:
+    img = Image.new("RGB", size, (40, 90, 40))
+    d = ImageDraw.Draw(img)
+    d.ellipse((150, 80, 450, 400), fill=(180, 130, 90))
+    d.rectangle((0, 380, 640, 480), fill=(70, 70, 140))
+    return img
+
+
+@pytest.fixture
+def configured(monkeypatch, labels_path):
+    for name in ("_model", "_classes", "_transform", "_input_hw", "_scale", "_shift", "_folded"):
+        monkeypatch.setattr(vision, name, getattr(vision, name))
+    monkeypatch.setattr(vision, "MICROBATCH", False)
+    meta = json.loads(labels_path.read_text(encoding="utf-8"))
+    vision._configure(meta)
+    return meta
+
+
+def test_tensor_preprocessing_matches_pil_transform(configured, monkeypatch):
+    imgs = [_photo(), _photo((300, 500))]
+    ref = torch.stack([vision._transform(im) for im in imgs])
+
+    monkeypatch.setattr(vision, "PREPROCESS", "tensor")
+    out = vision._preprocess(imgs)
+
+    assert out.shape == ref.shape and out.dtype == torch.float32
+    # mismo resize bilineal con antialias; difieren solo en redondeo uint8
+    assert (out - ref).abs().mean() < 0.01
+    assert (out - ref).abs().max() < 0.1
+
+
+def test_folded_model_logits_match_original(configured, tiny_model, model_dir, labels_path, monkeypatch):
+    original = tiny_model
+    info = model_export.fold(str(model_dir / "m.pt"), str(labels_path), str(model_dir / "m.u8.pt"))
+    assert info["max_abs_logit_diff"] < model_export.PARITY_ATOL
+
+    folded, embedded = backends.load_torchscript(model_dir / "m.u8.pt")
+    assert embedded["input"] == "uint8"
+
+    # Camino de siempre (PIL + Normalize) vs modelo plegado sobre uint8
+    imgs = [_photo(), _photo((500, 300))]
+    monkeypatch.setattr(vision, "_model", original)
+    ref = vision.infer_batch(imgs, topk=3)
+
+    monkeypatch.setattr(vision, "_model", folded)
+    monkeypatch.setattr(vision, "_folded", True)
+    x = vision._preprocess(imgs)
+    assert x.dtype == torch.uint8
+    out = vision.infer_batch(imgs, topk=3)
+
+    for a, b in zip(ref, out):
+        assert a["topk"][0]["label"] == b["topk"][0]["label"]
+        assert b["metrics"]["p1"] == pytest.approx(a["metrics"]["p1"], abs=0.02)
+
+
+def test_fold_refuses_already_folded(configured, model_dir, labels_path):
+    labels = str(labels_path)
+    model_export.fold(str(model_dir / "m.pt"), labels, str(model_dir / "m.u8.pt"))
+    with pytest.raises(ValueError):
+        model_export.fold(str(model_dir / "m.u8.pt"), labels, str(model_dir / "again.pt"))
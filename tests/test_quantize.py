@@ -0,0 +1,65 @@
+# tests/test_quantize.py
+import json
+import warnings
+
+import pytest
+
+torch = pytest.importorskip("torch")
+if not torch.backends.quantized.supported_engines or torch.backends.quantized.supported_engines == ["none"]:
+    pytest.skip("sin motor de cuantización", allow_module_level=True)
+from PIL import Image, ImageDraw
+
+from agent.tools import backends, model_export, model_registry
+
+
+@pytest.fixture
+def fp32_model(model_dir):
+    path = model_dir / "m.pt"
+    calib = model_dir / "calib"
+    calib.mkdir()
+    for i in range(6):
+        img = Image.new("RGB", (320, 240), (30 * i, 90, 200 - 20 * i))
+        ImageDraw.Draw(img).ellipse((40 + 10 * i, 30, 260, 200), fill=(180, 120 + 10 * i, 60))
+        img.save(calib / f"{i}.jpg")
+    return path, calib
+
+
+@pytest.mark.parametrize("mode", ["static", "dynamic"])
+def test_quantized_variant_tracks_fp32(fp32_model, labels_path, mode):
+    path, calib = fp32_model
+    out = path.with_name("m.int8.pt")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        info = model_export.quantize(str(path), str(labels_path), str(out), mode, str(calib) if mode == "static" else None)
+        q, meta = backends.load_torchscript(out)
+        ref, _ = backends.load_torchscript(path)
+
+    assert meta["precision"] == "int8" and meta["quantization"] == mode
+    assert info["calibration_images"] == (6 if mode == "static" else 0)
+
+    batches = model_export.calibration_batches(str(calib), json.loads(labels_path.read_text()))
+    x = torch.cat(batches)
+    with torch.inference_mode():
+        a, b = torch.softmax(ref(x), 1), torch.softmax(q(x), 1)
+    assert (a.argmax(1) == b.argmax(1)).float().mean() >= 0.8
+    assert (a - b).abs().max() < 0.1
+
+
+def test_precision_setting_selects_int8_file(monkeypatch):
+    monkeypatch.setattr(model_registry, "MODEL_FILE", "monkey_classifier_ts-v0.1.pt")
+    monkeypatch.setattr(model_registry, "PRECISION", "int8")
+    assert model_registry._model_file() == "monkey_classifier_ts-v0.1.int8.pt"
+    monkeypatch.setattr(model_registry, "MODEL_FILE", "custom.int8.pt")
+    assert model_registry._model_file() == "custom.int8.pt"
+    monkeypatch.setattr(model_registry, "PRECISION", "fp32")
+    assert model_registry._model_file() == "custom.int8.pt"
+
+
+def test_quantize_refuses_non_fp32(fp32_model, labels_path):
+    path, calib = fp32_model
+    labels = str(labels_path)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model_export.quantize(str(path), labels, str(path.with_name("m.int8.pt")), "dynamic")
+        with pytest.raises(ValueError):
+            model_export.quantize(str(path.with_name("m.int8.pt")), labels, str(path.with_name("x.pt")), "dynamic")
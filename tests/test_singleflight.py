@@ -0,0 +1,133 @@
+# tests/test_singleflight.py
+import asyncio
+import threading
+import time
+import pytest
+
+from agent.utils.singleflight import SingleFlight, fingerprint
+
+
+def _slow_counter():
+    calls = {"n": 0}
+
+    def fn(x):
+        calls["n"] += 1
+        time.sleep(0.2)
+        return {"value": x}
+    return fn, calls
+
+
+def test_threads_share_one_call():
+    sf = SingleFlight()
+    fn, calls = _slow_counter()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sf.do("k", fn, 42))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls["n"] == 1
+    assert results == [{"value": 42}] * 8
+    assert not sf.in_flight("k")
+
+
+def test_different_keys_do_not_coalesce():
+    sf = SingleFlight()
+    fn, calls = _slow_counter()
+    threads = [threading.Thread(target=sf.do, args=(f"k{i}", fn, i)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls["n"] == 3
+
+
+def test_exception_is_shared_and_key_released():
+    sf = SingleFlight()
+    gate = threading.Event()
+
+    def boom():
+        gate.wait(1)
+        raise RuntimeError("down")
+
+    errors = []
+
+    def call():
+        try:
+            sf.do("k", boom)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(errors) == 4
+    # Tras fallar, la clave queda libre: la siguiente llamada se ejecuta de nuevo
+    assert sf.do("k", lambda: "ok") == "ok"
+
+
+def test_asyncio_callers_share_coroutine():
+    sf = SingleFlight()
+    calls = {"n": 0}
+
+    async def fetch(x):
+        calls["n"] += 1
+        await asyncio.sleep(0.1)
+        return x * 2
+
+    async def main():
+        return await asyncio.gather(*(sf.do_async("k", fetch, 21) for _ in range(10)))
+
+    assert asyncio.run(main()) == [42] * 10
+    assert calls["n"] == 1
+
+
+def test_asyncio_and_threads_share_sync_call():
+    sf = SingleFlight()
+    fn, calls = _slow_counter()
+    out = []
+
+    t = threading.Thread(target=lambda: out.append(sf.do("k", fn, 1)))
+    t.start()
+    time.sleep(0.05)  # el hilo ya es líder
+
+    async def main():
+        return await asyncio.gather(*(sf.do_async("k", fn, 1) for _ in range(5)))
+
+    res = asyncio.run(main())
+    t.join()
+    assert calls["n"] == 1
+    assert res == [{"value": 1}] * 5 and out == [{"value": 1}]
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    sf = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        a = asyncio.ensure_future(sf.do_async("k", fetch))
+        b = asyncio.ensure_future(sf.do_async("k", fetch))
+        await asyncio.sleep(0.01)
+        a.cancel()
+        return await b
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_fingerprint_is_stable_and_type_aware():
+    assert fingerprint("a", 1, 0.2) == fingerprint("a", 1, 0.2)
+    assert fingerprint(b"abc") != fingerprint("abc")
+    assert fingerprint("prompt", "gpt-4.1-mini") != fingerprint("prompt", "gpt-4o-mini")
+
+
+# --- Ejecutable como script ---
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main(["-q", "-s", __file__]))
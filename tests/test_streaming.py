@@ -0,0 +1,176 @@
+# tests/test_streaming.py
+import asyncio
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+import agent.nodes.finalize as finalize_mod
+import agent.nodes.infer_local as infer_mod
+import agent.nodes.wiki_fullpage as wiki_node
+import agent.tools.gpt as gpt
+from agent.graph import build_graph
+from agent.labels import LABEL_TO_LATIN
+
+TOKENS = ["El ", "macaco ", "japonés", "."]
+
+
+def _sse(text: str) -> bytes:
+    chunk = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "stand-in",
+             "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+    return b"data: " + json.dumps(chunk).encode() + b"\n\n"
+
+
+@pytest.fixture
+def sse_server(monkeypatch):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for t in TOKENS:
+                self.wfile.write(_sse(t))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{srv.server_address[1]}/v1")
+    monkeypatch.setattr(gpt, "_clients", {})
+    yield
+    srv.shutdown()
+
+
+def test_stream_gpt_text_yields_deltas(sse_server):
+    assert list(gpt.ask_gpt_text_stream("hola")) == TOKENS
+    seen = []
+    out = gpt.stream_gpt_text("hola", seen.append, cache=False)
+    assert seen == TOKENS
+    assert out["status"] == "ok" and out["answer"] == "El macaco japonés."
+    assert out["ttft_ms"] is not None and out["ttft_ms"] <= out["latency_ms"]
+
+
+def test_astream_gpt_text(sse_server):
+    seen = []
+
+    async def main():
+        out = await gpt.astream_gpt_text("hola", seen.append, cache=False)
+        clients = list(gpt._async_clients[asyncio.get_running_loop()].values())
+        await gpt.aclose()
+        return out, clients
+
+    out, clients = asyncio.run(main())
+    assert seen == TOKENS and out["answer"] == "El macaco japonés."
+    assert clients and all(c.is_closed() for c in clients)
+
+
+class _FakeStream:
+    def __init__(self, gate):
+        self.gate = gate
+
+    def __iter__(self):
+        self.gate.wait(2)
+        for t in TOKENS:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=t))])
+
+    def close(self):
+        pass
+
+
+def test_stream_shares_single_flight_and_reports_retries(monkeypatch):
+    gate, opened = threading.Event(), []
+
+    def fake_open(prompt, model, max_tokens, temperature):
+        opened.append(prompt)
+        return _FakeStream(gate), 1
+
+    monkeypatch.setattr(gpt, "_open_stream", fake_open)
+    monkeypatch.setattr(gpt, "_ask_gpt_text_remote", lambda *a: pytest.fail("debió unirse al stream en vuelo"))
+    leader_seen, follower_seen, results = [], [], {}
+    t = threading.Thread(target=lambda: results.setdefault("leader", gpt.stream_gpt_text("hola", leader_seen.append, cache=False)))
+    t.start()
+    while not opened:
+        time.sleep(0.01)
+
+    threads = [
+        threading.Thread(target=lambda: results.setdefault("text", gpt.ask_gpt_text("hola", cache=False))),
+        threading.Thread(target=lambda: results.setdefault("stream", gpt.stream_gpt_text("hola", follower_seen.append, cache=False))),
+    ]
+    for th in threads:
+        th.start()
+    time.sleep(0.1)
+    gate.set()
+    for th in [t, *threads]:
+        th.join()
+
+    assert opened == ["hola"]
+    assert leader_seen == TOKENS and follower_seen == ["El macaco japonés."]
+    assert results["leader"]["retries"] == 1
+    assert results["text"]["answer"] == results["stream"]["answer"] == "El macaco japonés."
+
+
+def test_graph_does_not_stream_unless_requested(monkeypatch):
+    label, _ = next(iter(LABEL_TO_LATIN.items()))
+    monkeypatch.setattr(infer_mod, "_vision_infer", lambda pil, topk=5: {
+        "topk": [{"label": label, "prob": 0.99}], "metrics": {"p1": 0.99, "p2": 0.0, "entropy": 0.05}})
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: None)
+    monkeypatch.setattr(wiki_node, "_pack_lookup", lambda latin: None)
+    monkeypatch.setattr(wiki_node, "fetch_fullpage", lambda name: {
+        "title": name, "url": "https://en.wikipedia.org/wiki/X", "plain_text": "t", "infobox": {}, "status": "ok"})
+    monkeypatch.setattr(finalize_mod, "stream_gpt_text", lambda *a, **k: pytest.fail("streaming no pedido"))
+    monkeypatch.setattr(finalize_mod, "ask_gpt_text", lambda prompt: {"status": "ok", "answer": "respuesta"})
+
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buf, format="JPEG")
+    out = build_graph().invoke({"image_bytes": buf.getvalue(), "messages": [], "prefetch_topk": 0})
+    assert out["messages"][-1].content.startswith("respuesta")
+
+
+def test_stream_error_is_a_status(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    out = gpt.stream_gpt_text("hola", lambda t: None, cache=False)
+    assert out["status"] == "error" and out["answer"] == ""
+
+
+def test_finalize_emits_tokens_through_custom_stream(monkeypatch):
+    label, latin = next(iter(LABEL_TO_LATIN.items()))
+
+    def fake_stream(prompt, on_delta, **kw):
+        for t in TOKENS:
+            on_delta(t)
+        return {"status": "ok", "answer": "".join(TOKENS)}
+
+    monkeypatch.setattr(infer_mod, "_vision_infer", lambda pil, topk=5: {
+        "topk": [{"label": label, "prob": 0.99}], "metrics": {"p1": 0.99, "p2": 0.0, "entropy": 0.05}})
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: None)
+    monkeypatch.setattr(wiki_node, "_pack_lookup", lambda latin: None)
+    monkeypatch.setattr(wiki_node, "fetch_fullpage", lambda name: {
+        "title": name, "url": "https://en.wikipedia.org/wiki/X", "plain_text": "t", "infobox": {}, "status": "ok"})
+    monkeypatch.setattr(finalize_mod, "stream_gpt_text", fake_stream)
+
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buf, format="JPEG")
+    inputs = {"image_bytes": buf.getvalue(), "messages": [], "prefetch_topk": 0, "stream_tokens": True}
+
+    chunks, final = [], None
+    for mode, data in build_graph().stream(inputs, stream_mode=["custom", "values"]):
+        if mode == "custom" and data.get("type") == "token":
+            chunks.append(data["chunk"])
+        elif mode == "values":
+            final = data
+
+    assert [c.content for c in chunks[:len(TOKENS)]] == TOKENS
+    assert all(c.id == chunks[0].id for c in chunks)
+    last = final["messages"][-1]
+    assert last.id == chunks[0].id
+    assert last.content == "".join(c.content for c in chunks)
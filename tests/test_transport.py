@@ -0,0 +1,167 @@
+# tests/test_transport.py
+import asyncio
+import importlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+transport = importlib.import_module("agent.utils.transport")
+
+
+@pytest.fixture
+def fresh_transport(monkeypatch):
+    # Sesión y breakers limpios por test
+    monkeypatch.setattr(transport, "_session", None)
+    monkeypatch.setattr(transport, "_breakers", {})
+    monkeypatch.setattr(transport, "HTTP_BACKOFF", 0.0)
+    monkeypatch.setattr(transport, "HTTP_BACKOFF_JITTER", 0.0)
+    return transport
+
+
+@pytest.fixture
+def flaky_server():
+    """Responde 503 (con Retry-After) las primeras `fail` veces y luego 200."""
+    state = {"hits": 0, "fail": 1}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            state["hits"] += 1
+            if state["hits"] <= state["fail"]:
+                body = b"busy"
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+            else:
+                body = b"ok"
+                self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/", state
+    srv.shutdown()
+
+
+def test_retries_5xx_then_succeeds(fresh_transport, flaky_server):
+    url, state = flaky_server
+    resp = fresh_transport.get(url, timeout=5)
+    assert resp.status_code == 200 and resp.text == "ok"
+    assert state["hits"] == 2
+    # Misma sesión reutilizada entre llamadas (pool/keep-alive)
+    assert fresh_transport.get_session() is fresh_transport.get_session()
+
+
+def test_breaker_opens_and_fails_fast(fresh_transport, monkeypatch):
+    calls = {"n": 0}
+
+    class DeadSession:
+        def request(self, *a, **kw):
+            calls["n"] += 1
+            raise requests.ConnectionError("down")
+
+    monkeypatch.setattr(fresh_transport, "get_session", lambda: DeadSession())
+    br = fresh_transport.breaker_for("dead.example")
+    br.failure_threshold = 2
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            fresh_transport.get("https://dead.example/x")
+    assert br.state == "open"
+
+    with pytest.raises(fresh_transport.CircuitOpenError):
+        fresh_transport.get("https://dead.example/x")
+    assert calls["n"] == 2  # la tercera ni siquiera salió a la red
+
+    # Otros hosts no se ven afectados
+    assert fresh_transport.breaker_for("ok.example").state == "closed"
+
+
+def test_half_open_allows_single_trial():
+    br = transport.CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    br.record_failure()
+    assert br.state == "half_open"
+    assert br.allow() is True      # petición de prueba
+    assert br.allow() is False     # el resto espera al resultado
+    br.record_success()
+    assert br.state == "closed" and br.allow() is True
+
+
+def test_failed_trial_reopens():
+    br = transport.CircuitBreaker(failure_threshold=3, reset_timeout=60.0)
+    for _ in range(3):
+        br.record_failure()
+    assert br.state == "open"
+    br.reset_timeout = 0.0
+    assert br.allow() is True
+    br.reset_timeout = 60.0
+    br.record_failure()
+    assert br.state == "open"
+
+
+def _half_open(tp, host):
+    br = tp.breaker_for(host)
+    br.reset_timeout = 0.0
+    br.failure_threshold = 1
+    br.record_failure()
+    assert br.state == "half_open"
+    return br
+
+
+def test_interrupted_trial_releases_breaker(fresh_transport, monkeypatch):
+    br = _half_open(fresh_transport, "odd.example")
+
+    class _Session:
+        def request(self, *a, **k):
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(fresh_transport, "_session", _Session())
+    with pytest.raises(KeyboardInterrupt):
+        fresh_transport.get("https://odd.example/x")
+    # Sin veredicto: la siguiente petición vuelve a poder probar el host
+    assert br.allow() is True
+
+
+def test_cancelled_async_trial_releases_breaker(fresh_transport, flaky_server):
+    httpx = pytest.importorskip("httpx")  # noqa: F841
+    url, state = flaky_server
+    state["fail"] = 0
+    host = url.split("/")[2]
+    br = _half_open(fresh_transport, host)
+
+    async def main():
+        task = asyncio.ensure_future(fresh_transport.aget(url, timeout=5))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert br.allow() is True
+        br.release()
+        resp = await fresh_transport.aget(url, timeout=5)
+        client = fresh_transport._async_clients[asyncio.get_running_loop()]
+        await fresh_transport.aclose()
+        return resp, client
+
+    resp, client = asyncio.run(main())
+    assert resp.status_code == 200 and br.state == "closed"
+    assert client.is_closed
+
+
+def test_retry_after_is_capped(monkeypatch):
+    monkeypatch.setattr(transport, "HTTP_RETRY_AFTER_MAX", 2.0)
+    retry = transport._make_retry()
+    assert retry.parse_retry_after("3600") == 2.0
+
+
+# --- Ejecutable como script ---
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main(["-q", "-s", __file__]))
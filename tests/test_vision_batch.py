@@ -0,0 +1,103 @@
+# tests/test_vision_batch.py
+import io
+import importlib
+import math
+import pytest
+
+torch = pytest.importorskip("torch")
+T = pytest.importorskip("torchvision.transforms")
+from PIL import Image
+
+vision = importlib.import_module("agent.tools.vision")
+
+N_CLASSES = 10
+
+
+class _TinyModel(torch.nn.Module):
+    """Sustituto determinista del TorchScript real: [N,3,H,W] -> [N,C]."""
+    def __init__(self):
+        super().__init__()
+        g = torch.Generator().manual_seed(0)
+        self.w = torch.randn(3, N_CLASSES, generator=g)
+
+    def forward(self, x):
+        return x.mean(dim=(2, 3)) @ self.w * 8.0
+
+
+_REF_TRANSFORM = T.Compose([T.Resize((32, 32)), T.ToTensor()])
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    monkeypatch.setattr(vision, "_model", _TinyModel().eval())
+    monkeypatch.setattr(vision, "_classes", [f"class_{i}" for i in range(N_CLASSES)])
+    monkeypatch.setattr(vision, "_transform", _REF_TRANSFORM)
+    monkeypatch.setattr(vision, "_folded", False)
+    monkeypatch.setattr(vision, "PREPROCESS", "pil")
+    monkeypatch.setattr(vision, "TTA", "off")
+    monkeypatch.setattr(vision, "MICROBATCH", False)
+    monkeypatch.setattr(vision, "POOL_WORKERS", 0)
+
+
+def _reference(img: Image.Image, k: int):
+    """
+    Referencia independiente de vision: forward de UNA imagen y
+    softmax/argmax/top-k/entropía a mano sobre sus logits crudos.
+    """
+    with torch.no_grad():
+        logits = _TinyModel()(_REF_TRANSFORM(img).unsqueeze(0))[0].tolist()
+    m = max(logits)
+    exps = [math.exp(v - m) for v in logits]
+    z = sum(exps)
+    probs = [e / z for e in exps]
+    order = sorted(range(N_CLASSES), key=lambda i: -probs[i])[:k]
+    assert order[0] == max(range(N_CLASSES), key=lambda i: logits[i])   # argmax
+    entropy = -sum(p * math.log(p) for p in probs if p > 0)
+    return [f"class_{i}" for i in order], [probs[i] for i in order], entropy
+
+
+def _img(i: int) -> Image.Image:
+    return Image.new("RGB", (48, 40), color=(25 * i % 256, 80, 255 - 20 * i))
+
+
+def _png_bytes(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_infer_batch_matches_single_image_reference(fake_model):
+    imgs = [_img(i) for i in range(5)]
+    batch = vision.infer_batch(imgs, topk=3)
+    single = [vision.infer(im, topk=3) for im in imgs]
+
+    assert len(batch) == len(imgs)
+    for im, b, s in zip(imgs, batch, single):
+        labels, probs, entropy = _reference(im, 3)
+        for out in (b, s):
+            assert [d["label"] for d in out["topk"]] == labels
+            assert [d["prob"] for d in out["topk"]] == pytest.approx(probs, abs=1e-5)
+            assert out["metrics"]["p1"] == pytest.approx(probs[0], abs=1e-5)
+            assert out["metrics"]["p2"] == pytest.approx(probs[1], abs=1e-5)
+            assert out["metrics"]["entropy"] == pytest.approx(entropy, abs=1e-5)
+
+
+def test_infer_batch_accepts_bytes_and_keeps_order(fake_model):
+    imgs = [_img(i) for i in range(4)]
+    mixed = [imgs[0], _png_bytes(imgs[1]), imgs[2], _png_bytes(imgs[3])]
+    out = vision.infer_batch(mixed, topk=2, batch_size=3)  # fuerza 2 chunks
+    ref = vision.infer_batch(imgs, topk=2)
+    assert [o["topk"][0]["label"] for o in out] == [r["topk"][0]["label"] for r in ref]
+
+
+def test_topk_one_reports_zero_p2(fake_model):
+    out = vision.infer_batch([_img(1)], topk=1)[0]
+    assert len(out["topk"]) == 1
+    assert out["metrics"]["p2"] == 0.0
+    assert out["metrics"]["p1"] == pytest.approx(out["topk"][0]["prob"])
+
+
+# --- Ejecutable como script ---
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main(["-q", "-s", __file__]))
@@ -0,0 +1,129 @@
+# tests/test_vision_cache.py
+import io
+
+import pytest
+from PIL import Image, ImageDraw
+
+import agent.nodes.infer_local as infer_mod
+from agent.labels import LABEL_TO_LATIN
+from agent.tools.vision_cache import ClassificationCache, dhash, hamming
+
+LABEL = next(iter(LABEL_TO_LATIN))
+
+
+def _photo(size=(256, 192)) -> Image.Image:
+    img = Image.new("RGB", size, (30, 60, 30))
+    d = ImageDraw.Draw(img)
+    d.ellipse((60, 40, 180, 160), fill=(170, 120, 80))
+    d.rectangle((0, 150, 256, 192), fill=(90, 90, 120))
+    return img
+
+
+def _encode(img: Image.Image, fmt="JPEG", **kw) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **kw)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def counting_model(monkeypatch):
+    calls = []
+
+    def fake_infer(pil, topk=5):
+        calls.append(pil.size)
+        return {"topk": [{"label": LABEL, "prob": 0.9}], "metrics": {"p1": 0.9, "p2": 0.05, "entropy": 0.3}}
+
+    monkeypatch.setattr(infer_mod, "_vision_infer", fake_infer)
+    monkeypatch.setattr(infer_mod, "_prefetch", None)
+    monkeypatch.setattr(infer_mod, "_model_fingerprint", lambda: "model-a")
+    return calls
+
+
+def test_exact_hit_skips_model(counting_model, monkeypatch):
+    cache = ClassificationCache(maxsize=8)
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: cache)
+    data = _encode(_photo())
+
+    first = infer_mod.infer_local({"image_bytes": data})
+    second = infer_mod.infer_local({"image_bytes": data})
+
+    assert len(counting_model) == 1
+    assert second["_tmp"]["vision_cache"] == "exact"
+    assert second["_tmp"]["topk_list"] == first["_tmp"]["topk_list"]
+    assert cache.stats()["hits_exact"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_near_duplicate_hit_with_phash(counting_model, monkeypatch):
+    cache = ClassificationCache(maxsize=8, phash_max_dist=6)
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: cache)
+    img = _photo()
+
+    infer_mod.infer_local({"image_bytes": _encode(img, quality=95)})
+    resized = img.resize((200, 150))
+    out = infer_mod.infer_local({"image_bytes": _encode(resized, quality=70)})
+
+    assert len(counting_model) == 1
+    assert out["_tmp"]["vision_cache"] == "near"
+
+
+def test_phash_disabled_by_default_and_topk_in_key(counting_model, monkeypatch):
+    cache = ClassificationCache(maxsize=8)
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: cache)
+    img = _photo()
+
+    infer_mod.infer_local({"image_bytes": _encode(img, quality=95)})
+    infer_mod.infer_local({"image_bytes": _encode(img, quality=70)})
+    infer_mod.infer_local({"image_bytes": _encode(img, quality=70), "topk": 3})
+    assert len(counting_model) == 3
+
+
+def test_model_fingerprint_in_key(counting_model, monkeypatch):
+    cache = ClassificationCache(maxsize=8, phash_max_dist=6)
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: cache)
+    data = _encode(_photo())
+
+    infer_mod.infer_local({"image_bytes": data})
+    # Otro modelo (fichero sustituido, int8, otro preprocesado): ni exacto ni dHash
+    monkeypatch.setattr(infer_mod, "_model_fingerprint", lambda: "model-b")
+    out = infer_mod.infer_local({"image_bytes": data})
+    assert len(counting_model) == 2 and "vision_cache" not in out["_tmp"]
+
+
+def test_cache_skipped_without_model_fingerprint(counting_model, monkeypatch):
+    cache = ClassificationCache(maxsize=8)
+    monkeypatch.setattr(infer_mod, "get_classification_cache", lambda: cache)
+
+    def missing():
+        raise FileNotFoundError("sin modelo")
+    monkeypatch.setattr(infer_mod, "_model_fingerprint", missing)
+    data = _encode(_photo())
+    infer_mod.infer_local({"image_bytes": data})
+    infer_mod.infer_local({"image_bytes": data})
+    assert len(counting_model) == 2 and cache.stats()["entries"] == 0
+
+
+def test_registry_fingerprint_tracks_model_file(registry_dir):
+    import os
+    from agent.tools import model_registry
+
+    before = model_registry.fingerprint()
+    assert before == model_registry.fingerprint()
+    st = (registry_dir / "m.pt").stat()
+    os.utime(registry_dir / "m.pt", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert model_registry.fingerprint() != before
+
+
+def test_bounded_with_eviction_stats():
+    cache = ClassificationCache(maxsize=2)
+    for i in range(3):
+        cache.put(f"sha{i}", 5, {"topk": [], "metrics": {}})
+    assert cache.get_exact("sha0", 5) is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+
+
+def test_dhash_is_stable_under_resize():
+    img = _photo()
+    assert hamming(dhash(img), dhash(img.resize((128, 96)))) <= 4
+    other = Image.new("RGB", img.size, (200, 200, 40))
+    ImageDraw.Draw(other).polygon([(0, 0), (256, 40), (30, 192)], fill=(20, 20, 90))
+    assert hamming(dhash(img), dhash(other)) > 10
@@ -0,0 +1,62 @@
+# tests/test_vision_payload.py
+import base64
+import io
+
+from PIL import Image
+
+import agent.tools.gpt as gpt
+from agent.utils.images import prepare_vision_payload
+
+
+def _encode(img: Image.Image, fmt: str, **kw) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **kw)
+    return buf.getvalue()
+
+
+def _photo(size) -> Image.Image:
+    return Image.radial_gradient("L").resize(size).convert("RGB")
+
+
+def test_downsizes_strips_metadata_and_labels_mime():
+    exif = Image.Exif()
+    exif[0x0112] = 6          # Orientation: girar 90º
+    exif[0x010F] = "Camera"
+    data = _encode(_photo((2000, 1000)), "JPEG", exif=exif.tobytes(), quality=95)
+
+    out, mime, info = prepare_vision_payload(data, max_side=512, format="WEBP", quality=80)
+    img = Image.open(io.BytesIO(out))
+
+    assert mime == "image/webp" and img.format == "WEBP"
+    assert img.size == (256, 512)                  # orientación aplicada antes de quitar EXIF
+    assert not img.info.get("exif") and not img.info.get("icc_profile")
+    assert info["bytes_in"] == len(data) and info["bytes_out"] == len(out) < len(data)
+    assert info["size_in"] == [2000, 1000] and info["size_out"] == [256, 512]
+
+
+def test_small_clean_original_is_sent_as_is():
+    data = _encode(_photo((320, 240)), "JPEG", quality=30, optimize=True)
+    out, mime, info = prepare_vision_payload(data, max_side=512, quality=85)
+    assert out == data and mime == "image/jpeg" and info["bytes_out"] == info["bytes_in"]
+
+
+def test_ask_binomial_sends_optimized_data_url(monkeypatch):
+    sent = {}
+
+    def fake_chat(messages, model, max_tokens, temperature):
+        sent["url"] = messages[0]["content"][1]["image_url"]["url"]
+        return None, {"error": "offline", "latency_ms": 1.0}
+
+    monkeypatch.setattr(gpt, "_chat", fake_chat)
+    monkeypatch.setattr(gpt, "GPT_VISION_MAX_SIDE", 256)
+    png = _encode(_photo((1200, 900)), "PNG")
+
+    out = gpt.ask_binomial(image_bytes=png)
+    head, b64 = sent["url"].split(",", 1)
+    assert head == "data:image/jpeg;base64"
+    assert max(Image.open(io.BytesIO(base64.b64decode(b64))).size) == 256
+    assert out["payload"]["bytes_in"] == len(png) and out["payload"]["bytes_out"] < len(png)
+
+    monkeypatch.setattr(gpt, "GPT_VISION_MAX_SIDE", 0)
+    gpt.ask_binomial(image_bytes=png)   # bytes tal cual, MIME real
+    assert sent["url"].startswith("data:image/png;base64,")
@@ -0,0 +1,82 @@
+# tests/test_vision_tta.py
+import pytest
+
+torch = pytest.importorskip("torch")
+T = pytest.importorskip("torchvision.transforms")
+from PIL import Image, ImageDraw
+
+from agent.tools import vision
+
+N_CLASSES = 6
+
+
+class _CountingModel(torch.nn.Module):
+    """Sensible a la posición (no invariante al espejo) y cuenta forwards."""
+    def __init__(self):
+        super().__init__()
+        g = torch.Generator().manual_seed(0)
+        self.w = torch.randn(3 * 4, N_CLASSES, generator=g)
+        self.calls = []
+
+    def forward(self, x):
+        self.calls.append(x.shape[0])
+        pooled = torch.nn.functional.adaptive_avg_pool2d(x, (2, 2)).flatten(1)
+        return pooled @ self.w * 4.0
+
+
+@pytest.fixture
+def model(monkeypatch):
+    m = _CountingModel().eval()
+    monkeypatch.setattr(vision, "_model", m)
+    monkeypatch.setattr(vision, "_classes", [f"class_{i}" for i in range(N_CLASSES)])
+    monkeypatch.setattr(vision, "_transform", T.Compose([T.Resize((32, 32)), T.ToTensor()]))
+    monkeypatch.setattr(vision, "_folded", False)
+    monkeypatch.setattr(vision, "MICROBATCH", False)
+    monkeypatch.setattr(vision, "POOL_WORKERS", 0)
+    return m
+
+
+def _img(i: int) -> Image.Image:
+    img = Image.new("RGB", (48, 40), (20 * i, 90, 200 - 30 * i))
+    ImageDraw.Draw(img).rectangle((0, 0, 16 + 4 * i, 20), fill=(250, 40 * i, 10))
+    return img
+
+
+@pytest.mark.parametrize("mode,views", [("flip", 2), ("crops", 7)])
+def test_tta_runs_all_views_in_one_forward(model, monkeypatch, mode, views):
+    monkeypatch.setattr(vision, "TTA", mode)
+    out = vision.infer_batch([_img(i) for i in range(3)], topk=3)
+
+    assert model.calls == [3 * views]
+    for r in out:
+        m = r["metrics"]
+        assert m["p1"] >= m["p2"] and m["entropy"] > 0
+        assert r["topk"][0]["prob"] == pytest.approx(m["p1"])
+
+
+def test_flip_tta_is_the_mean_of_both_views(model, monkeypatch):
+    img = _img(2)
+    x = vision._transform(img).unsqueeze(0)
+    with torch.inference_mode():
+        expected = (torch.softmax(model(x), 1) + torch.softmax(model(x.flip(-1)), 1)) / 2
+
+    monkeypatch.setattr(vision, "TTA", "flip")
+    r = vision.infer(img, topk=N_CLASSES)
+    probs = {d["label"]: d["prob"] for d in r["topk"]}
+    for i in range(N_CLASSES):
+        assert probs[f"class_{i}"] == pytest.approx(float(expected[0, i]), abs=1e-6)
+
+
+def test_crops_keep_uint8_inputs_for_folded_models(model, monkeypatch):
+    monkeypatch.setattr(vision, "TTA", "crops")
+    x = torch.randint(0, 256, (2, 3, 32, 32), dtype=torch.uint8)
+    views = vision._tta_batch(x)
+    assert views.shape == (14, 3, 32, 32) and views.dtype == torch.uint8
+    assert torch.equal(views[:2], x) and torch.equal(views[2:4], x.flip(-1))
+
+
+def test_tta_off_runs_a_single_view(model, monkeypatch):
+    monkeypatch.setattr(vision, "TTA", "off")
+    assert vision.tta_views() == 1
+    vision.infer(_img(0))
+    assert model.calls == [1]
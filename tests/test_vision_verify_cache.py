@@ -0,0 +1,68 @@
+# tests/test_vision_verify_cache.py
+import time
+
+import pytest
+
+import agent.nodes.ask_gpt41_vision as node
+from agent.tools.gpt_cache import VisionResultCache
+
+
+@pytest.fixture
+def gpt(monkeypatch):
+    calls = []
+    answers = {}
+
+    def fake_binomial(image_bytes=None, url=None, **kw):
+        calls.append(url or image_bytes)
+        return answers.get(url or image_bytes, {"status": "ok", "latin_name": "Macaca fuscata", "latency_ms": 900.0})
+
+    monkeypatch.setattr(node, "_ask_binomial", fake_binomial)
+    return calls, answers
+
+
+def _use(monkeypatch, cache):
+    monkeypatch.setattr(node, "get_vision_cache", lambda: cache)
+
+
+def test_same_bytes_pay_one_round_trip(gpt, monkeypatch, tmp_path):
+    calls, _ = gpt
+    _use(monkeypatch, VisionResultCache(str(tmp_path / "v.sqlite")))
+
+    first = node.ask_gpt41_vision({"image_bytes": b"jpeg-1"})
+    second = node.ask_gpt41_vision({"image_bytes": b"jpeg-1"})
+    node.ask_gpt41_vision({"image_bytes": b"jpeg-2"})
+
+    assert calls == [b"jpeg-1", b"jpeg-2"]
+    assert first["_tmp"]["latin_name"] == second["_tmp"]["latin_name"] == "Macaca fuscata"
+    assert second["_tmp"]["vision_cached"] is True
+
+    # Sobrevive a un reinicio (disco)
+    _use(monkeypatch, VisionResultCache(str(tmp_path / "v.sqlite")))
+    node.ask_gpt41_vision({"image_bytes": b"jpeg-1"})
+    assert len(calls) == 2
+
+
+def test_url_key_and_model_in_key(gpt, monkeypatch):
+    calls, _ = gpt
+    _use(monkeypatch, VisionResultCache(None))
+    url = "https://example.org/m.jpg"
+
+    node.ask_gpt41_vision({"image_url": url})
+    node.ask_gpt41_vision({"image_url": url})
+    node.ask_gpt41_vision({"image_url": url, "vision_model": "otro"})
+    assert calls == [url, url]
+
+
+def test_invalid_has_own_retention_and_errors_are_not_cached(gpt, monkeypatch):
+    calls, answers = gpt
+    answers[b"bad"] = {"status": "invalid", "latin_name": "", "error": "model_output='?'"}
+    answers[b"down"] = {"status": "error", "latin_name": "", "error": "timeout"}
+    _use(monkeypatch, VisionResultCache(None, ttl=60, invalid_ttl=0.05))
+
+    assert node.ask_gpt41_vision({"image_bytes": b"bad"})["_tmp"]["vision_status"] == "invalid"
+    assert node.ask_gpt41_vision({"image_bytes": b"bad"})["_tmp"]["vision_cached"] is True
+    time.sleep(0.1)
+    node.ask_gpt41_vision({"image_bytes": b"bad"})
+    node.ask_gpt41_vision({"image_bytes": b"down"})
+    node.ask_gpt41_vision({"image_bytes": b"down"})
+    assert calls == [b"bad", b"bad", b"down", b"down"]
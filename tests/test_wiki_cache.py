@@ -0,0 +1,94 @@
+# tests/test_wiki_cache.py
+from agent.tools.wiki_cache import WikiPageCache, normalize_title
+
+PAGE_OK = {
+    "title": "Japanese macaque",
+    "url": "https://en.wikipedia.org/wiki/Macaca_fuscata",
+    "plain_text": "The Japanese macaque is a terrestrial Old World monkey species...",
+    "infobox": {"Family": "Cercopithecidae"},
+    "status": "ok",
+    "revid": 123,
+}
+
+
+class _Remote:
+    """Cuenta llamadas a la red simulada."""
+    def __init__(self, page=None, revid=123):
+        self.page = page or PAGE_OK
+        self.revid = revid
+        self.fetches = 0
+        self.revid_calls = 0
+
+    def fetch(self, latin):
+        self.fetches += 1
+        return dict(self.page)
+
+    def current_revid(self, latin):
+        self.revid_calls += 1
+        return self.revid
+
+
+def test_normalize_title():
+    assert normalize_title(" macaca_fuscata ") == "Macaca fuscata"
+    assert normalize_title("Macaca   fuscata") == "Macaca fuscata"
+
+
+def test_memory_hit_skips_network(tmp_path):
+    cache = WikiPageCache(str(tmp_path / "wiki.sqlite"))
+    remote = _Remote()
+    a = cache.get_or_fetch("Macaca fuscata", remote.fetch, remote.current_revid)
+    b = cache.get_or_fetch("macaca_fuscata", remote.fetch, remote.current_revid)
+    assert a == b == PAGE_OK
+    assert remote.fetches == 1 and remote.revid_calls == 0
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "wiki.sqlite")
+    remote = _Remote()
+    WikiPageCache(path).get_or_fetch("Macaca fuscata", remote.fetch, remote.current_revid)
+
+    fresh = WikiPageCache(path)   # nueva instancia = proceso reiniciado
+    page = fresh.get_or_fetch("Macaca fuscata", remote.fetch, remote.current_revid)
+    assert page["title"] == "Japanese macaque"
+    assert remote.fetches == 1
+
+
+def test_expired_entry_is_revalidated_by_revid(tmp_path):
+    cache = WikiPageCache(str(tmp_path / "wiki.sqlite"), ttl=0)
+    remote = _Remote(revid=123)
+    cache.get_or_fetch("Macaca fuscata", remote.fetch, remote.current_revid)
+    cache.get_or_fetch("Macaca fuscata", remote.fetch, remote.current_revid)
+    # Misma revisión -> no se vuelve a descargar
+    assert remote.fetches == 1 and remote.revid_calls == 1
+
+    remote.revid = 124
+    cache.get_or_fetch("Macaca fuscata", remote.fetch, remote.current_revid)
+    assert remote.fetches == 2
+
+
+def test_not_found_cached_with_short_ttl_and_errors_not_cached(tmp_path):
+    cache = WikiPageCache("off", negative_ttl=3600)
+    missing = _Remote(page={"status": "not_found"})
+    cache.get_or_fetch("Macaca fuscataxyz", missing.fetch)
+    cache.get_or_fetch("Macaca fuscataxyz", missing.fetch)
+    assert missing.fetches == 1
+
+    broken = _Remote(page={"status": "error", "error": "timeout"})
+    cache.get_or_fetch("Cebus capucinus", broken.fetch)
+    cache.get_or_fetch("Cebus capucinus", broken.fetch)
+    assert broken.fetches == 2
+
+
+def test_stale_page_served_when_refetch_fails(tmp_path):
+    cache = WikiPageCache("off", ttl=0)
+    remote = _Remote()
+    cache.get_or_fetch("Macaca fuscata", remote.fetch)
+    remote.page = {"status": "error", "error": "503"}
+    page = cache.get_or_fetch("Macaca fuscata", remote.fetch)
+    assert page["status"] == "ok" and page["title"] == "Japanese macaque"
+
+
+# --- Ejecutable como script ---
+if __name__ == "__main__":
+    import pytest, sys
+    sys.exit(pytest.main(["-q", "-s", __file__]))
@@ -0,0 +1,56 @@
+# tests/test_wiki_extract.py
+import pytest
+from agent.tools import wiki
+
+HTML = """
+<div class="mw-parser-output">
+  <table class="infobox biota">
+    <tr><th>Kingdom:</th><td>Animalia<sup class="reference"><a>[1]</a></sup></td></tr>
+    <tr><th>Family:</th><td>Cercopithecidae</td></tr>
+  </table>
+  <h2>Description</h2>
+  <p>The <b>Japanese macaque</b> lives in Japan<sup class="reference"><a>[2]</a></sup>.
+     It is also called snow&#160;monkey [citation needed].</p>
+  <figure><figcaption>Caption text</figcaption></figure>
+  <ul><li>Honshu</li><li>Kyushu<style>.x{}</style></li></ul>
+  <div class="thumb"><p>Paragraph inside a div.</p></div>
+  <table class="navbox"><tr><td>Navigation noise</td></tr></table>
+</div>
+"""
+
+
+def _parsers():
+    out = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+        out.append("lxml")
+    except Exception:
+        pass
+    return out
+
+
+@pytest.mark.parametrize("parser", _parsers())
+def test_single_parse_extracts_text_and_infobox(parser):
+    text, infobox = wiki._extract_page(HTML, parser=parser)
+
+    assert infobox == {"Kingdom": "Animalia", "Family": "Cercopithecidae"}
+    assert "Japanese macaque" in text and "snow monkey" in text
+    assert "Honshu\nKyushu" in text
+    assert "Paragraph inside a div." in text
+    for noise in ("[2]", "citation needed", "Caption text", "Navigation noise", "Description", ".x{}"):
+        assert noise not in text
+
+
+def test_backends_agree():
+    outs = [wiki._extract_page(HTML, parser=p) for p in _parsers()]
+    assert all(o == outs[0] for o in outs)
+
+
+def test_extract_full_plaintext_compat():
+    assert wiki._extract_full_plaintext(HTML) == wiki._extract_page(HTML)[0]
+
+
+# --- Ejecutable como script ---
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main(["-q", "-s", __file__]))
@@ -0,0 +1,90 @@
+# tests/test_wiki_pack.py
+import importlib
+import pytest
+
+wiki_pack = importlib.import_module("agent.tools.wiki_pack")
+
+PAGES = [
+    ("Macaca fuscata", {
+        "title": "Japanese macaque",
+        "url": "https://en.wikipedia.org/wiki/Macaca_fuscata",
+        "plain_text": "The Japanese macaque is a terrestrial Old World monkey species native to Japan. " * 40,
+        "infobox": {"Family": "Cercopithecidae"},
+        "status": "ok",
+        "revid": 1,
+    }),
+    ("Cebus capucinus", {
+        "title": "White-faced capuchin",
+        "url": "https://en.wikipedia.org/wiki/Cebus_capucinus",
+        "plain_text": "The white-faced capuchin is a medium-sized New World monkey.",
+        "infobox": {},
+        "status": "ok",
+    }),
+    ("Macaca fuscataxyz", {"status": "not_found"}),
+]
+
+
+def test_roundtrip_via_mmap(tmp_path):
+    out = tmp_path / "wiki_pack.bin"
+    index = wiki_pack.write_pack(PAGES, str(out), labels_version="v0.1")
+    assert set(index["entries"]) == {"Macaca fuscata", "Cebus capucinus"}
+
+    pack = wiki_pack.WikiPack(str(out))
+    try:
+        assert pack.index["labels_version"] == "v0.1"
+        page = pack.get("macaca_fuscata")           # clave normalizada
+        assert page == PAGES[0][1]
+        assert pack.get("Japanese macaque")["url"].endswith("Macaca_fuscata")  # alias por título
+        assert pack.get("Macaca fuscataxyz") is None  # not_found no se empaqueta
+        assert "Cebus capucinus" in pack
+    finally:
+        pack.close()
+    # Compacto: comprimido por debajo del JSON en claro
+    assert out.stat().st_size < sum(len(p[1].get("plain_text", "")) for p in PAGES)
+
+
+def test_rejects_foreign_file(tmp_path):
+    bad = tmp_path / "bad.bin"
+    bad.write_bytes(b"NOPE" + b"\x00" * 32)
+    with pytest.raises(ValueError):
+        wiki_pack.WikiPack(str(bad))
+
+
+def test_node_serves_from_pack_without_network(tmp_path, monkeypatch):
+    out = tmp_path / "wiki_pack.bin"
+    wiki_pack.write_pack(PAGES, str(out))
+    pack = wiki_pack.WikiPack(str(out))
+
+    node = importlib.import_module("agent.nodes.wiki_fullpage")
+    monkeypatch.setattr(node, "_pack_lookup", pack.get)
+
+    def no_network(latin):
+        raise AssertionError("no debería llamar a la red")
+    monkeypatch.setattr(node, "fetch_fullpage", no_network)
+
+    out_state = node.fetch_wikipedia_fullpage({"_tmp": {"latin_name": "Macaca fuscata"}})
+    assert out_state["_tmp"]["wiki_status"] == "ok"
+    assert out_state["_tmp"]["wiki_source"] == "pack"
+    assert out_state["wiki"]["title"] == "Japanese macaque"
+    pack.close()
+
+
+def test_taxa_from_labels_merges_both_sources():
+    taxa, version = wiki_pack.taxa_from_labels()
+    assert "Macaca fuscata" in taxa
+    assert len(taxa) == len(set(taxa))
+
+
+def test_taxa_from_labels_maps_common_names_to_latin(tmp_path):
+    import json
+    labels = tmp_path / "labels.json"
+    labels.write_text(json.dumps({"id2label": {"0": "Mantled_howler", "1": "macaca_fuscata"}}))
+    taxa, _ = wiki_pack.taxa_from_labels(str(labels))
+    assert "Alouatta palliata" in taxa and "Macaca fuscata" in taxa
+    assert not any("howler" in t.lower() for t in taxa)
+
+
+# --- Ejecutable como script ---
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main(["-q", "-s", __file__]))